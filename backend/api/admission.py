@@ -0,0 +1,234 @@
+import math
+import random
+import time
+import uuid
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Least
+from rest_framework import status
+from rest_framework.exceptions import APIException, Throttled
+from rest_framework.throttling import BaseThrottle
+
+from .constants import (ADMISSION_CONCURRENCY_RETRY_AFTER,
+                        ADMISSION_LEASE_TIMEOUT)
+from .models import AdmissionBucket, AdmissionLease
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+# Пополнение корзины до момента now, не выше ёмкости.
+REFILL_SQL = (
+    'CASE WHEN {table}.tokens + (%(now)s - {table}.updated_at) * %(rate)s '
+    '> %(capacity)s THEN %(capacity)s '
+    'ELSE {table}.tokens + (%(now)s - {table}.updated_at) * %(rate)s END'
+)
+TAKE_TOKENS_SQL = '''
+INSERT INTO {table} (key, tokens, updated_at, granted)
+VALUES (%(key)s, %(capacity)s - %(cost)s, %(now)s, TRUE)
+ON CONFLICT (key) DO UPDATE SET
+    tokens = CASE WHEN {refill} >= %(cost)s
+                  THEN {refill} - %(cost)s ELSE {refill} END,
+    granted = {refill} >= %(cost)s,
+    updated_at = %(now)s
+RETURNING tokens, granted
+'''
+ACQUIRE_LEASE_SQL = '''
+INSERT INTO {table} (key, slot, owner, expires_at)
+VALUES (%(key)s, %(slot)s, %(owner)s, %(expires_at)s)
+ON CONFLICT (key, slot) DO UPDATE SET
+    owner = EXCLUDED.owner,
+    expires_at = EXCLUDED.expires_at
+WHERE {table}.expires_at < %(now)s
+RETURNING id
+'''
+
+
+def parse_rate(rate):
+    """
+    Разбирает ограничение вида '10/min' в ёмкость корзины и скорость
+    её пополнения в токенах в секунду.
+    """
+
+    number, period = rate.split('/')
+    number = int(number)
+    return number, number / PERIODS[period[0]]
+
+
+class Overloaded(APIException):
+    """Общий лимит эндпоинта исчерпан."""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Сервер перегружен, повторите запрос позже.'
+    default_code = 'overloaded'
+
+    def __init__(self, wait, detail=None, code=None):
+        super().__init__(detail, code)
+        self.wait = math.ceil(wait)
+
+
+def take_tokens(key, rate, cost, now):
+    """
+    Берёт cost токенов из корзины одним UPSERT.
+
+    Возвращает 0, если запрос пропущен, иначе число секунд до
+    пополнения корзины на нужное количество токенов.
+    """
+
+    capacity, refill_rate = parse_rate(rate)
+    cost = min(cost, capacity)
+    table = AdmissionBucket._meta.db_table
+    sql = TAKE_TOKENS_SQL.format(
+        table=table, refill=REFILL_SQL.format(table=table))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {'key': key, 'capacity': capacity,
+                             'rate': refill_rate, 'cost': cost, 'now': now})
+        tokens, granted = cursor.fetchone()
+    if granted:
+        return 0
+    return (cost - tokens) / refill_rate
+
+
+def refund_tokens(key, rate, cost):
+    """Возвращает в корзину токены, взятые take_tokens."""
+
+    capacity, _ = parse_rate(rate)
+    AdmissionBucket.objects.filter(key=key).update(
+        tokens=Least(F('tokens') + min(cost, capacity), capacity))
+
+
+def acquire_lease(key, limit, owner, now):
+    """
+    Занимает свободный или просроченный слот из limit слотов ключа.
+
+    Начинает со случайного слота, поэтому при свободных слотах обычно
+    хватает одного запроса. Возвращает номер слота или None.
+    """
+
+    sql = ACQUIRE_LEASE_SQL.format(table=AdmissionLease._meta.db_table)
+    start = random.randrange(limit)
+    with connection.cursor() as cursor:
+        for offset in range(limit):
+            slot = (start + offset) % limit
+            cursor.execute(sql, {
+                'key': key, 'slot': slot, 'owner': owner, 'now': now,
+                'expires_at': now + ADMISSION_LEASE_TIMEOUT})
+            if cursor.fetchone() is not None:
+                return slot
+    return None
+
+
+class Admission:
+    """Занятые запросом слоты, освобождаемые после ответа."""
+
+    def __init__(self):
+        self.owner = uuid.uuid4().hex
+        self.leases = []
+
+    def release(self):
+        if not self.leases:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {AdmissionLease._meta.db_table} '
+                f'WHERE owner = %s', [self.owner])
+        self.leases = []
+
+
+def admit(name, limits, ident, cost=1):
+    """
+    Проверяет лимиты действия для клиента ident.
+
+    Превышение лимитов клиента (user_rate, user_concurrency) даёт 429,
+    общих (global_rate, global_concurrency) — 503; в обоих случаях
+    с заголовком Retry-After. Сначала занимаются слоты, затем берутся
+    токены; при отказе слоты освобождаются, а взятые токены
+    возвращаются, поэтому отклонённый запрос не расходует лимиты.
+    """
+
+    scopes = (
+        ('user', f'{name}:{ident}', Throttled),
+        ('global', name, Overloaded),
+    )
+    now = time.time()
+    admission = Admission()
+    for scope, key, error in scopes:
+        limit = limits.get(f'{scope}_concurrency')
+        if not limit:
+            continue
+        slot = acquire_lease(key, limit, admission.owner, now)
+        if slot is None:
+            admission.release()
+            raise error(wait=ADMISSION_CONCURRENCY_RETRY_AFTER)
+        admission.leases.append((key, slot))
+    taken = []
+    for scope, key, error in scopes:
+        rate = limits.get(f'{scope}_rate')
+        if not rate:
+            continue
+        wait = take_tokens(key, rate, cost, now)
+        if wait:
+            for taken_key, taken_rate in taken:
+                refund_tokens(taken_key, taken_rate, cost)
+            admission.release()
+            raise error(wait=wait)
+        taken.append((key, rate))
+    return admission
+
+
+def release_after(content, admission):
+    """
+    Освобождает слоты после отправки потокового ответа: тело
+    сериализуется уже после finalize_response. Если клиент ушёл раньше
+    первой части, слоты освободятся по ADMISSION_LEASE_TIMEOUT.
+    """
+
+    try:
+        yield from content
+    finally:
+        admission.release()
+
+
+class AdmissionControlMixin:
+    """
+    Ограничивает частоту и параллельность дорогих действий вьюсета.
+
+    Лимиты задаются в ADMISSION_LIMITS по ключу '<basename>.<action>'.
+    Состояние хранится в таблицах основной базы, поэтому лимиты общие
+    для всех процессов. Стоимость запроса в токенах считает
+    get_admission_cost; запросы дешевле min_cost не ограничиваются.
+    """
+
+    admission = None
+
+    def get_admission_cost(self, request):
+        return 1
+
+    def get_admission_ident(self, request):
+        if request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{BaseThrottle().get_ident(request)}'
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not settings.ADMISSION_CONTROL:
+            return
+        name = f'{self.basename}.{self.action}'
+        limits = settings.ADMISSION_LIMITS.get(name)
+        if not limits:
+            return
+        cost = self.get_admission_cost(request)
+        if cost < limits.get('min_cost', 1):
+            return
+        self.admission = admit(name, limits,
+                               self.get_admission_ident(request), cost)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self.admission is not None:
+            if response.streaming:
+                response.streaming_content = release_after(
+                    response.streaming_content, self.admission)
+            else:
+                self.admission.release()
+            self.admission = None
+        return super().finalize_response(request, response, *args, **kwargs)
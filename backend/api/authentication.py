@@ -0,0 +1,197 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from config.caches import shared_cache
+from users.models import User
+
+TOKEN_CACHE_KEY = 'auth:token:{}'
+USER_CACHE_KEY = 'auth:user:{}'
+# Поля, которые нужны аутентификации и ответам API. Остальные, включая
+# хэш пароля, в кэш не попадают и при обращении дочитываются из базы.
+USER_CACHED_FIELDS = [
+    field for field in User._meta.concrete_fields
+    if field.attname in ('id', 'email', 'username', 'first_name',
+                         'last_name', 'avatar', 'is_active', 'is_staff',
+                         'is_superuser')
+]
+USER_FIELDS = [field.attname for field in USER_CACHED_FIELDS]
+USER_ID_INDEX = USER_FIELDS.index('id')
+
+
+def token_digest(key):
+    """Хэш токена: сами токены в ключи кэша не попадают."""
+
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class LocalTokenCache:
+    """
+    Ограниченный LRU-кэш процесса: хэш токена → (id пользователя,
+    значения полей пользователя, срок годности).
+
+    Хранятся значения полей, а не объекты, чтобы параллельные запросы
+    не делили один экземпляр пользователя.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._user_tokens = {}
+        self._lock = threading.Lock()
+
+    def get(self, digest):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            if entry[2] < time.monotonic():
+                self._pop(digest)
+                return None
+            self._entries.move_to_end(digest)
+            return entry[1]
+
+    def set(self, digest, values):
+        if not self.max_size or not self.timeout:
+            return
+        user_id = values[USER_ID_INDEX]
+        with self._lock:
+            self._pop(digest)
+            self._entries[digest] = (
+                user_id, values, time.monotonic() + self.timeout)
+            self._user_tokens.setdefault(user_id, set()).add(digest)
+            while len(self._entries) > self.max_size:
+                self._pop(next(iter(self._entries)))
+
+    def delete(self, digest):
+        with self._lock:
+            self._pop(digest)
+
+    def delete_user(self, user_id):
+        with self._lock:
+            for digest in list(self._user_tokens.get(user_id, ())):
+                self._pop(digest)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_tokens.clear()
+
+    def _pop(self, digest):
+        entry = self._entries.pop(digest, None)
+        if entry is None:
+            return
+        digests = self._user_tokens.get(entry[0])
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._user_tokens[entry[0]]
+
+
+local_token_cache = LocalTokenCache(settings.AUTH_TOKEN_LOCAL_CACHE_SIZE,
+                                    settings.AUTH_TOKEN_LOCAL_CACHE_TIMEOUT)
+
+
+def get_shared_cache():
+    return shared_cache(settings.AUTH_TOKEN_CACHE)
+
+
+def user_values(user):
+    return tuple(field.get_prep_value(getattr(user, field.attname))
+                 for field in USER_CACHED_FIELDS)
+
+
+def user_from_values(values):
+    return User.from_db('default', USER_FIELDS, values)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication с кэшированием пользователя по токену.
+
+    Сначала смотрит в LRU процесса, затем в общий кэш AUTH_TOKEN_CACHE,
+    и только потом делает запрос Token + User. Записи удаляются сразу при
+    удалении токена (выход через djoser) и любом сохранении или удалении
+    пользователя, включая смену пароля и деактивацию.
+
+    Локальный уровень меняет своевременность сброса на скорость: другие
+    процессы не узнают о сбросе и могут пускать по своей записи ещё до
+    AUTH_TOKEN_LOCAL_CACHE_TIMEOUT секунд. Поэтому он работает только
+    вместе с общим кэшем: без него (пустой AUTH_TOKEN_CACHE или кэш
+    в памяти процесса) пользователь читается из базы на каждый запрос.
+    """
+
+    def authenticate_credentials(self, key):
+        if get_shared_cache() is None:
+            return super().authenticate_credentials(key)
+        digest = token_digest(key)
+        values = local_token_cache.get(digest)
+        if values is None:
+            values = self._get_shared(digest)
+            if values is None:
+                user, _ = super().authenticate_credentials(key)
+                values = user_values(user)
+                self._set_shared(digest, user.pk, values)
+            local_token_cache.set(digest, values)
+        user = user_from_values(values)
+        return user, Token(key=key, user=user)
+
+    @staticmethod
+    def _get_shared(digest):
+        cache = get_shared_cache()
+        user_id = cache.get(TOKEN_CACHE_KEY.format(digest))
+        if user_id is None:
+            return None
+        return cache.get(USER_CACHE_KEY.format(user_id))
+
+    @staticmethod
+    def _set_shared(digest, user_id, values):
+        cache = get_shared_cache()
+        timeout = settings.AUTH_TOKEN_CACHE_TIMEOUT
+        cache.set(TOKEN_CACHE_KEY.format(digest), user_id, timeout)
+        cache.set(USER_CACHE_KEY.format(user_id), values, timeout)
+
+
+def invalidate(forget):
+    """
+    Сбрасывает записи сразу и ещё раз после коммита, чтобы параллельный
+    запрос не вернул в кэш прочитанные до коммита данные.
+    """
+
+    forget()
+    transaction.on_commit(forget)
+
+
+def forget_token(digest):
+    local_token_cache.delete(digest)
+    cache = get_shared_cache()
+    if cache is not None:
+        cache.delete(TOKEN_CACHE_KEY.format(digest))
+
+
+def forget_user(user_id):
+    local_token_cache.delete_user(user_id)
+    cache = get_shared_cache()
+    if cache is not None:
+        cache.delete(USER_CACHE_KEY.format(user_id))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate(partial(forget_token, token_digest(instance.key)))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    invalidate(partial(forget_user, instance.pk))
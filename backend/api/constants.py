@@ -0,0 +1,22 @@
+ADMISSION_KEY_MAX_LENGTH = 200
+ADMISSION_LEASE_TIMEOUT = 60
+ADMISSION_CONCURRENCY_RETRY_AFTER = 1
+ADMISSION_BUCKET_IDLE_TIMEOUT = 24 * 60 * 60
+EVENTS_HEARTBEAT_INTERVAL = 15
+EVENTS_QUEUE_SIZE = 100
+EVENTS_LISTEN_RETRY_DELAY = 1
+PARTITION_COUNT = 16
+PARTITION_COPY_BATCH_SIZE = 50000
+LOAD_TEST_EMAIL_DOMAIN = 'load.test'
+LOAD_TEST_PASSWORD = 'load-test-password'
+LOAD_TEST_IMAGE = 'recipes/images/load_test.png'
+LOAD_TEST_FIXTURES = 'load_test_fixtures.json'
+LOAD_TEST_COLLECTION = 'foodgram.postman_collection.json'
+LOAD_TEST_TIMEOUT = 30
+CONTENT_ADDRESSED_DIRS = ('avatars', 'recipes/images')
+MEDIA_DELETE_GRACE_PERIOD = 10 * 60
+MEDIA_GC_GRACE_PERIOD = 24 * 60 * 60
+MEDIA_GC_CHUNK_SIZE = 10000
+STREAM_CHUNK_SIZE = 25
+STREAM_BUFFER_SIZE = 16 * 1024
+STREAM_QUERY_CHUNK_SIZE = 500
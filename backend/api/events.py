@@ -0,0 +1,310 @@
+import asyncio
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+from functools import partial
+from urllib.parse import parse_qs
+
+import orjson
+from asgiref.sync import sync_to_async
+from django.db import (close_old_connections, connection, connections,
+                       transaction)
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.exceptions import AuthenticationFailed
+
+from recipes.models import Recipe
+from users.models import Follow
+
+from .authentication import CachedTokenAuthentication
+from .constants import (EVENTS_HEARTBEAT_INTERVAL, EVENTS_LISTEN_RETRY_DELAY,
+                        EVENTS_QUEUE_SIZE)
+
+logger = logging.getLogger(__name__)
+
+EVENTS_PATH = '/api/events/'
+EVENTS_CHANNEL = 'recipe_events'
+SSE_HEADERS = [
+    (b'content-type', b'text/event-stream; charset=utf-8'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no'),
+]
+
+
+class Subscription:
+    """Открытое SSE-соединение пользователя."""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.authors = set()
+        self.queue = asyncio.Queue(EVENTS_QUEUE_SIZE)
+        self.overflowed = False
+        self.loaded = False
+        self.pending = []
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class RecipeEventBroker:
+    """
+    Рассылка событий о рецептах открытым соединениям процесса.
+
+    Подписки проиндексированы по авторам, поэтому событие обходит только
+    подписчиков автора, а простаивающее соединение — это очередь и одна
+    ожидающая корутина. Состояние меняется только в цикле событий;
+    из других потоков события передаются через call_soon_threadsafe.
+    На PostgreSQL события приходят через LISTEN в отдельном потоке,
+    и их получают все процессы; на других базах — только от записей
+    в этом же процессе.
+    """
+
+    def __init__(self):
+        self._by_author = defaultdict(set)
+        self._by_user = defaultdict(set)
+        self._loop = None
+        self._listener = None
+
+    def subscribe(self, user_id):
+        self._start()
+        subscription = Subscription(user_id)
+        self._by_user[user_id].add(subscription)
+        return subscription
+
+    def follow(self, subscription, author_ids):
+        for author_id in author_ids:
+            subscription.authors.add(author_id)
+            self._by_author[author_id].add(subscription)
+
+    def load(self, subscription, author_ids):
+        """
+        Задаёт авторов, прочитанных из базы после subscribe, и применяет
+        события подписок, пришедшие за время чтения: отписку,
+        зафиксированную после чтения, иначе вернуло бы чтение.
+        """
+
+        self.follow(subscription, author_ids)
+        subscription.loaded = True
+        for event in subscription.pending:
+            self._apply_follow(subscription, event)
+        subscription.pending = []
+
+    def unfollow(self, subscription, author_id):
+        subscription.authors.discard(author_id)
+        self._discard(self._by_author, author_id, subscription)
+
+    def unsubscribe(self, subscription):
+        for author_id in list(subscription.authors):
+            self.unfollow(subscription, author_id)
+        self._discard(self._by_user, subscription.user_id, subscription)
+
+    def publish(self, event):
+        """Передаёт событие в цикл событий; безопасно из любого потока."""
+
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._dispatch, event)
+
+    def _dispatch(self, event):
+        if event['type'] == 'recipe':
+            for subscription in list(self._by_author.get(event['author'],
+                                                         ())):
+                subscription.put(event)
+            return
+        for subscription in list(self._by_user.get(event['user'], ())):
+            if subscription.loaded:
+                self._apply_follow(subscription, event)
+            else:
+                subscription.pending.append(event)
+
+    def _apply_follow(self, subscription, event):
+        if event['action'] == 'created':
+            self.follow(subscription, [event['author']])
+        else:
+            self.unfollow(subscription, event['author'])
+
+    @staticmethod
+    def _discard(index, key, subscription):
+        subscriptions = index.get(key)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del index[key]
+
+    def _start(self):
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        if self._listener is None and connection.vendor == 'postgresql':
+            self._listener = threading.Thread(
+                target=self._listen, name='recipe-events-listener',
+                daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                self._listen_once()
+            except Exception:
+                logger.exception('Соединение LISTEN %s прервано.',
+                                 EVENTS_CHANNEL)
+            time.sleep(EVENTS_LISTEN_RETRY_DELAY)
+
+    def _listen_once(self):
+        database = connections['default']
+        conn = database.Database.connect(**database.get_connection_params())
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN {EVENTS_CHANNEL}')
+            while True:
+                if not select.select([conn], [], [],
+                                     EVENTS_HEARTBEAT_INTERVAL)[0]:
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    self.publish(orjson.loads(notify.payload))
+        finally:
+            conn.close()
+
+
+broker = RecipeEventBroker()
+
+
+def notify(event):
+    """Рассылает событие всем процессам с открытыми соединениями."""
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)',
+                           [EVENTS_CHANNEL, orjson.dumps(event).decode()])
+    else:
+        broker.publish(event)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(partial(notify, {
+            'type': 'recipe',
+            'action': 'created' if created else 'updated',
+            'recipe': instance.pk,
+            'author': instance.author_id,
+        }))
+
+
+def notify_follow(action, instance):
+    transaction.on_commit(partial(notify, {
+        'type': 'follow',
+        'action': action,
+        'user': instance.user_id,
+        'author': instance.author_id,
+    }))
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        notify_follow('created', instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    notify_follow('deleted', instance)
+
+
+def get_token(scope):
+    """Токен из заголовка Authorization или параметра ?token=."""
+
+    for name, value in scope['headers']:
+        if name == b'authorization':
+            parts = value.decode('latin-1').split()
+            if len(parts) == 2 and parts[0].lower() == 'token':
+                return parts[1]
+    return parse_qs(scope['query_string'].decode('latin-1')).get(
+        'token', [None])[0]
+
+
+@sync_to_async
+def authenticate(key):
+    try:
+        user, _ = CachedTokenAuthentication().authenticate_credentials(key)
+        return user.pk
+    except AuthenticationFailed:
+        return None
+    finally:
+        close_old_connections()
+
+
+@sync_to_async
+def get_followed_authors(user_id):
+    try:
+        return list(Follow.objects.filter(user_id=user_id).values_list(
+            'author_id', flat=True))
+    finally:
+        close_old_connections()
+
+
+def format_event(event):
+    return b'event: recipe\ndata: %s\n\n' % orjson.dumps(
+        {key: event[key] for key in ('action', 'recipe', 'author')})
+
+
+async def send_body(send, body):
+    await send({'type': 'http.response.body', 'body': body,
+                'more_body': True})
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def events_app(scope, receive, send):
+    """
+    ASGI-приложение SSE-потока /api/events/.
+
+    Шлёт событие recipe, когда автор, на которого подписан пользователь,
+    публикует или изменяет рецепт, и комментарий-пинг каждые
+    EVENTS_HEARTBEAT_INTERVAL секунд. Если клиент не успевает забирать
+    события, приходит событие resync и соединение закрывается: клиент
+    догоняет изменения через /api/changes/.
+    """
+
+    key = get_token(scope)
+    user_id = await authenticate(key) if key else None
+    if user_id is None:
+        await send({'type': 'http.response.start', 'status': 401,
+                    'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': orjson.dumps(
+            {'detail': 'Учетные данные не были предоставлены.'})})
+        return
+    subscription = broker.subscribe(user_id)
+    disconnected = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        broker.load(subscription, await get_followed_authors(user_id))
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': SSE_HEADERS})
+        await send_body(send, b'retry: 5000\n\n')
+        while not subscription.overflowed:
+            event = asyncio.ensure_future(subscription.queue.get())
+            done, _ = await asyncio.wait(
+                {event, disconnected}, timeout=EVENTS_HEARTBEAT_INTERVAL,
+                return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                event.cancel()
+                return
+            if event in done:
+                await send_body(send, format_event(event.result()))
+            else:
+                event.cancel()
+                await send_body(send, b': ping\n\n')
+        await send_body(send, b'event: resync\ndata: {}\n\n')
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        disconnected.cancel()
+        broker.unsubscribe(subscription)
@@ -0,0 +1,275 @@
+from django.db.models import Manager
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+from recipes.catalog import catalog
+from recipes.models import Recipe
+from users.follows import is_following, is_subscribed_to
+
+RECIPE_FIELDS = ('id', 'name', 'text', 'ingredients', 'author', 'is_favorited',
+                 'is_in_shopping_cart', 'cooking_time', 'tags', 'image')
+# Поля ответа, совпадающие с полями модели Recipe.
+RECIPE_COLUMNS = ('name', 'text', 'author', 'cooking_time', 'image')
+# Поля, не зависящие от пользователя; их значения кэшируются.
+RECIPE_BASE_FIELDS = ('id', 'name', 'text', 'ingredients', 'author',
+                      'cooking_time', 'tags', 'image')
+RECIPE_FIELDS_ATTR = '_recipe_fields'
+RECIPE_PROFILES = {
+    'compact': ('id', 'name', 'image', 'cooking_time'),
+}
+
+
+def split_param(request, name):
+    return [item.strip()
+            for value in request.query_params.getlist(name)
+            for item in value.split(',') if item.strip()]
+
+
+def get_recipe_fields(request):
+    """
+    Поля рецепта, запрошенные параметрами fields и omit.
+
+    fields перечисляет нужные поля через запятую и может содержать
+    профиль (compact — как в списке подписок), omit исключает поля.
+    Порядок полей всегда как в полном ответе. Результат запоминается
+    на объекте запроса.
+    """
+
+    if request is None:
+        return RECIPE_FIELDS
+    fields = getattr(request, RECIPE_FIELDS_ATTR, None)
+    if fields is None:
+        fields = parse_recipe_fields(request)
+        setattr(request, RECIPE_FIELDS_ATTR, fields)
+    return fields
+
+
+def parse_recipe_fields(request):
+    requested = split_param(request, 'fields')
+    omitted = split_param(request, 'omit')
+    if not requested and not omitted:
+        return RECIPE_FIELDS
+    selected = set()
+    for field in requested:
+        selected.update(RECIPE_PROFILES.get(field, (field,)))
+    unknown = (selected | set(omitted)) - set(RECIPE_FIELDS)
+    if unknown:
+        raise ValidationError({'fields': [
+            f'Неизвестные поля: {", ".join(sorted(unknown))}.']})
+    selected = (selected or set(RECIPE_FIELDS)) - set(omitted)
+    return tuple(field for field in RECIPE_FIELDS if field in selected)
+
+
+def file_url(file, request):
+    """Повторяет FileField.to_representation для изображений."""
+
+    if not file:
+        return None
+    url = file.url
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def serialize_tag(tag):
+    return {'id': tag.id, 'name': tag.name, 'slug': tag.slug}
+
+
+def serialize_ingredient_link(link, ingredient):
+    name, measurement_unit = ingredient
+    return {
+        'id': link.ingredient_id,
+        'name': name,
+        'amount': link.amount,
+        'measurement_unit': measurement_unit,
+    }
+
+
+def serialize_ingredient_links(links, ingredients=None):
+    """
+    Ингредиенты рецепта по связям без загруженных объектов Ingredient:
+    названия и единицы берутся из каталога процесса.
+    """
+
+    if ingredients is None:
+        ingredients = catalog.get_ingredients(
+            {link.ingredient_id for link in links})
+    return [serialize_ingredient_link(link, ingredients[link.ingredient_id])
+            for link in links if link.ingredient_id in ingredients]
+
+
+def load_tag_ids(recipes):
+    """
+    id тегов каждого рецепта одним запросом к промежуточной таблице,
+    без join с таблицей тегов.
+    """
+
+    tag_ids = {recipe.id: set() for recipe in recipes}
+    if recipes:
+        for recipe_id, tag_id in Recipe.tags.through.objects.using(
+                recipes[0]._state.db).filter(
+                    recipe_id__in=list(tag_ids)).values_list(
+                        'recipe_id', 'tag_id'):
+            tag_ids[recipe_id].add(tag_id)
+    return tag_ids
+
+
+def serialize_recipe_tags(recipe_tag_ids, tags=None):
+    """Теги рецепта из каталога процесса в порядке Tag.Meta.ordering."""
+
+    if tags is None:
+        tags = catalog.get_tags(recipe_tag_ids)
+    return [serialize_tag(tag) for tag in tags if tag.id in recipe_tag_ids]
+
+
+def serialize_user(user, request, is_subscribed):
+    return {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'is_subscribed': is_subscribed,
+        'avatar': file_url(user.avatar, request),
+    }
+
+
+class FastModelSerializer(BaseSerializer):
+    """Сериализатор, копирующий перечисленные атрибуты объекта."""
+
+    fields = ()
+
+    def to_representation(self, instance):
+        return {field: getattr(instance, field) for field in self.fields}
+
+
+class FastTagSerializer(FastModelSerializer):
+    fields = ('id', 'name', 'slug')
+
+
+class FastIngredientSerializer(FastModelSerializer):
+    fields = ('id', 'name', 'measurement_unit')
+
+
+class FastUserSerializer(BaseSerializer):
+    """Представление пользователя, как у StandartUserSerializer."""
+
+    def to_representation(self, instance):
+        request = self.context.get('request')
+        return serialize_user(
+            instance, request, is_subscribed_to(instance, request))
+
+
+def build_recipe_bases(recipes, fields):
+    """
+    Не зависящие от пользователя части представлений рецептов.
+
+    Адреса файлов относительные, is_subscribed автора не заполнен:
+    их подставляет merge_recipe при ответе. Ингредиенты и теги
+    заполняются из каталога процесса: связи с ингредиентами должны быть
+    загружены без select_related, id тегов читаются одним запросом.
+    """
+
+    recipes = list(recipes)
+    ingredients = tags = None
+    if 'ingredients' in fields:
+        ingredients = catalog.get_ingredients({
+            link.ingredient_id
+            for recipe in recipes for link in recipe.ingredient_links.all()})
+    if 'tags' in fields:
+        tag_ids = load_tag_ids(recipes)
+        tags = catalog.get_tags(set().union(*tag_ids.values()))
+    bases = {}
+    for recipe in recipes:
+        base = {}
+        for field in fields:
+            if field == 'ingredients':
+                base[field] = serialize_ingredient_links(
+                    recipe.ingredient_links.all(), ingredients)
+            elif field == 'tags':
+                base[field] = serialize_recipe_tags(tag_ids[recipe.id], tags)
+            elif field == 'author':
+                base[field] = serialize_user(recipe.author, None, None)
+            elif field == 'image':
+                base[field] = file_url(recipe.image, None)
+            else:
+                base[field] = getattr(recipe, field)
+        bases[recipe.id] = base
+    return bases
+
+
+def absolute_url(url, request):
+    if url and request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def merge_recipe(base, recipe, request, fields):
+    """
+    Представление рецепта из общей части и флагов пользователя.
+
+    is_favorited и is_in_shopping_cart берутся из аннотаций рецепта,
+    подписка на автора — из аннотации author_is_subscribed, если она
+    есть, иначе из множества подписок запроса.
+    """
+
+    data = {}
+    for field in fields:
+        if field in ('is_favorited', 'is_in_shopping_cart'):
+            data[field] = getattr(recipe, field)
+        elif field == 'author':
+            author = dict(base[field])
+            author_is_subscribed = getattr(
+                recipe, 'author_is_subscribed', None)
+            author['is_subscribed'] = (
+                is_following(recipe.author_id, request)
+                if author_is_subscribed is None else author_is_subscribed)
+            author['avatar'] = absolute_url(author['avatar'], request)
+            data[field] = author
+        elif field == 'image':
+            data[field] = absolute_url(base[field], request)
+        else:
+            data[field] = base[field]
+    return data
+
+
+class FastRecipeListSerializer(ListSerializer):
+    """Собирает общие части всех рецептов страницы за один проход."""
+
+    def to_representation(self, data):
+        from .recipe_cache import get_recipe_bases
+
+        recipes = list(data.all() if isinstance(data, Manager) else data)
+        request = self.context.get('request')
+        bases = get_recipe_bases(recipes, request)
+        fields = get_recipe_fields(request)
+        return [merge_recipe(bases[recipe.id], recipe, request, fields)
+                for recipe in recipes if recipe.id in bases]
+
+
+class FastRecipeSerializer(BaseSerializer):
+    """
+    Представление рецепта, как у RecipeDetailSerializer.
+
+    Строит словарь напрямую, минуя поля DRF; ключи и их порядок
+    совпадают, поэтому ответ остаётся тем же байт-в-байт. Общая для всех
+    пользователей часть берётся из кэша представлений
+    (см. recipe_cache.get_recipe_bases), флаги пользователя
+    подставляются поверх неё. Ожидает queryset из
+    RecipeViewSet.get_queryset, где флаги is_favorited и
+    is_in_shopping_cart посчитаны аннотациями.
+
+    Набор полей ответа задаётся параметрами fields и omit запроса
+    (см. get_recipe_fields).
+    """
+
+    class Meta:
+        list_serializer_class = FastRecipeListSerializer
+
+    def to_representation(self, instance):
+        from .recipe_cache import get_recipe_bases
+
+        request = self.context.get('request')
+        base = get_recipe_bases([instance], request)[instance.id]
+        return merge_recipe(base, instance, request,
+                            get_recipe_fields(request))
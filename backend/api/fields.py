@@ -0,0 +1,71 @@
+from django.core.files.uploadedfile import UploadedFile
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from rest_framework.fields import ImageField
+from rest_framework.serializers import PrimaryKeyRelatedField, ValidationError
+
+from recipes.catalog import catalog
+from recipes.constants import MAX_IMAGE_SIDE, MAX_IMAGE_SIZE
+
+IMAGE_TOO_LARGE = (f'Размер изображения не должен превышать '
+                   f'{MAX_IMAGE_SIZE // (1024 * 1024)} МБ.')
+
+
+class LimitedImageField(ImageField):
+    """
+    Поле изображения с ограничением размера файла и сторон картинки.
+
+    Размеры проверяются по заголовку файла, до полного декодирования.
+    """
+
+    def to_internal_value(self, data):
+        if data.size > MAX_IMAGE_SIZE:
+            raise ValidationError(IMAGE_TOO_LARGE)
+        try:
+            width, height = Image.open(data).size
+        except (OSError, Image.DecompressionBombError):
+            raise ValidationError(self.error_messages['invalid_image'])
+        finally:
+            data.seek(0)
+        if max(width, height) > MAX_IMAGE_SIDE:
+            raise ValidationError(
+                f'Стороны изображения не должны превышать '
+                f'{MAX_IMAGE_SIDE} пикселей.')
+        return super().to_internal_value(data)
+
+
+class ImageUploadField(Base64ImageField, LimitedImageField):
+    """
+    Изображение строкой Base64 в JSON или файлом в multipart/form-data.
+
+    Файлы из multipart Django сохраняет во временные файлы, поэтому
+    большие изображения не загружаются в память воркера целиком.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            return LimitedImageField.to_internal_value(self, data)
+        if isinstance(data, str) and len(data) * 3 // 4 > MAX_IMAGE_SIZE:
+            raise ValidationError(IMAGE_TOO_LARGE)
+        return super().to_internal_value(data)
+
+
+class CatalogTagField(PrimaryKeyRelatedField):
+    """
+    Тег по id из каталога процесса вместо запроса к базе.
+
+    Ошибки те же, что у PrimaryKeyRelatedField: id приводится к int,
+    как это сделал бы фильтр по первичному ключу.
+    """
+
+    def to_internal_value(self, data):
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            tag_id = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        tags = catalog.get_tags([tag_id])
+        if not tags:
+            self.fail('does_not_exist', pk_value=data)
+        return tags[0]
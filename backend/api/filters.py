@@ -1,35 +1,81 @@
 import django_filters
+from django.db.models import Exists, F, OuterRef
 from django_filters import rest_framework as filters
 
-from recipes.models import Ingredient, Recipe
+from recipes.catalog import get_tag_ids_by_slug
+from recipes.models import Favourite, Ingredient, Recipe, ShoppingCart
+
+
+def tag_choices():
+    return [(slug, slug) for slug in get_tag_ids_by_slug()]
 
 
 class RecipeFilter(filters.FilterSet):
-    """Фильтр для модели Recipe."""
+    """
+    Фильтр для модели Recipe.
+
+    Каждый фильтр добавляет к запросу подзапрос EXISTS вместо JOIN,
+    поэтому рецепты не дублируются, а допустимые слаги тегов берутся
+    из кэша, а не из отдельного запроса.
+    """
     is_favorited = filters.CharFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.CharFilter(
         method='filter_is_in_shopping_cart')
-    tags = filters.AllValuesMultipleFilter(
-        field_name='tags__slug'
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices,
+        method='filter_tags'
+    )
+    author = filters.NumberFilter(field_name='author_id')
+    ordering = filters.ChoiceFilter(
+        choices=(
+            ('popular', 'Популярные за всё время'),
+            ('popular_week', 'Популярные за неделю'),
+            ('trending', 'Популярные за сутки'),
+        ),
+        method='filter_ordering'
     )
 
+    ORDERING_FIELDS = {
+        'popular': 'popularity__total_score',
+        'popular_week': 'popularity__week_score',
+        'trending': 'popularity__day_score',
+    }
+
     class Meta:
         model = Recipe
-        fields = ('is_favorited', 'is_in_shopping_cart', 'tags', 'author',)
+        fields = ('is_favorited', 'is_in_shopping_cart', 'tags', 'author',
+                  'ordering',)
 
     def filter_is_favorited(self, queryset, name, value):
         user = self.request.user
         if value == '1' and user.is_authenticated:
-            return queryset.filter(recipes_favourite_recipe_related__user=user)
+            return queryset.filter(Exists(Favourite.objects.filter(
+                user=user, recipe=OuterRef('pk'))))
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
         if value == '1' and user.is_authenticated:
-            return queryset.filter(
-                recipes_shoppingcart_recipe_related__user=user)
+            return queryset.filter(Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))))
         return queryset
 
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        # Каталог мог обновиться после проверки слагов формой: удалённые
+        # теги пропускаем.
+        tag_ids = get_tag_ids_by_slug()
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk'),
+            tag_id__in=[tag_ids[slug] for slug in value if slug in tag_ids])))
+
+    def filter_ordering(self, queryset, name, value):
+        """Сортирует по заранее посчитанному рейтингу популярности."""
+
+        return queryset.order_by(
+            F(self.ORDERING_FIELDS[value]).desc(nulls_last=True), '-id')
+
 
 class IngredientFilter(django_filters.FilterSet):
     """Фильтр для ингредиентов."""
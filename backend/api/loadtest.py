@@ -0,0 +1,313 @@
+import http.client
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from .constants import LOAD_TEST_TIMEOUT
+
+VARIABLE_RE = re.compile(r'{{(\w+)}}')
+EXPECTED_STATUS_RE = re.compile(r'Статус-код ответа должен быть (\d{3})')
+
+SCENARIOS = {
+    'anonymous_browsing': (
+        'get_recipes_list // No Auth',
+        'get_tag_list // No Auth',
+        'get_recipe_detail // No Auth',
+    ),
+    'favouriting': (
+        'get_recipes_list // User',
+        'add_to_favorite // User',
+        'get_recipes_list_with_is_favorited_param // User',
+        'remove_from_favorite // User',
+    ),
+    'shopping_cart': (
+        'add_to_shopping_cart // User',
+        'download_shopping_cart // User',
+        'remove_from_shopping_cart // User',
+    ),
+    'subscriptions': (
+        'create_subscription // User',
+        'get_subscription_list_with_recipes_limit_param // User',
+        'delete_first_subscription // User',
+    ),
+}
+DEFAULT_WEIGHTS = {
+    'anonymous_browsing': 60,
+    'favouriting': 20,
+    'shopping_cart': 10,
+    'subscriptions': 10,
+}
+
+
+class CollectionRequest:
+    """Запрос коллекции Postman с шаблонами переменных."""
+
+    def __init__(self, item):
+        request = item['request']
+        url = request['url']
+        self.name = item['name']
+        self.method = request['method']
+        self.url = url['raw'] if isinstance(url, dict) else url
+        self.headers = {header['key']: header['value']
+                        for header in request.get('header', ())
+                        if not header.get('disabled')}
+        self.body = (request.get('body') or {}).get('raw')
+        self.authenticated = (request.get('auth') or {}).get(
+            'type') == 'apikey'
+        self.expected_status = None
+        for event in item.get('event', ()):
+            match = EXPECTED_STATUS_RE.search(
+                '\n'.join(event.get('script', {}).get('exec', ())))
+            if match:
+                self.expected_status = int(match[1])
+                break
+
+    @property
+    def endpoint(self):
+        """Метод и путь без baseUrl: ключ, по которому копится статистика."""
+
+        return f'{self.method} {self.url.replace("{{baseUrl}}", "")}'
+
+    def render(self, variables):
+        def substitute(text):
+            return VARIABLE_RE.sub(
+                lambda match: str(variables.get(match[1], match[0])), text)
+
+        headers = {key: substitute(value)
+                   for key, value in self.headers.items()}
+        if self.authenticated:
+            headers['Authorization'] = f'Token {variables["userToken"]}'
+        body = substitute(self.body).encode() if self.body else None
+        return (substitute(self.url.replace('{{baseUrl}}', '')), headers,
+                body)
+
+    def is_success(self, status):
+        if self.expected_status is not None:
+            return status == self.expected_status
+        return status < 400
+
+
+def load_collection(path):
+    """Запросы коллекции по именам, включая вложенные папки."""
+
+    with open(path, encoding='utf-8') as file:
+        items = list(json.load(file)['item'])
+    requests = {}
+    while items:
+        item = items.pop()
+        if 'item' in item:
+            items.extend(item['item'])
+        else:
+            requests[item['name']] = CollectionRequest(item)
+    return requests
+
+
+class Fixtures:
+    """Данные, записанные seed_load_test."""
+
+    def __init__(self, path):
+        with open(path, encoding='utf-8') as file:
+            data = json.load(file)
+        self.users = data['users']
+        self.recipes = data['recipes']
+        self.authors = data['authors']
+        self.tags = data['tags']
+        self.ingredients = data['ingredients']
+
+    def variables(self, user, rng):
+        """Значения переменных коллекции для одной итерации сценария."""
+
+        tags = rng.sample(self.tags, min(3, len(self.tags)))
+        ingredient = rng.choice(self.ingredients)
+        return {
+            'userToken': user['token'],
+            'userId': user['id'],
+            'firstRecipeId': rng.choice(self.recipes),
+            'secondUserId': rng.choice(self.authors),
+            'thirdUserId': rng.choice(self.authors),
+            'firstTagId': tags[0]['id'],
+            'secondTagSlug': tags[1 % len(tags)]['slug'],
+            'thirdTagSlug': tags[2 % len(tags)]['slug'],
+            'firstIndredientId': ingredient['id'],
+            'ingredientNameFirstLatter': ingredient['name'][:1],
+        }
+
+
+class Stats:
+    """Замеры одного виртуального пользователя по эндпоинтам."""
+
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.scenarios = defaultdict(int)
+
+    def record(self, endpoint, elapsed, status, success):
+        self.timings[endpoint].append(elapsed)
+        self.statuses[endpoint][status] += 1
+        if not success:
+            self.errors[endpoint] += 1
+
+    def merge(self, other):
+        for endpoint, timings in other.timings.items():
+            self.timings[endpoint].extend(timings)
+            self.errors[endpoint] += other.errors[endpoint]
+            for status, count in other.statuses[endpoint].items():
+                self.statuses[endpoint][status] += count
+        for scenario, count in other.scenarios.items():
+            self.scenarios[scenario] += count
+
+
+def percentile(timings, percent):
+    """Перцентиль percent отсортированного списка замеров."""
+
+    return timings[min(len(timings) - 1, int(len(timings) * percent / 100))]
+
+
+class VirtualUser(threading.Thread):
+    """
+    Поток, который до окончания теста выполняет случайные сценарии.
+
+    У каждого виртуального пользователя своё соединение keep-alive и
+    свой засеянный пользователь, поэтому добавления в избранное, корзину
+    и подписки разных потоков не конфликтуют.
+    """
+
+    def __init__(self, runner, user, rng, start_at):
+        super().__init__(daemon=True)
+        self.runner = runner
+        self.user = user
+        self.rng = rng
+        self.start_at = start_at
+        self.stats = Stats()
+        self.connection = None
+
+    def connect(self):
+        url = self.runner.base_url
+        connection_class = (http.client.HTTPSConnection
+                            if url.scheme == 'https'
+                            else http.client.HTTPConnection)
+        return connection_class(url.netloc, timeout=LOAD_TEST_TIMEOUT)
+
+    def send(self, request, variables):
+        path, headers, body = request.render(variables)
+        if self.connection is None:
+            self.connection = self.connect()
+        started = time.perf_counter()
+        try:
+            self.connection.request(request.method, self.runner.prefix + path,
+                                    body=body, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            status = 0
+        return time.perf_counter() - started, status
+
+    def run(self):
+        time.sleep(max(0, self.start_at - time.monotonic()))
+        runner = self.runner
+        while time.monotonic() < runner.deadline:
+            scenario = self.rng.choices(runner.scenario_names,
+                                        runner.scenario_weights)[0]
+            variables = runner.fixtures.variables(self.user, self.rng)
+            for name in SCENARIOS[scenario]:
+                request = runner.requests[name]
+                elapsed, status = self.send(request, variables)
+                self.stats.record(request.endpoint, elapsed, status,
+                                  request.is_success(status))
+                if runner.think_time:
+                    time.sleep(self.rng.uniform(0, 2 * runner.think_time))
+            self.stats.scenarios[scenario] += 1
+        if self.connection is not None:
+            self.connection.close()
+
+
+class LoadTest:
+    """
+    Нагрузочный тест по запросам коллекции Postman.
+
+    Виртуальные пользователи запускаются равномерно за ramp_up секунд
+    и выполняют сценарии с заданными весами до истечения duration
+    секунд от старта. Ошибкой считается ответ со статусом, отличным
+    от ожидаемого в тестах коллекции, и любой сбой соединения.
+    """
+
+    def __init__(self, base_url, requests, fixtures, users, duration,
+                 ramp_up=0, think_time=0, weights=None, seed=None):
+        self.base_url = urlsplit(base_url)
+        self.prefix = self.base_url.path.rstrip('/')
+        self.requests = requests
+        self.fixtures = fixtures
+        self.users = users
+        self.duration = duration
+        self.ramp_up = ramp_up
+        self.think_time = think_time
+        weights = {name: weight
+                   for name, weight in (weights or DEFAULT_WEIGHTS).items()
+                   if weight > 0}
+        self.scenario_names = list(weights)
+        self.scenario_weights = list(weights.values())
+        self.rng = random.Random(seed)
+        self.deadline = None
+        missing = {name for scenario in self.scenario_names
+                   for name in SCENARIOS[scenario]} - requests.keys()
+        if missing:
+            raise ValueError(
+                f'В коллекции нет запросов: {", ".join(sorted(missing))}.')
+        if len(fixtures.users) < users:
+            raise ValueError(
+                f'Засеяно пользователей: {len(fixtures.users)}, '
+                f'нужно {users}.')
+
+    def run(self):
+        started = time.monotonic()
+        self.deadline = started + self.duration
+        step = self.ramp_up / self.users if self.users else 0
+        threads = [
+            VirtualUser(self, user, random.Random(self.rng.random()),
+                        started + index * step)
+            for index, user in enumerate(
+                self.rng.sample(self.fixtures.users, self.users))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        stats = Stats()
+        for thread in threads:
+            stats.merge(thread.stats)
+        return self.report(stats, elapsed)
+
+    def report(self, stats, elapsed):
+        endpoints = {}
+        for endpoint, timings in sorted(stats.timings.items()):
+            timings.sort()
+            endpoints[endpoint] = {
+                'requests': len(timings),
+                'rps': len(timings) / elapsed,
+                'error_rate': stats.errors[endpoint] / len(timings),
+                'p50_ms': percentile(timings, 50) * 1000,
+                'p95_ms': percentile(timings, 95) * 1000,
+                'p99_ms': percentile(timings, 99) * 1000,
+                'statuses': {str(status): count for status, count
+                             in sorted(stats.statuses[endpoint].items())},
+            }
+        total = sum(item['requests'] for item in endpoints.values())
+        errors = sum(stats.errors.values())
+        return {
+            'users': self.users,
+            'duration': elapsed,
+            'requests': total,
+            'rps': total / elapsed,
+            'error_rate': errors / total if total else 0,
+            'scenarios': dict(stats.scenarios),
+            'endpoints': endpoints,
+        }
@@ -0,0 +1,77 @@
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.admission import admit
+from api.loadtest import percentile
+from api.models import AdmissionBucket, AdmissionLease
+
+BENCHMARK_NAME = 'benchmark'
+BENCHMARK_LIMITS = {
+    'user_rate': '1000000/s',
+    'global_rate': '1000000/s',
+    'user_concurrency': 64,
+    'global_concurrency': 64,
+}
+
+
+class Command(BaseCommand):
+    help = ('Измеряет накладные расходы ограничителя запросов: время '
+            'проверки лимитов и освобождения слотов')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations', type=int, default=1000,
+            help='Число проверок в каждом потоке.')
+        parser.add_argument(
+            '--threads', type=int, default=1,
+            help='Число параллельных потоков.')
+        parser.add_argument(
+            '--users', type=int, default=100,
+            help='Число разных клиентов, между которыми делятся проверки.')
+
+    def handle(self, *args, **options):
+        with CaptureQueriesContext(connection) as queries:
+            admit(BENCHMARK_NAME, BENCHMARK_LIMITS, 'user:0').release()
+        timings = []
+        lock = threading.Lock()
+
+        def worker(number):
+            local = []
+            try:
+                for iteration in range(options['iterations']):
+                    ident = f'user:{(number + iteration) % options["users"]}'
+                    started = time.perf_counter()
+                    admit(BENCHMARK_NAME, BENCHMARK_LIMITS, ident).release()
+                    local.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+            with lock:
+                timings.extend(local)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(number,))
+                   for number in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        AdmissionBucket.objects.filter(
+            key__startswith=BENCHMARK_NAME).delete()
+        AdmissionLease.objects.filter(
+            key__startswith=BENCHMARK_NAME).delete()
+        timings.sort()
+        self.stdout.write(
+            f'Запросов к базе на проверку: {len(queries)}\n'
+            f'Проверок: {len(timings)} за {elapsed:.2f} с '
+            f'({len(timings) / elapsed:.0f} в секунду)\n'
+            f'Среднее: {statistics.mean(timings) * 1000:.3f} мс\n'
+            f'p50: {percentile(timings, 50) * 1000:.3f} мс\n'
+            f'p95: {percentile(timings, 95) * 1000:.3f} мс\n'
+            f'p99: {percentile(timings, 99) * 1000:.3f} мс')
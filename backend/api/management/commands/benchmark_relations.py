@@ -0,0 +1,139 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.loadtest import percentile
+from api.partitioning import PARTITIONED_MODELS
+from recipes.constants import PAGE_SIZE
+from recipes.models import Favourite, Recipe, ShoppingCart
+from users.models import Follow, User
+
+SEED_SQL = '''
+INSERT INTO {table} ({columns})
+SELECT pair.user_id, pair.target_id{extra}
+FROM (
+    SELECT u.ids[1 + floor(random() * array_length(u.ids, 1))::int]
+               AS user_id,
+           t.ids[1 + floor(random() * array_length(t.ids, 1))::int]
+               AS target_id
+    FROM generate_series(1, %s),
+         (SELECT array_agg(id) AS ids FROM {users}) u,
+         (SELECT array_agg(id) AS ids FROM {targets}) t
+) pair
+WHERE pair.user_id <> pair.target_id OR %s
+ON CONFLICT DO NOTHING
+'''
+STATS_SQL = '''
+SELECT rel.relname, pg_total_relation_size(rel.oid),
+       stat.n_live_tup, stat.n_dead_tup, stat.autovacuum_count,
+       stat.last_autovacuum
+FROM pg_class rel
+LEFT JOIN pg_stat_user_tables stat ON stat.relid = rel.oid
+WHERE rel.oid = %s::regclass
+   OR rel.oid IN (SELECT inhrelid FROM pg_inherits
+                  WHERE inhparent = %s::regclass)
+ORDER BY rel.relname
+'''
+
+
+def favourite_queries(user_id):
+    list(Favourite.objects.filter(user_id=user_id).values_list(
+        'recipe_id', flat=True))
+
+
+def shopping_cart_queries(user_id):
+    list(ShoppingCart.objects.filter(user_id=user_id).values_list(
+        'recipe_id', flat=True))
+
+
+def follow_queries(user_id):
+    list(Follow.objects.filter(user_id=user_id).order_by('-id').values_list(
+        'author_id', flat=True)[:PAGE_SIZE])
+
+
+QUERIES = {
+    Favourite: favourite_queries,
+    ShoppingCart: shopping_cart_queries,
+    Follow: follow_queries,
+}
+
+
+class Command(BaseCommand):
+    help = ('Измеряет время запросов одного пользователя к избранному, '
+            'корзинам и подпискам и показывает состояние очистки таблиц')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--samples', type=int, default=1000,
+            help='Число случайных пользователей для замеров.')
+        parser.add_argument(
+            '--seed-rows', type=int, default=0,
+            help='Сначала добавить столько случайных строк в каждую таблицу '
+                 'из существующих пользователей и рецептов.')
+        parser.add_argument(
+            '--vacuum', action='store_true',
+            help='Выполнить VACUUM каждой таблицы или секции и замерить '
+                 'время.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Замеры рассчитаны на PostgreSQL.')
+        if options['seed_rows']:
+            self.seed(options['seed_rows'])
+        user_ids = list(User.objects.order_by('?').values_list(
+            'id', flat=True)[:options['samples']])
+        for model in PARTITIONED_MODELS:
+            table = model._meta.db_table
+            timings = []
+            for user_id in user_ids:
+                started = time.perf_counter()
+                QUERIES[model](user_id)
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            self.stdout.write(self.style.MIGRATE_HEADING(table))
+            if timings:
+                self.stdout.write(
+                    f'Запросы пользователя: p50 '
+                    f'{percentile(timings, 50) * 1000:.3f} мс, '
+                    f'p95 {percentile(timings, 95) * 1000:.3f} мс, '
+                    f'p99 {percentile(timings, 99) * 1000:.3f} мс')
+            self.write_stats(table, options['vacuum'])
+
+    def seed(self, rows):
+        targets = {
+            Favourite: Recipe._meta.db_table,
+            ShoppingCart: Recipe._meta.db_table,
+            Follow: User._meta.db_table,
+        }
+        for model in PARTITIONED_MODELS:
+            target = model._meta.get_field(
+                'author' if model is Follow else 'recipe').column
+            columns = ['user_id', target]
+            extra = ''
+            if model is not Follow:
+                columns.append('created_at')
+                extra = ", now() - random() * interval '365 days'"
+            with connection.cursor() as cursor:
+                cursor.execute(SEED_SQL.format(
+                    table=model._meta.db_table, columns=', '.join(columns),
+                    extra=extra, users=User._meta.db_table,
+                    targets=targets[model]), [rows, model is not Follow])
+                self.stdout.write(
+                    f'{model._meta.db_table}: добавлено {cursor.rowcount}')
+
+    def write_stats(self, table, vacuum):
+        with connection.cursor() as cursor:
+            cursor.execute(STATS_SQL, [table, table])
+            relations = cursor.fetchall()
+            for name, size, live, dead, vacuums, last in relations:
+                line = (f'  {name}: {size / 2 ** 20:.1f} МБ, живых строк '
+                        f'{live}, мёртвых {dead}, автоочисток {vacuums}, '
+                        f'последняя {last}')
+                if vacuum and (len(relations) == 1 or name != table):
+                    started = time.perf_counter()
+                    cursor.execute(
+                        f'VACUUM {connection.ops.quote_name(name)}')
+                    line += (f', VACUUM '
+                             f'{time.perf_counter() - started:.2f} с')
+                self.stdout.write(line)
@@ -0,0 +1,150 @@
+import multiprocessing
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
+from django.test import Client, override_settings
+from rest_framework.authtoken.models import Token
+
+from api.loadtest import percentile
+from users.models import User
+
+MODES = (('поток', True), ('целиком', False))
+
+
+def read_status(field):
+    """Поле /proc/self/status в байтах или None вне Linux."""
+
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith(f'{field}:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+
+
+def fetch(client, path):
+    """Время до первого байта, полное время и размер ответа."""
+
+    started = time.perf_counter()
+    response = client.get(path)
+    if response.status_code != 200:
+        raise CommandError(f'{path}: статус {response.status_code}.')
+    if response.streaming:
+        parts = iter(response.streaming_content)
+        size = len(next(parts, b''))
+        first_byte = time.perf_counter() - started
+        size += sum(len(part) for part in parts)
+    else:
+        first_byte = time.perf_counter() - started
+        size = len(response.content)
+    response.close()
+    return first_byte, time.perf_counter() - started, size
+
+
+def measure(token, path, streaming, repeats):
+    """
+    Замеры одного эндпоинта в одном режиме.
+
+    Выполняется в отдельном процессе, чтобы пик RSS не наследовал
+    память предыдущих замеров.
+    """
+
+    client = Client(HTTP_AUTHORIZATION=f'Token {token}',
+                    HTTP_ACCEPT='application/json')
+    with override_settings(ALLOWED_HOSTS=['testserver'],
+                           ADMISSION_CONTROL=False,
+                           STREAM_JSON_RESPONSES=streaming):
+        fetch(client, path)
+        base_rss = read_status('VmRSS')
+        reset_peak_rss()
+        first_bytes, totals = [], []
+        for _ in range(repeats):
+            first_byte, total, size = fetch(client, path)
+            first_bytes.append(first_byte)
+            totals.append(total)
+        peak_rss = read_status('VmHWM')
+        tracemalloc.start()
+        fetch(client, path)
+        heap_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    first_bytes.sort()
+    totals.sort()
+    return {
+        'ttfb_p50': percentile(first_bytes, 50),
+        'ttfb_p95': percentile(first_bytes, 95),
+        'total_p50': percentile(totals, 50),
+        'size': size,
+        'heap_peak': heap_peak,
+        'rss_growth': (peak_rss - base_rss
+                       if peak_rss is not None and base_rss is not None
+                       else None),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает потоковую и обычную отдачу больших списков: время '
+            'до первого байта, полное время и пиковую память')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Email пользователя; по умолчанию — с наибольшим числом '
+                 'подписок.')
+        parser.add_argument(
+            '--limit', type=int, default=100,
+            help='Размер страницы рецептов и подписок.')
+        parser.add_argument(
+            '--repeats', type=int, default=20,
+            help='Число запросов на каждый замер.')
+        parser.add_argument(
+            'paths', nargs='*',
+            help='Адреса для замера вместо стандартных.')
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['user']:
+            users = users.filter(email=options['user'])
+        user = users.annotate(follows=Count('follower')).order_by(
+            '-follows').first()
+        if user is None:
+            raise CommandError('Пользователь не найден.')
+        token, _ = Token.objects.get_or_create(user=user)
+        limit = options['limit']
+        paths = options['paths'] or [
+            f'/api/recipes/?limit={limit}',
+            f'/api/users/subscriptions/?limit={limit}&recipes_limit=3',
+            '/api/ingredients/',
+        ]
+        # Процессы замеров открывают свои соединения.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        self.stdout.write(
+            f'{"":52}  {"режим":>8}  {"TTFB p50":>9}  {"TTFB p95":>9}  '
+            f'{"всего p50":>9}  {"куча":>8}  {"RSS":>8}  {"размер":>8}')
+        for path in paths:
+            for mode, streaming in MODES:
+                with context.Pool(1) as pool:
+                    result = pool.apply(measure, (token.key, path, streaming,
+                                                  options['repeats']))
+                rss = ('—' if result['rss_growth'] is None
+                       else f'{result["rss_growth"] / 2 ** 20:.1f} МБ')
+                self.stdout.write(
+                    f'{path:52}  {mode:>8}  '
+                    f'{result["ttfb_p50"] * 1000:>6.1f} мс  '
+                    f'{result["ttfb_p95"] * 1000:>6.1f} мс  '
+                    f'{result["total_p50"] * 1000:>6.1f} мс  '
+                    f'{result["heap_peak"] / 2 ** 20:>5.1f} МБ  {rss:>8}  '
+                    f'{result["size"] / 1024:>5.0f} КБ')
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import shutil
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.constants import MEDIA_GC_CHUNK_SIZE, MEDIA_GC_GRACE_PERIOD
+from recipes.models import Recipe
+from users.models import User
+
+MEDIA_FIELDS = (
+    (Recipe, 'image'),
+    (User, 'avatar'),
+)
+
+
+def fingerprint(name):
+    """
+    Восьмибайтовый отпечаток имени файла.
+
+    Множество отпечатков в несколько раз меньше множества строк.
+    Совпадение отпечатков у разных имён лишь оставляет файл на месте,
+    поэтому удалить нужный файл из-за него нельзя.
+    """
+
+    return int.from_bytes(
+        hashlib.blake2b(name.encode(), digest_size=8).digest(), 'big')
+
+
+def load_references():
+    references = set()
+    for model, field in MEDIA_FIELDS:
+        names = model.objects.exclude(**{field: ''}).exclude(
+            **{f'{field}__isnull': True}).values_list(field, flat=True)
+        for name in names.iterator(chunk_size=MEDIA_GC_CHUNK_SIZE):
+            references.add(fingerprint(name))
+    return references
+
+
+def walk_files(root, directory):
+    """
+    Файлы каталога и подкаталогов через os.scandir.
+
+    В памяти держится только стек непройденных каталогов, а не список
+    файлов. Возвращает пары (имя относительно root, os.DirEntry).
+    """
+
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = os.scandir(os.path.join(root, current))
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                name = f'{current}/{entry.name}'
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(name)
+                elif entry.is_file(follow_symlinks=False):
+                    yield name, entry
+
+
+class Command(BaseCommand):
+    help = ('Удаляет или переносит в карантин файлы изображений рецептов '
+            'и аватаров, на которые не ссылается ни одна запись')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-period', type=int, default=MEDIA_GC_GRACE_PERIOD,
+            help='Не трогать файлы моложе стольких секунд.')
+        parser.add_argument(
+            '--quarantine',
+            help='Переносить файлы в этот каталог вместо удаления.')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать файлы без ссылок.')
+
+    def handle(self, *args, **options):
+        root = settings.MEDIA_ROOT
+        quarantine = options['quarantine']
+        if quarantine and os.path.commonpath(
+                [os.path.realpath(quarantine), os.path.realpath(root)]
+        ) == os.path.realpath(root):
+            raise CommandError('Каталог карантина не должен находиться '
+                               'внутри MEDIA_ROOT: nginx раздаёт его.')
+        started = time.monotonic()
+        references = load_references()
+        self.stdout.write(
+            f'Ссылок на файлы: {len(references)}, загружены за '
+            f'{time.monotonic() - started:.1f} с.')
+        deadline = time.time() - options['grace_period']
+        directories = {
+            model._meta.get_field(field).upload_to.strip('/')
+            for model, field in MEDIA_FIELDS
+        }
+        scanned = recent = removed = removed_bytes = 0
+        walk_started = time.monotonic()
+        for directory in sorted(directories):
+            for name, entry in walk_files(root, directory):
+                scanned += 1
+                if fingerprint(name) in references:
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+                if stat.st_mtime > deadline:
+                    recent += 1
+                    continue
+                removed += 1
+                removed_bytes += stat.st_size
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'  {name}')
+                if options['dry_run']:
+                    continue
+                if quarantine:
+                    target = os.path.join(quarantine, name)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.move(entry.path, target)
+                else:
+                    os.remove(entry.path)
+        elapsed = time.monotonic() - walk_started
+        action = ('Без ссылок' if options['dry_run']
+                  else 'В карантин' if quarantine else 'Удалено')
+        self.stdout.write(self.style.SUCCESS(
+            f'Просмотрено файлов: {scanned} за {elapsed:.1f} с '
+            f'({scanned / elapsed if elapsed else 0:.0f} в секунду). '
+            f'{action}: {removed} ({removed_bytes / 2 ** 20:.1f} МБ), '
+            f'моложе срока: {recent}.'))
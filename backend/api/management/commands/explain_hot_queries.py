@@ -0,0 +1,118 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.views import (IngredientViewSet, RecipeViewSet,
+                       shopping_list_ingredients)
+from recipes.constants import PAGE_SIZE
+from recipes.models import IngredientInRecipe, Recipe
+from users.models import Follow, User
+
+PROBLEM_NODES = ('Seq Scan', 'Sort')
+
+
+def viewset_queryset(viewset_class, user, params=None, action='list'):
+    """Queryset, который вьюсет строит для запроса с параметрами."""
+
+    django_request = APIRequestFactory().get('/', params or {})
+    force_authenticate(django_request, user=user)
+    request = Request(django_request)
+    request.user = user
+    view = viewset_class(request=request, action=action,
+                         format_kwarg=None, kwargs={}, args=())
+    return view.filter_queryset(view.get_queryset())
+
+
+def hot_querysets(user):
+    """Запросы, стоящие за самыми нагруженными эндпоинтами."""
+
+    recipe = Recipe.objects.order_by('-id').first()
+    tag_slugs = list(recipe.tags.values_list('slug', flat=True)
+                     if recipe else [])
+    return {
+        'recipes': viewset_queryset(RecipeViewSet, user)[:PAGE_SIZE],
+        'recipes by author': viewset_queryset(
+            RecipeViewSet, user,
+            {'author': recipe.author_id if recipe else 0})[:PAGE_SIZE],
+        'recipes by tags': viewset_queryset(
+            RecipeViewSet, user, {'tags': tag_slugs})[:PAGE_SIZE],
+        'favourite recipes': viewset_queryset(
+            RecipeViewSet, user, {'is_favorited': '1'})[:PAGE_SIZE],
+        'shopping cart recipes': viewset_queryset(
+            RecipeViewSet, user, {'is_in_shopping_cart': '1'})[:PAGE_SIZE],
+        'popular recipes': viewset_queryset(
+            RecipeViewSet, user, {'ordering': 'popular'})[:PAGE_SIZE],
+        'recipe ingredients': IngredientInRecipe.objects.filter(
+            recipe=recipe).select_related('ingredient'),
+        'ingredient search': viewset_queryset(
+            IngredientViewSet, user, {'name': 'а'}),
+        'subscriptions': Follow.objects.filter(user=user)[:PAGE_SIZE],
+        'author followers': Follow.objects.filter(
+            author=recipe.author_id if recipe else 0),
+        'shopping list': shopping_list_ingredients(user),
+    }
+
+
+def find_problems(plan, min_rows):
+    """Узлы плана с последовательным чтением или сортировкой строк."""
+
+    problems = []
+    nodes = [plan]
+    while nodes:
+        node = nodes.pop()
+        nodes.extend(node.get('Plans', ()))
+        rows = node.get('Actual Rows', 0) * node.get('Actual Loops', 1)
+        if node['Node Type'] in PROBLEM_NODES and rows >= min_rows:
+            target = node.get('Relation Name') or ', '.join(
+                node.get('Sort Key', ()))
+            problems.append(f'{node["Node Type"]} ({target}): {rows} строк')
+    return problems
+
+
+class Command(BaseCommand):
+    help = ('Выполняет EXPLAIN (ANALYZE, BUFFERS) для запросов нагруженных '
+            'эндпоинтов и ищет последовательные чтения и сортировки')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-rows', type=int, default=1000,
+            help='Минимальное число строк, с которого узел считается '
+                 'проблемным.')
+        parser.add_argument(
+            '--user', help='Email пользователя, от имени которого '
+                           'строятся запросы.')
+        parser.add_argument(
+            '--fail', action='store_true',
+            help='Завершиться с ошибкой, если найдены проблемы.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Команда работает только с PostgreSQL.')
+        users = User.objects.order_by('-id')
+        if options['user']:
+            users = users.filter(email=options['user'])
+        user = users.first()
+        if user is None:
+            raise CommandError('Пользователь не найден.')
+
+        found = 0
+        for name, queryset in hot_querysets(user).items():
+            plan = json.loads(queryset.explain(
+                format='json', analyze=True, buffers=True))[0]
+            problems = find_problems(plan['Plan'], options['min_rows'])
+            timing = f'{plan["Execution Time"]:.2f} мс'
+            if problems:
+                found += len(problems)
+                self.stdout.write(self.style.WARNING(f'{name}: {timing}'))
+                for problem in problems:
+                    self.stdout.write(f'  {problem}')
+            else:
+                self.stdout.write(f'{name}: {timing}')
+
+        if found and options['fail']:
+            raise CommandError(f'Найдено проблемных узлов: {found}.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверка завершена, проблемных узлов: {found}.'))
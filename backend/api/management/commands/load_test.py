@@ -0,0 +1,106 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.constants import LOAD_TEST_COLLECTION, LOAD_TEST_FIXTURES
+from api.loadtest import (DEFAULT_WEIGHTS, SCENARIOS, Fixtures, LoadTest,
+                          load_collection)
+
+DEFAULT_SCENARIOS = ', '.join(
+    f'{name}={weight}' for name, weight in DEFAULT_WEIGHTS.items())
+
+
+def parse_weight(value):
+    name, _, weight = value.partition('=')
+    if name not in SCENARIOS or not weight.isdigit():
+        raise ValueError(value)
+    return name, int(weight)
+
+
+class Command(BaseCommand):
+    help = ('Нагружает запущенный сервер сценариями из запросов коллекции '
+            'Postman и выводит пропускную способность, долю ошибок и '
+            'перцентили времени ответа по эндпоинтам')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url', default='http://localhost:8000',
+            help='Адрес сервера.')
+        parser.add_argument(
+            '--collection',
+            default=str(Path(settings.BASE_DIR).parent / 'postman_collection'
+                        / LOAD_TEST_COLLECTION),
+            help='Коллекция Postman.')
+        parser.add_argument(
+            '--fixtures', default=LOAD_TEST_FIXTURES,
+            help='Файл, записанный seed_load_test.')
+        parser.add_argument(
+            '--users', type=int, default=20,
+            help='Число одновременных виртуальных пользователей.')
+        parser.add_argument(
+            '--ramp-up', type=float, default=10,
+            help='За сколько секунд запустить всех пользователей.')
+        parser.add_argument(
+            '--duration', type=float, default=60,
+            help='Длительность теста в секундах, включая разгон.')
+        parser.add_argument(
+            '--think-time', type=float, default=0,
+            help='Средняя пауза между запросами пользователя в секундах.')
+        parser.add_argument(
+            '--scenario', action='append', type=parse_weight, default=[],
+            metavar='NAME=WEIGHT',
+            help=f'Вес сценария; по умолчанию {DEFAULT_SCENARIOS}. '
+                 f'Можно указать несколько раз.')
+        parser.add_argument(
+            '--seed', type=int, default=None,
+            help='Начальное значение генератора случайных чисел.')
+        parser.add_argument(
+            '--json', dest='json_output',
+            help='Записать отчёт в JSON-файл.')
+
+    def handle(self, *args, **options):
+        weights = dict(DEFAULT_WEIGHTS)
+        if options['scenario']:
+            weights = {name: 0 for name in SCENARIOS}
+            weights.update(options['scenario'])
+        try:
+            load_test = LoadTest(
+                options['base_url'],
+                load_collection(options['collection']),
+                Fixtures(options['fixtures']),
+                users=options['users'],
+                duration=options['duration'],
+                ramp_up=options['ramp_up'],
+                think_time=options['think_time'],
+                weights=weights,
+                seed=options['seed'],
+            )
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(error)
+        report = load_test.run()
+        self.write_report(report)
+        if options['json_output']:
+            with open(options['json_output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+    def write_report(self, report):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{report["users"]} пользователей, {report["duration"]:.1f} с, '
+            f'{report["requests"]} запросов, {report["rps"]:.1f} в секунду, '
+            f'ошибок {report["error_rate"]:.2%}'))
+        self.stdout.write('Сценарии: ' + ', '.join(
+            f'{name} {count}' for name, count in report['scenarios'].items()))
+        width = max((len(endpoint) for endpoint in report['endpoints']),
+                    default=0)
+        self.stdout.write(
+            f'{"":{width}}  {"запросов":>8}  {"в сек":>7}  {"ошибок":>7}  '
+            f'{"p50 мс":>8}  {"p95 мс":>8}  {"p99 мс":>8}')
+        for endpoint, item in report['endpoints'].items():
+            line = (f'{endpoint:{width}}  {item["requests"]:>8}  '
+                    f'{item["rps"]:>7.1f}  {item["error_rate"]:>7.2%}  '
+                    f'{item["p50_ms"]:>8.1f}  {item["p95_ms"]:>8.1f}  '
+                    f'{item["p99_ms"]:>8.1f}')
+            self.stdout.write(self.style.ERROR(line) if item['error_rate']
+                              else line)
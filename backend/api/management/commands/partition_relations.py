@@ -0,0 +1,89 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.constants import PARTITION_COPY_BATCH_SIZE, PARTITION_COUNT
+from api.partitioning import (PARTITIONED_MODELS, PartitioningError,
+                              PartitionMigration)
+
+TABLES = {model._meta.db_table: model for model in PARTITIONED_MODELS}
+
+
+class Command(BaseCommand):
+    help = ('Переносит избранное, корзины и подписки в таблицы, '
+            'секционированные по хэшу user_id, без остановки сервиса')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'step',
+            choices=['status', 'prepare', 'copy', 'verify', 'swap', 'abort'],
+            help='Шаг переноса.')
+        parser.add_argument(
+            '--table', choices=sorted(TABLES), action='append',
+            help='Таблица; по умолчанию все.')
+        parser.add_argument(
+            '--partitions', type=int, default=PARTITION_COUNT,
+            help='Число секций для prepare.')
+        parser.add_argument(
+            '--batch-size', type=int, default=PARTITION_COPY_BATCH_SIZE,
+            help='Размер пачки для copy.')
+        parser.add_argument(
+            '--start', type=int, default=0,
+            help='id, с которого продолжить copy.')
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Выполнить swap, даже если verify нашёл расхождение.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Секционирование доступно только в PostgreSQL.')
+        for table in options['table'] or TABLES:
+            migration = PartitionMigration(TABLES[table])
+            try:
+                getattr(self, options['step'])(migration, options)
+            except PartitioningError as error:
+                raise CommandError(error)
+
+    def status(self, migration, options):
+        self.stdout.write(f'{migration.table}: {migration.state()}')
+
+    def prepare(self, migration, options):
+        migration.prepare(options['partitions'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{migration.table}: создана {migration.new_table} '
+            f'из {options["partitions"]} секций.'))
+
+    def copy(self, migration, options):
+        total = 0
+        for position, copied in migration.copy(options['batch_size'],
+                                               options['start']):
+            total += copied
+            self.stdout.write(f'{migration.table}: id <= {position}, '
+                              f'перенесено {total}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{migration.table}: перенос завершён, строк {total}.'))
+
+    def verify(self, migration, options):
+        (old, old_checksum), (new, new_checksum) = migration.verify()
+        if (old, old_checksum) != (new, new_checksum):
+            raise PartitioningError(
+                f'{migration.table}: {old} строк, сумма {old_checksum}; '
+                f'в {migration.new_table} {new} строк, '
+                f'сумма {new_checksum}.')
+        self.stdout.write(self.style.SUCCESS(
+            f'{migration.table}: строк {old}, контрольные суммы '
+            f'совпадают.'))
+
+    def swap(self, migration, options):
+        try:
+            self.verify(migration, options)
+        except PartitioningError:
+            if not options['force']:
+                raise
+        migration.swap()
+        self.stdout.write(self.style.SUCCESS(
+            f'{migration.table}: секционированная таблица подключена.'))
+
+    def abort(self, migration, options):
+        migration.abort()
+        self.stdout.write(self.style.SUCCESS(
+            f'{migration.table}: подготовленная копия удалена.'))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.constants import ADMISSION_BUCKET_IDLE_TIMEOUT
+from api.models import AdmissionBucket, AdmissionLease
+
+
+class Command(BaseCommand):
+    help = ('Удаляет корзины токенов неактивных клиентов и просроченные '
+            'слоты ограничителя запросов')
+
+    def handle(self, *args, **kwargs):
+        now = time.time()
+        buckets, _ = AdmissionBucket.objects.filter(
+            updated_at__lt=now - ADMISSION_BUCKET_IDLE_TIMEOUT).delete()
+        leases, _ = AdmissionLease.objects.filter(
+            expires_at__lt=now).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено корзин: {buckets}, слотов: {leases}.'))
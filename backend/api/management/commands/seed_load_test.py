@@ -0,0 +1,175 @@
+import json
+import random
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from api.constants import (LOAD_TEST_EMAIL_DOMAIN, LOAD_TEST_FIXTURES,
+                           LOAD_TEST_IMAGE, LOAD_TEST_PASSWORD)
+from recipes.models import (Favourite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, Tag)
+from users.models import Follow, User
+
+SEED_TAGS = (
+    ('Завтрак', 'breakfast'),
+    ('Обед', 'lunch'),
+    ('Ужин', 'dinner'),
+)
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = ('Наполняет базу пользователями, рецептами и связями для '
+            'нагрузочного тестирования и записывает файл с данными '
+            'для load_test')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=1000,
+            help='Число пользователей.')
+        parser.add_argument(
+            '--authors', type=int, default=100,
+            help='Сколько из них публикуют рецепты.')
+        parser.add_argument(
+            '--recipes', type=int, default=2000,
+            help='Число рецептов.')
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Рецептов в избранном у каждого пользователя.')
+        parser.add_argument(
+            '--carts', type=int, default=5,
+            help='Рецептов в корзине у каждого пользователя.')
+        parser.add_argument(
+            '--follows', type=int, default=10,
+            help='Подписок у каждого пользователя.')
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Начальное значение генератора случайных чисел.')
+        parser.add_argument(
+            '--output', default=LOAD_TEST_FIXTURES,
+            help='Файл с данными для load_test.')
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Сначала удалить данные предыдущего наполнения.')
+
+    def handle(self, *args, **options):
+        seeded = User.objects.filter(
+            email__endswith=f'@{LOAD_TEST_EMAIL_DOMAIN}')
+        if options['clear']:
+            deleted, _ = seeded.delete()
+            self.stdout.write(f'Удалено объектов: {deleted}.')
+        elif seeded.exists():
+            raise CommandError('База уже наполнена; используйте --clear.')
+        if not 0 < options['authors'] < options['users'] // 2:
+            raise CommandError('Авторов должно быть меньше половины '
+                               'пользователей.')
+        if not Ingredient.objects.exists():
+            raise CommandError('Сначала загрузите ингредиенты: '
+                               'python manage.py import_ingredients.')
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            fixtures = self.seed(rng, options)
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(fixtures, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {options["users"]}, рецептов: '
+            f'{options["recipes"]}. Данные записаны в {options["output"]}.'))
+
+    def seed(self, rng, options):
+        """
+        Создаёт данные в обход сигналов через bulk_create.
+
+        Избранное, корзины и подписки создаются только на первую половину
+        рецептов и авторов; вторая половина остаётся для сценариев, чтобы
+        их добавления не натыкались на уже существующие связи.
+        """
+
+        password = make_password(LOAD_TEST_PASSWORD)
+        users = User.objects.bulk_create(
+            (User(email=f'load{i}@{LOAD_TEST_EMAIL_DOMAIN}',
+                  username=f'load{i}', first_name='Нагрузка',
+                  last_name=str(i), password=password)
+             for i in range(options['users'])),
+            batch_size=BATCH_SIZE)
+        if users[0].pk is None:
+            users = list(User.objects.filter(
+                email__endswith=f'@{LOAD_TEST_EMAIL_DOMAIN}').order_by('id'))
+        tokens = Token.objects.bulk_create(
+            (Token(key=Token.generate_key(), user=user) for user in users),
+            batch_size=BATCH_SIZE)
+        tags = [
+            Tag.objects.get_or_create(slug=slug, defaults={'name': name})[0]
+            for name, slug in SEED_TAGS
+        ]
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        image = self.save_image()
+        authors = users[:options['authors']]
+        Recipe.objects.bulk_create(
+            (Recipe(author=rng.choice(authors), name=f'Рецепт {i}',
+                    image=image, text='Описание рецепта.',
+                    cooking_time=rng.randint(5, 120))
+             for i in range(options['recipes'])),
+            batch_size=BATCH_SIZE)
+        recipe_ids = list(Recipe.objects.filter(
+            author__in=authors).order_by('id').values_list('id', flat=True))
+        IngredientInRecipe.objects.bulk_create(
+            (IngredientInRecipe(recipe_id=recipe_id, ingredient_id=ingredient,
+                                amount=rng.randint(1, 500))
+             for recipe_id in recipe_ids
+             for ingredient in rng.sample(ingredient_ids,
+                                          min(5, len(ingredient_ids)))),
+            batch_size=BATCH_SIZE)
+        Recipe.tags.through.objects.bulk_create(
+            (Recipe.tags.through(recipe_id=recipe_id, tag=tag)
+             for recipe_id in recipe_ids
+             for tag in rng.sample(tags, rng.randint(1, len(tags)))),
+            batch_size=BATCH_SIZE)
+        half = len(recipe_ids) // 2
+        used_recipes, fresh_recipes = recipe_ids[:half], recipe_ids[half:]
+        used_authors = authors[:len(authors) // 2]
+        fresh_authors = authors[len(authors) // 2:]
+        for model, count in ((Favourite, options['favorites']),
+                             (ShoppingCart, options['carts'])):
+            model.objects.bulk_create(
+                (model(user=user, recipe_id=recipe_id)
+                 for user in users
+                 for recipe_id in rng.sample(used_recipes,
+                                             min(count, len(used_recipes)))),
+                batch_size=BATCH_SIZE)
+        Follow.objects.bulk_create(
+            (Follow(user=user, author=author)
+             for user in users
+             for author in rng.sample(used_authors,
+                                      min(options['follows'],
+                                          len(used_authors)))
+             if author != user),
+            batch_size=BATCH_SIZE)
+        fresh_author_ids = {author.pk for author in fresh_authors}
+        return {
+            'users': [
+                {'id': token.user.pk, 'token': token.key}
+                for token in tokens if token.user.pk not in fresh_author_ids
+            ],
+            'recipes': fresh_recipes,
+            'authors': sorted(fresh_author_ids),
+            'tags': [{'id': tag.pk, 'slug': tag.slug} for tag in tags],
+            'ingredients': [
+                {'id': ingredient.pk, 'name': ingredient.name}
+                for ingredient in Ingredient.objects.order_by('?')[:100]
+            ],
+        }
+
+    @staticmethod
+    def save_image():
+        """Одинаковые изображения хранилище сохраняет одним файлом."""
+
+        buffer = BytesIO()
+        Image.new('RGB', (64, 64), (200, 120, 60)).save(buffer, 'PNG')
+        return default_storage.save(LOAD_TEST_IMAGE,
+                                    ContentFile(buffer.getvalue()))
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.16 on 2026-10-19 06:42
+
+from django.db import migrations, models
+
+
+ADMISSION_TABLES = ('api_admissionbucket', 'api_admissionlease')
+
+
+def set_unlogged(apps, schema_editor):
+    # Состояние ограничителя можно потерять при сбое, поэтому таблицы
+    # не пишутся в WAL. В SQLite такого режима нет.
+    if schema_editor.connection.vendor == 'postgresql':
+        for table in ADMISSION_TABLES:
+            schema_editor.execute(f'ALTER TABLE {table} SET UNLOGGED')
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdmissionBucket',
+            fields=[
+                ('key', models.CharField(max_length=200, primary_key=True, serialize=False, verbose_name='Ключ')),
+                ('tokens', models.FloatField(verbose_name='Токены')),
+                ('updated_at', models.FloatField(verbose_name='Обновлена')),
+                ('granted', models.BooleanField(default=True, verbose_name='Последний запрос пропущен')),
+            ],
+            options={
+                'verbose_name': 'Корзина токенов',
+                'verbose_name_plural': 'Корзины токенов',
+            },
+        ),
+        migrations.CreateModel(
+            name='AdmissionLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=200, verbose_name='Ключ')),
+                ('slot', models.PositiveSmallIntegerField(verbose_name='Слот')),
+                ('owner', models.CharField(max_length=32, verbose_name='Владелец')),
+                ('expires_at', models.FloatField(verbose_name='Истекает')),
+            ],
+            options={
+                'verbose_name': 'Слот выполнения',
+                'verbose_name_plural': 'Слоты выполнения',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='admissionlease',
+            constraint=models.UniqueConstraint(fields=('key', 'slot'), name='api_admissionlease_unique_key_slot'),
+        ),
+        migrations.RunPython(set_unlogged, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+from django.db import models
+
+from .constants import ADMISSION_KEY_MAX_LENGTH
+
+
+class AdmissionBucket(models.Model):
+    """
+    Корзина токенов ограничителя запросов.
+
+    Время хранится в секундах Unix, чтобы пополнение считалось
+    арифметикой в одном UPSERT.
+    """
+
+    key = models.CharField(
+        max_length=ADMISSION_KEY_MAX_LENGTH,
+        primary_key=True,
+        verbose_name='Ключ'
+    )
+    tokens = models.FloatField(verbose_name='Токены')
+    updated_at = models.FloatField(verbose_name='Обновлена')
+    granted = models.BooleanField(
+        default=True,
+        verbose_name='Последний запрос пропущен'
+    )
+
+    class Meta:
+        """Мета-параметры модели."""
+
+        verbose_name = 'Корзина токенов'
+        verbose_name_plural = 'Корзины токенов'
+
+    def __str__(self):
+        return f'{self.key}: {self.tokens:.2f}'
+
+
+class AdmissionLease(models.Model):
+    """Слот одновременного выполнения запроса, занятый до expires_at."""
+
+    key = models.CharField(
+        max_length=ADMISSION_KEY_MAX_LENGTH,
+        verbose_name='Ключ'
+    )
+    slot = models.PositiveSmallIntegerField(verbose_name='Слот')
+    owner = models.CharField(max_length=32, verbose_name='Владелец')
+    expires_at = models.FloatField(verbose_name='Истекает')
+
+    class Meta:
+        """Мета-параметры модели."""
+
+        verbose_name = 'Слот выполнения'
+        verbose_name_plural = 'Слоты выполнения'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key', 'slot'],
+                name='api_admissionlease_unique_key_slot'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.key} #{self.slot}'
@@ -0,0 +1,284 @@
+import hashlib
+import re
+
+from django.db import connection, transaction
+
+from recipes.models import Favourite, ShoppingCart
+from users.models import Follow
+
+PARTITIONED_MODELS = (Favourite, ShoppingCart, Follow)
+PARTITION_KEY = 'user_id'
+
+CONSTRAINTS_SQL = '''
+SELECT con.conname, con.contype, pg_get_constraintdef(con.oid),
+       ARRAY(SELECT att.attname FROM pg_attribute att
+             WHERE att.attrelid = con.conrelid
+               AND att.attnum = ANY(con.conkey))
+FROM pg_constraint con
+WHERE con.conrelid = %s::regclass AND con.contype IN ('p', 'u', 'f')
+ORDER BY con.conname
+'''
+INDEXES_SQL = '''
+SELECT idx.relname, pg_get_indexdef(ix.indexrelid), ix.indisunique,
+       EXISTS(SELECT 1 FROM pg_attribute att
+              WHERE att.attrelid = ix.indrelid AND att.attname = %s
+                AND att.attnum = ANY(ix.indkey::int2[]))
+FROM pg_index ix
+JOIN pg_class idx ON idx.oid = ix.indexrelid
+WHERE ix.indrelid = %s::regclass
+  AND NOT EXISTS(SELECT 1 FROM pg_constraint con
+                 WHERE con.conindid = ix.indexrelid)
+ORDER BY idx.relname
+'''
+MIRROR_FUNCTION_SQL = '''
+CREATE FUNCTION {function}() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        DELETE FROM {new} WHERE id = OLD.id AND {key} = OLD.{key};
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO {new} ({columns}) VALUES ({values})
+        ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+'''
+INDEX_NAME_RE = re.compile(r'^(CREATE (?:UNIQUE )?INDEX )\S+ ON (?:ONLY )?\S+')
+
+
+class PartitioningError(Exception):
+    """Таблицу нельзя секционировать или она в неподходящем состоянии."""
+
+
+def temp_name(name):
+    """
+    Временное имя ограничения или индекса новой таблицы: имена индексов
+    уникальны в схеме, поэтому исходные занимает старая таблица.
+    """
+
+    return f'part_{hashlib.md5(name.encode()).hexdigest()[:16]}'
+
+
+class PartitionMigration:
+    """
+    Перенос таблицы связи в таблицу, секционированную по хэшу user_id.
+
+    Перенос идёт без остановки: prepare создаёт секционированную копию
+    и триггер, повторяющий в ней все изменения старой таблицы; copy
+    переносит существующие строки пачками; verify сравнивает числа строк
+    и контрольные суммы таблиц в одном снимке; swap под короткой
+    блокировкой удаляет старую таблицу и переименовывает новую.
+    Первичный ключ становится (id, user_id): ограничения уникальности
+    секционированной таблицы должны включать ключ секционирования.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.table = model._meta.db_table
+        self.new_table = f'{self.table}_partitioned'
+        self.sequence = f'{self.new_table}_id_seq'
+        self.function = f'{self.new_table}_mirror'
+        self.columns = [field.column for field in model._meta.concrete_fields]
+
+    def quote(self, name):
+        return connection.ops.quote_name(name)
+
+    def relkind(self, cursor, table):
+        cursor.execute('SELECT relkind FROM pg_class '
+                       'WHERE oid = to_regclass(%s)', [table])
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def constraints(self, cursor):
+        cursor.execute(CONSTRAINTS_SQL, [self.table])
+        return cursor.fetchall()
+
+    def indexes(self, cursor):
+        cursor.execute(INDEXES_SQL, [PARTITION_KEY, self.table])
+        return cursor.fetchall()
+
+    def state(self):
+        """Состояние переноса: plain, prepared или partitioned."""
+
+        with connection.cursor() as cursor:
+            if self.relkind(cursor, self.table) == 'p':
+                return 'partitioned'
+            if self.relkind(cursor, self.new_table) is not None:
+                return 'prepared'
+            return 'plain'
+
+    def check(self, cursor):
+        if self.relkind(cursor, self.table) != 'r':
+            raise PartitioningError(
+                f'{self.table} уже секционирована или не существует.')
+        if self.relkind(cursor, self.new_table) is not None:
+            raise PartitioningError(f'{self.new_table} уже существует.')
+        cursor.execute('SELECT conname FROM pg_constraint '
+                       'WHERE confrelid = %s::regclass', [self.table])
+        references = [name for name, in cursor.fetchall()]
+        if references:
+            raise PartitioningError(
+                f'На {self.table} ссылаются внешние ключи: '
+                f'{", ".join(references)}.')
+        for name, kind, _, columns in self.constraints(cursor):
+            if kind == 'u' and PARTITION_KEY not in columns:
+                raise PartitioningError(
+                    f'Ограничение {name} не включает {PARTITION_KEY}.')
+        for name, _, unique, has_key in self.indexes(cursor):
+            if unique and not has_key:
+                raise PartitioningError(
+                    f'Уникальный индекс {name} не включает {PARTITION_KEY}.')
+
+    def prepare(self, partitions):
+        """Создаёт секционированную копию и триггер синхронизации."""
+
+        new, old = self.quote(self.new_table), self.quote(self.table)
+        with transaction.atomic(), connection.cursor() as cursor:
+            self.check(cursor)
+            cursor.execute(
+                f'CREATE TABLE {new} (LIKE {old} INCLUDING DEFAULTS '
+                f'INCLUDING CONSTRAINTS) PARTITION BY HASH ({PARTITION_KEY})')
+            cursor.execute(f'CREATE SEQUENCE {self.quote(self.sequence)} '
+                           f'OWNED BY {new}.id')
+            cursor.execute(f"ALTER TABLE {new} ALTER COLUMN id "
+                           f"SET DEFAULT nextval('{self.sequence}')")
+            for remainder in range(partitions):
+                cursor.execute(
+                    f'CREATE TABLE {self.quote(f"{self.table}_{remainder}")} '
+                    f'PARTITION OF {new} FOR VALUES WITH '
+                    f'(MODULUS {partitions}, REMAINDER {remainder})')
+            for name, kind, definition, columns in self.constraints(cursor):
+                if kind == 'p':
+                    columns = list(columns)
+                    if PARTITION_KEY not in columns:
+                        columns.append(PARTITION_KEY)
+                    definition = 'PRIMARY KEY ({})'.format(
+                        ', '.join(map(self.quote, columns)))
+                cursor.execute(
+                    f'ALTER TABLE {new} ADD CONSTRAINT '
+                    f'{self.quote(name if kind == "f" else temp_name(name))} '
+                    f'{definition}')
+            for name, definition, _, _ in self.indexes(cursor):
+                cursor.execute(INDEX_NAME_RE.sub(
+                    lambda match: f'{match[1]}{temp_name(name)} ON {new}',
+                    definition))
+            cursor.execute(MIRROR_FUNCTION_SQL.format(
+                function=self.quote(self.function), new=new,
+                key=PARTITION_KEY,
+                columns=', '.join(map(self.quote, self.columns)),
+                values=', '.join(f'NEW.{self.quote(column)}'
+                                 for column in self.columns)))
+            cursor.execute(
+                f'CREATE TRIGGER {self.quote(self.function)} '
+                f'AFTER INSERT OR UPDATE OR DELETE ON {old} '
+                f'FOR EACH ROW EXECUTE FUNCTION {self.quote(self.function)}()')
+
+    def copy(self, batch_size, start=0):
+        """
+        Переносит строки старой таблицы пачками по id.
+
+        Каждая пачка — отдельная транзакция, поэтому перенос можно
+        прервать и продолжить с выданной позиции. Строки пачки
+        блокируются FOR SHARE: параллельное удаление дождётся вставки
+        копии и удалит её триггером. Возвращает генератор пар
+        (позиция, перенесено строк).
+        """
+
+        new, old = self.quote(self.new_table), self.quote(self.table)
+        columns = ', '.join(map(self.quote, self.columns))
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT max(id) FROM {old}')
+            last = cursor.fetchone()[0] or 0
+        position = start
+        while position < last:
+            end = min(position + batch_size, last)
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {new} ({columns}) '
+                    f'SELECT {columns} FROM {old} '
+                    f'WHERE id > %s AND id <= %s FOR SHARE '
+                    f'ON CONFLICT DO NOTHING', [position, end])
+                copied = cursor.rowcount
+            position = end
+            yield position, copied
+
+    def verify(self):
+        """
+        Число строк и контрольная сумма старой и новой таблиц в одном
+        снимке.
+
+        Сумма — sum(hashtext) по строке из всех столбцов: совпадение
+        чисел строк не замечает строку, изменённую в копии.
+        """
+
+        row = 'ROW({})::text'.format(', '.join(map(self.quote, self.columns)))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+            summaries = []
+            for table in (self.table, self.new_table):
+                cursor.execute(
+                    f'SELECT count(*), '
+                    f'COALESCE(sum(hashtext({row})::bigint), 0) '
+                    f'FROM {self.quote(table)}')
+                summaries.append(tuple(cursor.fetchone()))
+        return tuple(summaries)
+
+    def swap(self):
+        """
+        Заменяет старую таблицу новой.
+
+        Выполняется в одной транзакции под ACCESS EXCLUSIVE блокировкой;
+        данные не копируются, поэтому блокировка короткая. Ограничениям
+        и индексам возвращаются исходные имена, чтобы миграции Django
+        продолжали их находить.
+        """
+
+        new, old = self.quote(self.new_table), self.quote(self.table)
+        with transaction.atomic(), connection.cursor() as cursor:
+            if self.relkind(cursor, self.new_table) != 'p':
+                raise PartitioningError(f'{self.new_table} не подготовлена.')
+            cursor.execute(f'LOCK TABLE {old}, {new} IN ACCESS EXCLUSIVE MODE')
+            constraints = [
+                name for name, kind, _, _ in self.constraints(cursor)
+                if kind != 'f'
+            ]
+            indexes = [name for name, _, _, _ in self.indexes(cursor)]
+            cursor.execute('SELECT pg_get_serial_sequence(%s, %s)',
+                           [self.table, 'id'])
+            old_sequence, = cursor.fetchone()
+            last_value = 0
+            if old_sequence is not None:
+                cursor.execute(f'SELECT last_value FROM {old_sequence}')
+                last_value, = cursor.fetchone()
+            cursor.execute(
+                f'SELECT setval(%s, GREATEST(%s, COALESCE(max(id), 0)) + 1, '
+                f'false) FROM {old}', [self.sequence, last_value])
+            cursor.execute(f'DROP TRIGGER {self.quote(self.function)} '
+                           f'ON {old}')
+            cursor.execute(f'DROP FUNCTION {self.quote(self.function)}()')
+            cursor.execute(f'DROP TABLE {old}')
+            cursor.execute(f'ALTER TABLE {new} RENAME TO {old}')
+            cursor.execute(
+                f'ALTER SEQUENCE {self.quote(self.sequence)} '
+                f'RENAME TO {self.quote(f"{self.table}_id_seq")}')
+            for name in constraints:
+                cursor.execute(
+                    f'ALTER TABLE {old} RENAME CONSTRAINT '
+                    f'{self.quote(temp_name(name))} TO {self.quote(name)}')
+            for name in indexes:
+                cursor.execute(
+                    f'ALTER INDEX {self.quote(temp_name(name))} '
+                    f'RENAME TO {self.quote(name)}')
+
+    def abort(self):
+        """Удаляет подготовленную копию и триггер."""
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER IF EXISTS '
+                           f'{self.quote(self.function)} '
+                           f'ON {self.quote(self.table)}')
+            cursor.execute(f'DROP FUNCTION IF EXISTS '
+                           f'{self.quote(self.function)}()')
+            cursor.execute(f'DROP TABLE IF EXISTS '
+                           f'{self.quote(self.new_table)}')
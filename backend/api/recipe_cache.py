@@ -0,0 +1,181 @@
+import threading
+import uuid
+from collections import OrderedDict
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from config.caches import shared_cache
+from recipes.catalog import catalog
+from recipes.models import Recipe
+from recipes.signals import recipe_changed
+from users.models import User
+
+from .fast_serializers import (RECIPE_BASE_FIELDS, build_recipe_bases,
+                               get_recipe_fields)
+
+RECIPE_CACHE_KEY = 'recipes:repr:{}:{}'
+RECIPE_VERSION_KEY = 'recipes:repr-version:recipe:{}'
+AUTHOR_VERSION_KEY = 'recipes:repr-version:author:{}'
+
+
+class LocalRecipeCache:
+    """
+    Ограниченный LRU-кэш процесса: id рецепта → (версия, представление).
+
+    Запись годится, только пока версия совпадает с текущей версией из
+    общего кэша, поэтому отдельный срок жизни ей не нужен.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, recipe_id, version):
+        with self._lock:
+            entry = self._entries.get(recipe_id)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(recipe_id)
+            return entry[1]
+
+    def set(self, recipe_id, version, base):
+        if not self.max_size:
+            return
+        with self._lock:
+            self._entries[recipe_id] = (version, base)
+            self._entries.move_to_end(recipe_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_recipe_cache = LocalRecipeCache(settings.RECIPE_CACHE_LOCAL_SIZE)
+
+
+def get_recipe_cache():
+    """
+    Общий кэш RECIPE_CACHE или None, если кэширование выключено.
+
+    Версии представлений живут в общем кэше, поэтому с кэшем в памяти
+    процесса другие воркеры не увидели бы их сброса: тогда кэш
+    не используется вовсе.
+    """
+
+    return shared_cache(settings.RECIPE_CACHE)
+
+
+def get_versions(cache, recipes):
+    """
+    Версии представлений рецептов: токены рецепта и его автора,
+    полученные одним get_many, и версия каталога тегов и ингредиентов
+    процесса, по которому строятся представления.
+
+    Сброс версии — это удаление токена; следующий читатель создаёт
+    новый случайный токен, поэтому прежние записи больше не находятся,
+    даже если общий кэш вытеснил токен сам.
+    """
+
+    catalog_version = catalog.get_version()
+    keys = set()
+    for recipe in recipes:
+        keys.add(RECIPE_VERSION_KEY.format(recipe.id))
+        keys.add(AUTHOR_VERSION_KEY.format(recipe.author_id))
+    tokens = cache.get_many(keys)
+    for key in keys - tokens.keys():
+        token = uuid.uuid4().hex[:12]
+        if not cache.add(key, token, None):
+            token = cache.get(key, token)
+        tokens[key] = token
+    return {
+        recipe.id: ':'.join((
+            tokens[RECIPE_VERSION_KEY.format(recipe.id)],
+            tokens[AUTHOR_VERSION_KEY.format(recipe.author_id)],
+            catalog_version,
+        ))
+        for recipe in recipes
+    }
+
+
+def load_recipes(recipe_ids):
+    """
+    Рецепты со всем, что нужно представлению.
+
+    Промахи кэша читаются из основной базы: прочитанное с отстающей
+    реплики попало бы в кэш под новой версией.
+    """
+
+    return Recipe.objects.using('default').filter(
+        id__in=recipe_ids,
+    ).select_related('author').prefetch_related('ingredient_links')
+
+
+def get_recipe_bases(recipes, request):
+    """
+    Не зависящие от пользователя части представлений рецептов.
+
+    С включённым RECIPE_CACHE берутся из LRU процесса, затем из общего
+    кэша, и только промахи загружаются из базы; объекты recipes должны
+    содержать лишь id и author_id. Без кэша части строятся из самих
+    объектов, загруженных RecipeViewSet.get_queryset.
+    """
+
+    fields = [field for field in get_recipe_fields(request)
+              if field in RECIPE_BASE_FIELDS]
+    if not fields:
+        return {recipe.id: {} for recipe in recipes}
+    cache = get_recipe_cache()
+    if cache is None:
+        return build_recipe_bases(recipes, fields)
+    versions = get_versions(cache, recipes)
+    bases = {}
+    for recipe_id, version in versions.items():
+        base = local_recipe_cache.get(recipe_id, version)
+        if base is not None:
+            bases[recipe_id] = base
+    keys = {RECIPE_CACHE_KEY.format(recipe_id, version): recipe_id
+            for recipe_id, version in versions.items()
+            if recipe_id not in bases}
+    if keys:
+        for key, base in cache.get_many(keys).items():
+            recipe_id = keys[key]
+            bases[recipe_id] = base
+            local_recipe_cache.set(recipe_id, versions[recipe_id], base)
+    missing = [recipe_id for recipe_id in versions if recipe_id not in bases]
+    if missing:
+        loaded = {}
+        for recipe_id, base in build_recipe_bases(
+                load_recipes(missing), RECIPE_BASE_FIELDS).items():
+            loaded[RECIPE_CACHE_KEY.format(
+                recipe_id, versions[recipe_id])] = base
+            bases[recipe_id] = base
+            local_recipe_cache.set(recipe_id, versions[recipe_id], base)
+        cache.set_many(loaded, settings.RECIPE_CACHE_TIMEOUT)
+    return bases
+
+
+def forget(key):
+    cache = get_recipe_cache()
+    if cache is not None:
+        cache.delete(key)
+
+
+@receiver(recipe_changed)
+def recipe_representation_changed(sender, recipe_id, **kwargs):
+    forget(RECIPE_VERSION_KEY.format(recipe_id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def author_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    transaction.on_commit(
+        partial(forget, AUTHOR_VERSION_KEY.format(instance.pk)))
@@ -0,0 +1,29 @@
+import orjson
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Рендерер JSON на orjson.
+
+    Вывод совпадает с JSONRenderer при настройках по умолчанию: компактные
+    разделители, UTF-8 без экранирования, а даты и прочие нестандартные
+    типы кодируются JSONEncoder из DRF.
+    """
+
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        ret = orjson.dumps(data, default=JSONEncoder().default,
+                           option=ORJSON_OPTIONS)
+        # JSONRenderer экранирует разделители строк, как того требует
+        # JavaScript.
+        return (ret.replace('\u2028'.encode(), b'\\u2028')
+                .replace('\u2029'.encode(), b'\\u2029'))
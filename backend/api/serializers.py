@@ -1,15 +1,26 @@
+import json
+
 from django.db import transaction
+from django.http import QueryDict
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework.fields import SerializerMethodField
-from rest_framework.serializers import (CharField, IntegerField,
+from rest_framework.serializers import (FloatField, IntegerField, ListField,
                                         ModelSerializer,
                                         PrimaryKeyRelatedField, ReadOnlyField,
-                                        Serializer, ValidationError)
+                                        Serializer, SlugField, ValidationError)
 
+from recipes.catalog import catalog
+from recipes.constants import (CHANGES_MAX_PAGE_SIZE, CHANGES_PAGE_SIZE,
+                               MIN_COOKING_TIME)
 from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from users.follows import is_subscribed_to
 from users.models import Follow, User
 
+from .fast_serializers import (load_tag_ids, serialize_ingredient_links,
+                               serialize_recipe_tags)
+from .fields import CatalogTagField, ImageUploadField
+
 
 class StandartUserSerializer(UserSerializer):
     """
@@ -31,10 +42,7 @@ class StandartUserSerializer(UserSerializer):
         Проверяет, подписан ли текущий пользователь на данного автора.
         """
 
-        request = self.context.get('request')
-        if request and not request.user.is_anonymous:
-            return obj.following.filter(user=request.user).exists()
-        return False
+        return is_subscribed_to(obj, self.context.get('request'))
 
 
 class UserCreateSerializer(UserCreateSerializer):
@@ -61,7 +69,7 @@ class AvatarUpdateSerializer(ModelSerializer):
     Сериализатор для обновления аватара пользователя.
     """
 
-    avatar = Base64ImageField(required=False)
+    avatar = ImageUploadField(required=False)
 
     class Meta:
         model = User
@@ -121,44 +129,16 @@ class FollowSerializer(ModelSerializer):
             return obj.user == request.user
 
 
-class TagSerializer(ModelSerializer):
-    """
-    Сериализатор для тегов.
-    """
-
-    class Meta:
-        model = Tag
-        fields = ('id', 'name', 'slug',)
-
-
-class IngredientInRecipeSerializer(ModelSerializer):
-    """
-    Сериализатор для отображения ингредиентов в рецепте.
-    """
-
-    id = IntegerField(source='ingredient.id')
-    name = CharField(source='ingredient.name')
-    measurement_unit = CharField(
-        source='ingredient.measurement_unit')
-
-    class Meta:
-        model = IngredientInRecipe
-        fields = ('id', 'name', 'amount', 'measurement_unit',)
-
-
 class RecipeDetailSerializer(ModelSerializer):
     """
     Сериализатор для получения детальной информации о рецепте.
     """
 
     author = StandartUserSerializer(read_only=True)
-    ingredients = IngredientInRecipeSerializer(
-        many=True,
-        source='ingredient_links'
-    )
+    ingredients = SerializerMethodField()
     is_favorited = SerializerMethodField()
     is_in_shopping_cart = SerializerMethodField()
-    tags = TagSerializer(many=True, read_only=True)
+    tags = SerializerMethodField()
     image = Base64ImageField()
 
     class Meta:
@@ -173,6 +153,20 @@ class RecipeDetailSerializer(ModelSerializer):
             'tags', 'image',
         )
 
+    def get_ingredients(self, obj):
+        """
+        Ингредиенты рецепта; названия и единицы берутся из каталога.
+        """
+
+        return serialize_ingredient_links(obj.ingredient_links.all())
+
+    def get_tags(self, obj):
+        """
+        Теги рецепта из каталога.
+        """
+
+        return serialize_recipe_tags(load_tag_ids([obj])[obj.id])
+
     def get_is_favorited(self, obj):
         """
         Проверяет, добавлен ли рецепт в избранное текущим пользователем.
@@ -211,6 +205,40 @@ class CompactRecipeSerializer(ModelSerializer):
         fields = ('id', 'name', 'image', 'cooking_time',)
 
 
+class CookableRecipeSerializer(CompactRecipeSerializer):
+    """
+    Сериализатор рецепта с долей покрытия имеющимися ингредиентами.
+    """
+
+    coverage = FloatField(read_only=True)
+    missing_count = IntegerField(read_only=True)
+
+    class Meta(CompactRecipeSerializer.Meta):
+        fields = CompactRecipeSerializer.Meta.fields + (
+            'coverage', 'missing_count',)
+
+
+class CookableQuerySerializer(Serializer):
+    """
+    Параметры подбора рецептов по имеющимся ингредиентам.
+    """
+
+    ingredients = ListField(child=IntegerField(), allow_empty=False)
+    tags = ListField(child=SlugField(), required=False)
+    max_cooking_time = IntegerField(min_value=MIN_COOKING_TIME,
+                                    required=False)
+
+
+class ChangesQuerySerializer(Serializer):
+    """
+    Параметры ленты изменений.
+    """
+
+    since = IntegerField(min_value=0, required=False)
+    limit = IntegerField(min_value=1, max_value=CHANGES_MAX_PAGE_SIZE,
+                         default=CHANGES_PAGE_SIZE)
+
+
 class IngredientSerializer(ModelSerializer):
     """
     Сериализатор для ингредиентов.
@@ -250,9 +278,9 @@ class RecipeIngredientInputSerializer(Serializer):
 
     def validate_id(self, value):
         """
-        Проверяет, существует ли ингредиент с указанным id.
+        Проверяет по каталогу, существует ли ингредиент с указанным id.
         """
-        if not Ingredient.objects.filter(id=value).exists():
+        if not catalog.get_ingredients([value]):
             raise ValidationError(
                 f'Ингредиента с id {value} не существует!'
             )
@@ -264,12 +292,12 @@ class RecipeCreationSerializer(ModelSerializer):
     Сериализатор для создания и обновления рецептов.
     """
 
-    tags = PrimaryKeyRelatedField(queryset=Tag.objects.all(), many=True)
+    tags = CatalogTagField(queryset=Tag.objects.all(), many=True)
     ingredients = RecipeIngredientInputSerializer(
         many=True,
         source='ingredient_links'
     )
-    image = Base64ImageField()
+    image = ImageUploadField()
 
     class Meta:
         """
@@ -287,6 +315,28 @@ class RecipeCreationSerializer(ModelSerializer):
             'cooking_time',
         )
 
+    def to_internal_value(self, data):
+        """
+        Приводит данные multipart/form-data к виду JSON-запроса.
+
+        Теги передаются повторяющимся полем tags, а ингредиенты строкой
+        JSON в поле ingredients.
+        """
+
+        if isinstance(data, QueryDict):
+            multipart_data = data.dict()
+            if 'tags' in data:
+                multipart_data['tags'] = data.getlist('tags')
+            if isinstance(multipart_data.get('ingredients'), str):
+                try:
+                    multipart_data['ingredients'] = json.loads(
+                        multipart_data['ingredients'])
+                except ValueError:
+                    raise ValidationError(
+                        {'ingredients': 'Ожидается строка JSON.'})
+            data = multipart_data
+        return super().to_internal_value(data)
+
     def to_representation(self, instance):
         """Метод представления модели"""
 
@@ -340,7 +390,7 @@ class RecipeCreationSerializer(ModelSerializer):
         ingredients = validated_data.pop('ingredient_links')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
-        recipe.tags.set(tags)
+        recipe.tags.add(*tags)
         self._add_ingredients(recipe, ingredients)
         return recipe
 
@@ -370,19 +420,18 @@ class RecipeCreationSerializer(ModelSerializer):
         Создаёт связи между рецептом и ингредиентами.
         """
 
-        ingredient_objects = Ingredient.objects.filter(
-            id__in=[ingredient['id'] for ingredient in ingredients])
-        ingredients_sorted = sorted(ingredient_objects,
-                                    key=lambda x: x.name.lower())
+        names = catalog.get_ingredients(
+            [ingredient['id'] for ingredient in ingredients])
+        ingredients_sorted = sorted(
+            (item for item in ingredients if item['id'] in names),
+            key=lambda item: names[item['id']][0].lower())
 
         IngredientInRecipe.objects.bulk_create([
             IngredientInRecipe(
                 recipe=recipe,
-                ingredient=ingredient,
-                amount=next(
-                    item['amount'] for item in ingredients
-                    if item['id'] == ingredient.id)
-            ) for ingredient in ingredients_sorted
+                ingredient_id=item['id'],
+                amount=item['amount']
+            ) for item in ingredients_sorted
         ])
 
 
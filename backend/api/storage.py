@@ -0,0 +1,77 @@
+import hashlib
+import os
+import posixpath
+import re
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+from .constants import CONTENT_ADDRESSED_DIRS
+
+HASHED_NAME_RE = re.compile(r'^[0-9a-f]{64}(\.\w+)?$')
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk if isinstance(chunk, bytes) else chunk.encode())
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище, которое называет загрузки по SHA-256 содержимого.
+
+    В каталогах CONTENT_ADDRESSED_DIRS файл получает имя
+    <каталог>/<sha256>.<расширение>: одинаковые изображения сохраняются
+    один раз, а файл под таким именем никогда не меняется, поэтому nginx
+    отдаёт его с Cache-Control: immutable. Остальные файлы сохраняются
+    как обычно.
+    """
+
+    @staticmethod
+    def is_content_addressed(name):
+        directory, filename = posixpath.split(name)
+        return (directory in CONTENT_ADDRESSED_DIRS
+                and HASHED_NAME_RE.match(filename) is not None)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        directory, filename = posixpath.split(name)
+        if directory in CONTENT_ADDRESSED_DIRS:
+            if not hasattr(content, 'chunks'):
+                content = File(content, name)
+            extension = posixpath.splitext(filename)[1].lower()
+            name = posixpath.join(directory,
+                                  content_hash(content) + extension)
+        return super().save(name, content, max_length)
+
+    def get_available_name(self, name, max_length=None):
+        if self.is_content_addressed(name):
+            return name
+        return super().get_available_name(name, max_length)
+
+    def _save(self, name, content):
+        """
+        Сохраняет файл с хэш-именем, если его ещё нет.
+
+        Файл пишется под временным именем и атомарно переименовывается,
+        поэтому одновременные загрузки одного изображения не оставляют
+        недописанных файлов. Время изменения существующего файла
+        обновляется: удаление недавно загруженного файла откладывается,
+        пока запись, которая на него ссылается, не сохранена.
+        """
+
+        if not self.is_content_addressed(name):
+            return super()._save(name, content)
+        path = self.path(name)
+        if os.path.exists(path):
+            os.utime(path)
+            return name
+        temporary = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        os.replace(self.path(temporary), path)
+        return name
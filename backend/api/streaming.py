@@ -0,0 +1,160 @@
+import contextvars
+from itertools import islice
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from .constants import (STREAM_BUFFER_SIZE, STREAM_CHUNK_SIZE,
+                        STREAM_QUERY_CHUNK_SIZE)
+from .renderers import ORJSONRenderer
+
+# Заглушка на месте списка в обёртке пагинации; нулевые символы
+# не встречаются в остальных полях обёртки.
+RESULTS_PLACEHOLDER = '\x00results\x00'
+
+
+def chunked(items, size):
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iterate_in_context(iterable):
+    """
+    Итератор, каждый шаг которого выполняется в копии текущего контекста.
+
+    Тело потокового ответа читается после выхода из middleware, которые
+    к этому времени сбрасывают свои contextvars: так запросы при
+    сериализации идут на ту же реплику, что и запросы представления.
+    """
+
+    context = contextvars.copy_context()
+    iterator = iter(iterable)
+
+    def generate():
+        try:
+            while True:
+                try:
+                    value = context.run(next, iterator)
+                except StopIteration:
+                    return
+                yield value
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                context.run(close)
+
+    return generate()
+
+
+def render_list(envelope, items, serialize, renderer):
+    """
+    Части JSON-документа, в котором список items стоит на месте
+    RESULTS_PLACEHOLDER в envelope.
+
+    Элементы сериализуются пачками; первая часть отдаётся сразу после
+    первой пачки, остальные — по мере накопления STREAM_BUFFER_SIZE байт.
+    """
+
+    prefix, suffix = renderer.render(envelope).split(
+        renderer.render(RESULTS_PLACEHOLDER))
+    buffer = bytearray(prefix)
+    buffer += b'['
+    flushed = False
+    separator = b''
+    for chunk in chunked(items, STREAM_CHUNK_SIZE):
+        for item in serialize(chunk):
+            buffer += separator
+            buffer += renderer.render(item)
+            separator = b','
+        if not flushed or len(buffer) >= STREAM_BUFFER_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+            flushed = True
+    buffer += b']'
+    buffer += suffix
+    yield bytes(buffer)
+
+
+class PrefetchedStream:
+    """
+    Итератор частей ответа, первая из которых вычислена при создании.
+
+    Ошибка в первой пачке (запрос к базе, сериализация) возникает ещё
+    в представлении и превращается в обычный ответ с кодом ошибки,
+    а не в оборванное тело со статусом 200.
+    """
+
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self._first = [next(self._iterator)]
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._first:
+            return self._first.pop()
+        return next(self._iterator)
+
+    def close(self):
+        close = getattr(self._iterator, 'close', None)
+        if close is not None:
+            close()
+
+
+class StreamingResponseMixin:
+    """
+    Отдаёт списки JSON потоком.
+
+    Элементы сериализуются пачками по STREAM_CHUNK_SIZE и уходят клиенту
+    по мере готовности, поэтому память воркера не растёт с размером
+    страницы, а первый байт отправляется после первой пачки. Обёртка
+    пагинации сохраняется, тело ответа совпадает с обычным байт-в-байт.
+    Браузерный API и выключенный STREAM_JSON_RESPONSES получают обычный
+    Response.
+
+    Статус 200 уходит вместе с первой частью, поэтому ошибку в более
+    поздней пачке клиенту уже не сообщить: соединение обрывается, и он
+    получает неполный JSON. Первая пачка сериализуется до возврата
+    ответа, и её ошибки обрабатываются как обычно.
+    """
+
+    def can_stream(self, request):
+        return (settings.STREAM_JSON_RESPONSES
+                and isinstance(request.accepted_renderer, ORJSONRenderer))
+
+    def get_streaming_response(self, items, serializer_class=None,
+                               paginated=True):
+        serializer_class = serializer_class or self.get_serializer_class()
+        context = self.get_serializer_context()
+        envelope = RESULTS_PLACEHOLDER
+        if paginated:
+            envelope = self.paginator.get_paginated_response(
+                RESULTS_PLACEHOLDER).data
+
+        def serialize(chunk):
+            return serializer_class(chunk, many=True, context=context).data
+
+        return StreamingHttpResponse(
+            PrefetchedStream(iterate_in_context(render_list(
+                envelope, items, serialize, self.request.accepted_renderer))),
+            content_type=self.request.accepted_renderer.media_type)
+
+
+class StreamingListMixin(StreamingResponseMixin):
+    """Действие list, отдающее страницу потоком."""
+
+    def list(self, request, *args, **kwargs):
+        if not self.can_stream(request):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return self.get_streaming_response(
+                queryset.iterator(chunk_size=STREAM_QUERY_CHUNK_SIZE),
+                paginated=False)
+        return self.get_streaming_response(page)
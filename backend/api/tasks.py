@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from recipes.models import Recipe
+from taskqueue.queue import task
+from users.models import User
+
+from .constants import MEDIA_DELETE_GRACE_PERIOD
+
+
+@task('api.delete_media_file')
+def delete_media_file(name):
+    """
+    Удаляет файл из хранилища, если на него больше никто не ссылается.
+
+    Одинаковые изображения хранятся одним файлом, и повторная загрузка
+    лишь обновляет время его изменения. Недавно загруженный файл может
+    принадлежать записи, которая ещё не сохранена, поэтому его удаление
+    откладывается на MEDIA_DELETE_GRACE_PERIOD.
+    """
+
+    if (Recipe.objects.filter(image=name).exists()
+            or User.objects.filter(avatar=name).exists()
+            or not default_storage.exists(name)):
+        return
+    grace = timedelta(seconds=MEDIA_DELETE_GRACE_PERIOD)
+    if default_storage.get_modified_time(name) > timezone.now() - grace:
+        delete_media_file.enqueue(name=name, delay=MEDIA_DELETE_GRACE_PERIOD)
+        return
+    default_storage.delete(name)
+
+
+def delete_replaced_file(old_name, new_name):
+    """Ставит в очередь удаление файла, заменённого новым."""
+
+    if old_name and old_name != new_name:
+        delete_media_file.enqueue(name=old_name)
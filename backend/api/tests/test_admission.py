@@ -0,0 +1,80 @@
+from django.test import TestCase
+from rest_framework.exceptions import Throttled
+
+from api.admission import (Admission, Overloaded, acquire_lease, admit,
+                           refund_tokens, take_tokens)
+from api.constants import ADMISSION_LEASE_TIMEOUT
+from api.models import AdmissionBucket
+
+NOW = 1_000_000.0
+
+
+class TakeTokensTests(TestCase):
+    def test_empty_bucket_returns_wait(self):
+        self.assertEqual(take_tokens('bucket', '2/m', 1, NOW), 0)
+        self.assertEqual(take_tokens('bucket', '2/m', 1, NOW), 0)
+
+        self.assertAlmostEqual(take_tokens('bucket', '2/m', 1, NOW), 30)
+
+    def test_bucket_is_refilled_over_time(self):
+        take_tokens('bucket', '2/m', 2, NOW)
+
+        self.assertEqual(take_tokens('bucket', '2/m', 1, NOW + 30), 0)
+        self.assertGreater(take_tokens('bucket', '2/m', 1, NOW + 30), 0)
+
+    def test_refund_returns_tokens_up_to_capacity(self):
+        take_tokens('bucket', '2/m', 2, NOW)
+        refund_tokens('bucket', '2/m', 5)
+
+        self.assertEqual(AdmissionBucket.objects.get(key='bucket').tokens, 2)
+
+
+class LeaseTests(TestCase):
+    def test_slots_are_limited(self):
+        self.assertIsNotNone(acquire_lease('lease', 2, 'first', NOW))
+        self.assertIsNotNone(acquire_lease('lease', 2, 'second', NOW))
+
+        self.assertIsNone(acquire_lease('lease', 2, 'third', NOW))
+
+    def test_expired_slot_is_taken_over(self):
+        acquire_lease('lease', 1, 'first', NOW)
+
+        self.assertEqual(acquire_lease(
+            'lease', 1, 'second', NOW + ADMISSION_LEASE_TIMEOUT + 1), 0)
+
+    def test_release_frees_slots(self):
+        admission = Admission()
+        admission.leases.append(
+            ('lease', acquire_lease('lease', 1, admission.owner, NOW)))
+        admission.release()
+
+        self.assertEqual(admission.leases, [])
+        self.assertEqual(acquire_lease('lease', 1, 'second', NOW), 0)
+
+
+class AdmitTests(TestCase):
+    def test_rejected_by_concurrency_keeps_tokens(self):
+        limits = {'user_rate': '2/m', 'user_concurrency': 1}
+        admission = admit('action', limits, 'user')
+        with self.assertRaises(Throttled):
+            admit('action', limits, 'user')
+        admission.release()
+
+        admit('action', limits, 'user').release()
+
+    def test_global_rejection_refunds_user_tokens(self):
+        limits = {'user_rate': '1/m', 'global_rate': '1/m'}
+        admit('action', limits, 'first')
+        with self.assertRaises(Overloaded):
+            admit('action', limits, 'second')
+
+        self.assertEqual(
+            AdmissionBucket.objects.get(key='action:second').tokens, 1)
+
+    def test_rejection_releases_slots(self):
+        limits = {'user_concurrency': 1, 'global_rate': '1/m'}
+        admit('action', limits, 'first').release()
+        with self.assertRaises(Overloaded):
+            admit('action', limits, 'second')
+
+        self.assertEqual(acquire_lease('action:second', 1, 'other', NOW), 0)
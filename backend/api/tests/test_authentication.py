@@ -0,0 +1,58 @@
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from api.authentication import (USER_CACHE_KEY, CachedTokenAuthentication,
+                                get_shared_cache, local_token_cache)
+from recipes.tests.utils import create_user
+
+from .utils import enable_shared_cache
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        enable_shared_cache(self, AUTH_TOKEN_CACHE='shared')
+        local_token_cache.clear()
+        self.addCleanup(local_token_cache.clear)
+        self.user = create_user('reader')
+        self.token = Token.objects.create(user=self.user)
+
+    def authenticate(self):
+        user, _ = CachedTokenAuthentication().authenticate_credentials(
+            self.token.key)
+        return user
+
+    def test_shared_layer_is_used_for_shared_backend(self):
+        self.authenticate()
+        local_token_cache.clear()
+
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.email, self.user.email)
+
+    def test_local_layer_is_used_first(self):
+        self.authenticate()
+        caches['shared'].clear()
+
+        with self.assertNumQueries(0):
+            self.authenticate()
+
+    @override_settings(AUTH_TOKEN_CACHE='default')
+    def test_no_caching_without_shared_backend(self):
+        self.assertIsNone(get_shared_cache())
+        self.authenticate()
+
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+    def test_password_hash_is_not_cached(self):
+        self.authenticate()
+
+        values = caches['shared'].get(USER_CACHE_KEY.format(self.user.pk))
+        self.assertNotIn(self.user.password, values)
+        local_token_cache.clear()
+        user = self.authenticate()
+        with self.assertNumQueries(1):
+            self.assertTrue(user.check_password('password'))
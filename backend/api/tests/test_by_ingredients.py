@@ -0,0 +1,67 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.index import recipe_index
+from recipes.tests.utils import (create_ingredient, create_recipe, create_tag,
+                                 create_user)
+
+BY_INGREDIENTS_URL = '/api/recipes/by-ingredients/'
+
+
+@override_settings(RECIPE_CACHE=None)
+class ByIngredientsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        author = create_user('author')
+        self.breakfast = create_tag('breakfast')
+        self.flour, self.eggs, self.milk, self.salt = [
+            create_ingredient(name)
+            for name in ('Мука', 'Яйца', 'Молоко', 'Соль')]
+        self.pancakes = create_recipe(
+            author, [self.flour, self.eggs, self.milk, self.salt],
+            [self.breakfast], name='Блины', cooking_time=30)
+        self.omelette = create_recipe(
+            author, [self.eggs, self.milk], name='Омлет', cooking_time=10)
+        self.bread = create_recipe(author, [self.flour, self.salt],
+                                   name='Хлеб', cooking_time=120)
+        recipe_index.rebuild()
+
+    def search(self, ingredients, **params):
+        response = self.client.get(BY_INGREDIENTS_URL, {
+            'ingredients': [ingredient.id for ingredient in ingredients],
+            **params})
+        self.assertEqual(response.status_code, 200)
+        return [(recipe['id'], recipe['coverage'], recipe['missing_count'])
+                for recipe in response.json()['results']]
+
+    def test_recipes_are_ranked_by_coverage(self):
+        self.assertEqual(self.search([self.eggs, self.milk, self.flour]), [
+            (self.omelette.id, 1.0, 0),
+            (self.pancakes.id, 0.75, 1),
+            (self.bread.id, 0.5, 1),
+        ])
+
+    def test_tag_filter(self):
+        self.assertEqual(
+            self.search([self.eggs], tags=['breakfast', 'unknown']),
+            [(self.pancakes.id, 0.25, 3)])
+        self.assertEqual(self.search([self.eggs], tags=['unknown']), [])
+
+    def test_cooking_time_filter(self):
+        self.assertEqual(
+            [recipe_id for recipe_id, _, _
+             in self.search([self.flour], max_cooking_time=30)],
+            [self.pancakes.id])
+
+    def test_empty_index(self):
+        self.pancakes.delete()
+        self.omelette.delete()
+        self.bread.delete()
+        recipe_index.rebuild()
+
+        self.assertEqual(self.search([self.flour]), [])
+
+    def test_ingredients_are_required(self):
+        response = self.client.get(BY_INGREDIENTS_URL)
+
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from recipes.tests.utils import create_recipe, create_user
+
+OLD = time.time() - 2 * 24 * 60 * 60
+
+
+class CollectMediaGarbageTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        create_recipe(create_user('author'))
+        self.referenced = self.create_file('recipes/images/recipe.png')
+        self.orphan = self.create_file('recipes/images/orphan.png')
+        self.avatar = self.create_file('avatars/nested/orphan.png')
+
+    def create_file(self, name, mtime=OLD):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(b'image')
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def collect(self, *args):
+        call_command('collect_media_garbage', *args, stdout=StringIO())
+
+    def test_unreferenced_files_are_removed(self):
+        self.collect()
+
+        self.assertTrue(os.path.exists(self.referenced))
+        self.assertFalse(os.path.exists(self.orphan))
+        self.assertFalse(os.path.exists(self.avatar))
+
+    def test_recent_files_are_kept(self):
+        recent = self.create_file('recipes/images/recent.png',
+                                  mtime=time.time())
+        self.collect('--grace-period', '3600')
+
+        self.assertTrue(os.path.exists(recent))
+        self.assertFalse(os.path.exists(self.orphan))
+
+    def test_dry_run_keeps_files(self):
+        output = StringIO()
+        call_command('collect_media_garbage', '--dry-run', '-v', '2',
+                     stdout=output)
+
+        self.assertTrue(os.path.exists(self.orphan))
+        self.assertIn('recipes/images/orphan.png', output.getvalue())
+        self.assertIn('Без ссылок: 2', output.getvalue())
+
+    def test_quarantine_moves_files(self):
+        quarantine = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, quarantine, ignore_errors=True)
+        self.collect('--quarantine', quarantine)
+
+        self.assertFalse(os.path.exists(self.orphan))
+        self.assertTrue(os.path.exists(
+            os.path.join(quarantine, 'recipes/images/orphan.png')))
+        self.assertTrue(os.path.exists(
+            os.path.join(quarantine, 'avatars/nested/orphan.png')))
+        self.assertTrue(os.path.exists(self.referenced))
+
+    def test_quarantine_inside_media_root_is_rejected(self):
+        with self.assertRaises(CommandError):
+            self.collect('--quarantine',
+                         os.path.join(self.media_root, 'quarantine'))
+
+        self.assertTrue(os.path.exists(self.orphan))
@@ -0,0 +1,131 @@
+from unittest import mock
+
+import orjson
+from django.test import SimpleTestCase, TestCase
+from rest_framework.authtoken.models import Token
+
+from api import events
+from api.constants import EVENTS_QUEUE_SIZE
+from api.events import RecipeEventBroker, events_app
+from recipes.tests.utils import create_user
+from users.models import Follow
+
+
+def recipe_event(author, recipe=1):
+    return {'type': 'recipe', 'action': 'created', 'recipe': recipe,
+            'author': author}
+
+
+def follow_event(action, user, author):
+    return {'type': 'follow', 'action': action, 'user': user,
+            'author': author}
+
+
+class RecipeEventBrokerTests(SimpleTestCase):
+    def setUp(self):
+        self.broker = RecipeEventBroker()
+        patcher = mock.patch.object(self.broker, '_start')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def received(self, subscription):
+        events = []
+        while not subscription.queue.empty():
+            events.append(subscription.queue.get_nowait())
+        return events
+
+    async def test_recipe_events_reach_followers_only(self):
+        reader = self.broker.subscribe(1)
+        self.broker.load(reader, [5])
+        other = self.broker.subscribe(2)
+        self.broker.load(other, [6])
+
+        self.broker._dispatch(recipe_event(5))
+
+        self.assertEqual(self.received(reader), [recipe_event(5)])
+        self.assertEqual(self.received(other), [])
+
+    async def test_follow_events_update_index(self):
+        reader = self.broker.subscribe(1)
+        self.broker.load(reader, [5])
+
+        self.broker._dispatch(follow_event('created', 1, 6))
+        self.broker._dispatch(follow_event('deleted', 1, 5))
+        self.broker._dispatch(recipe_event(5))
+        self.broker._dispatch(recipe_event(6))
+
+        self.assertEqual(self.received(reader), [recipe_event(6)])
+        self.assertNotIn(5, self.broker._by_author)
+
+    async def test_follow_events_during_load_are_replayed(self):
+        reader = self.broker.subscribe(1)
+        self.broker._dispatch(follow_event('deleted', 1, 5))
+        self.broker._dispatch(follow_event('created', 1, 6))
+        self.broker.load(reader, [5])
+
+        self.assertEqual(reader.authors, {6})
+
+    async def test_overflow_requests_resync(self):
+        reader = self.broker.subscribe(1)
+        self.broker.load(reader, [5])
+
+        for number in range(EVENTS_QUEUE_SIZE):
+            self.broker._dispatch(recipe_event(5, number))
+        self.assertFalse(reader.overflowed)
+        self.broker._dispatch(recipe_event(5, EVENTS_QUEUE_SIZE))
+
+        self.assertTrue(reader.overflowed)
+
+    async def test_unsubscribe_cleans_index(self):
+        reader = self.broker.subscribe(1)
+        self.broker.load(reader, [5, 6])
+        self.broker.unsubscribe(reader)
+
+        self.assertEqual(dict(self.broker._by_author), {})
+        self.assertEqual(dict(self.broker._by_user), {})
+
+
+class EventsAppTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(events.broker, '_start')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('api.events.close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.reader = create_user('reader')
+        Follow.objects.create(user=self.reader, author=create_user('author'))
+        self.token = Token.objects.create(user=self.reader)
+
+    async def request(self, headers=(), query_string=b''):
+        sent = []
+
+        async def receive():
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        await events_app({'type': 'http', 'headers': list(headers),
+                          'query_string': query_string}, receive, send)
+        return sent
+
+    async def test_missing_token_is_rejected(self):
+        start, body = await self.request()
+
+        self.assertEqual(start['status'], 401)
+        self.assertIn('detail', orjson.loads(body['body']))
+
+    async def test_invalid_token_is_rejected(self):
+        start, _ = await self.request(
+            headers=[(b'authorization', b'Token invalid')])
+
+        self.assertEqual(start['status'], 401)
+
+    async def test_token_opens_stream(self):
+        start, retry = await self.request(
+            query_string=f'token={self.token.key}'.encode())
+
+        self.assertEqual(start['status'], 200)
+        self.assertEqual(retry['body'], b'retry: 5000\n\n')
+        self.assertEqual(dict(events.broker._by_user), {})
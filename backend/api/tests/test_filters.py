@@ -0,0 +1,86 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.filters import RecipeFilter
+from recipes.models import Recipe
+from recipes.tests.utils import (create_ingredient, create_recipe, create_tag,
+                                 create_user)
+
+RECIPES_URL = '/api/recipes/'
+TAGS_QUERY = '?tags=breakfast&tags=dinner&limit=100'
+
+
+def get_json(response):
+    if response.streaming:
+        return json.loads(b''.join(response.streaming_content))
+    return response.json()
+
+
+@override_settings(RECIPE_CACHE=None)
+class RecipeTagFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = create_user('author')
+        self.breakfast = create_tag('breakfast')
+        self.dinner = create_tag('dinner')
+        self.lunch = create_tag('lunch')
+        self.ingredient = create_ingredient('Мука')
+
+    def create_recipes(self, count):
+        return [
+            create_recipe(self.author, [self.ingredient],
+                          [self.breakfast, self.dinner, self.lunch],
+                          name=f'Рецепт {index}')
+            for index in range(count)
+        ]
+
+    def list_ids(self, query=TAGS_QUERY):
+        response = self.client.get(RECIPES_URL + query)
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in get_json(response)['results']]
+
+    def test_recipe_with_several_matching_tags_is_returned_once(self):
+        recipes = self.create_recipes(2)
+        other = create_recipe(self.author, [self.ingredient], [self.lunch])
+
+        ids = self.list_ids()
+
+        self.assertEqual(sorted(ids), sorted(recipe.id for recipe in recipes))
+        self.assertNotIn(other.id, ids)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        self.create_recipes(2)
+        self.list_ids()
+        with CaptureQueriesContext(connection) as small_page:
+            self.list_ids()
+
+        self.create_recipes(8)
+        with self.assertNumQueries(len(small_page)):
+            self.assertEqual(len(self.list_ids()), 10)
+
+    def test_tags_are_filtered_with_exists_subquery(self):
+        queryset = RecipeFilter(
+            data={'tags': ['breakfast', 'dinner']},
+            queryset=Recipe.objects.all()).qs
+        sql = str(queryset.query).upper()
+
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
+        self.assertNotIn('JOIN', sql)
+
+    def test_tag_removed_after_validation_is_skipped(self):
+        recipe, = self.create_recipes(1)
+        recipe_filter = RecipeFilter(queryset=Recipe.objects.all())
+        with mock.patch('api.filters.get_tag_ids_by_slug',
+                        return_value={'dinner': self.dinner.id}):
+            queryset = recipe_filter.filter_tags(
+                Recipe.objects.all(), 'tags', ['breakfast', 'dinner'])
+
+            self.assertEqual(list(queryset), [recipe])
@@ -0,0 +1,52 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.recipe_cache import get_recipe_cache, local_recipe_cache
+from recipes.tests.utils import (create_ingredient, create_recipe, create_tag,
+                                 create_user)
+
+from .test_filters import get_json
+from .utils import enable_shared_cache
+
+
+class RecipeCacheTests(TestCase):
+    def setUp(self):
+        enable_shared_cache(self, RECIPE_CACHE='shared')
+        local_recipe_cache.clear()
+        self.addCleanup(local_recipe_cache.clear)
+        self.client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe = create_recipe(
+                create_user('author'), [create_ingredient('Мука')],
+                [create_tag('breakfast')])
+
+    def get_recipe(self):
+        response = self.client.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(response.status_code, 200)
+        return get_json(response)
+
+    @override_settings(RECIPE_CACHE='default')
+    def test_process_local_backend_disables_cache(self):
+        self.assertIsNone(get_recipe_cache())
+
+    def test_representation_is_read_from_shared_cache(self):
+        self.get_recipe()
+        local_recipe_cache.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/recipes/')
+
+        self.assertEqual(get_json(response)['results'][0]['id'],
+                         self.recipe.id)
+        self.assertFalse(any('recipes_ingredientinrecipe' in query['sql']
+                             for query in queries))
+
+    def test_changed_recipe_is_not_served_from_cache(self):
+        self.get_recipe()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.name = 'Новое название'
+            self.recipe.save()
+
+        self.assertEqual(self.get_recipe()['name'], 'Новое название')
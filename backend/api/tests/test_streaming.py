@@ -0,0 +1,54 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.tests.utils import (create_ingredient, create_recipe, create_tag,
+                                 create_user)
+from users.models import Follow
+
+LIST_URLS = (
+    '/api/recipes/?limit=100',
+    '/api/recipes/?limit=2&page=2',
+    '/api/ingredients/',
+    '/api/ingredients/?name=нет',
+    '/api/users/subscriptions/?recipes_limit=1',
+)
+
+
+class StreamingResponseTests(TestCase):
+    def setUp(self):
+        self.reader = create_user('reader')
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+        tag = create_tag('breakfast')
+        ingredients = [create_ingredient(f'Ингредиент {index}')
+                       for index in range(60)]
+        for index in range(3):
+            author = create_user(f'author{index}')
+            Follow.objects.create(user=self.reader, author=author)
+            for number in range(20):
+                create_recipe(author, ingredients[number:number + 3], [tag],
+                              name=f'Рецепт {index}-{number}')
+
+    def get(self, url, streaming):
+        with override_settings(STREAM_JSON_RESPONSES=streaming):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.streaming, streaming)
+        if streaming:
+            return b''.join(response.streaming_content)
+        return response.content
+
+    def test_streamed_body_matches_regular_response(self):
+        for url in LIST_URLS:
+            with self.subTest(url=url):
+                self.assertEqual(self.get(url, True), self.get(url, False))
+
+    @override_settings(STREAM_JSON_RESPONSES=True)
+    def test_first_chunk_error_is_raised_before_response(self):
+        with mock.patch('api.fast_serializers.FastIngredientSerializer.'
+                        'to_representation', side_effect=ValueError):
+            with self.assertRaises(ValueError), self.assertLogs(
+                    'django.request', 'ERROR'):
+                self.client.get('/api/ingredients/')
@@ -0,0 +1,28 @@
+import shutil
+import tempfile
+
+from django.test import override_settings
+
+LOCMEM_CACHE = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+
+
+def enable_shared_cache(test_case, **extra_settings):
+    """
+    Подключает кэш 'shared' в файлах временного каталога: в отличие
+    от LocMemCache он общий для процессов.
+    """
+
+    cache_dir = tempfile.mkdtemp()
+    test_case.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+    settings = override_settings(
+        CACHES={
+            'default': LOCMEM_CACHE,
+            'shared': {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': cache_dir,
+            },
+        },
+        **extra_settings)
+    settings.enable()
+    test_case.addCleanup(settings.disable)
@@ -3,7 +3,7 @@ from rest_framework.routers import DefaultRouter
 
 from users.views import StandartUserViewSet
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+from .views import ChangesView, IngredientViewSet, RecipeViewSet, TagViewSet
 
 app_name = 'api'
 
@@ -15,6 +15,7 @@ router_v1.register('ingredients', IngredientViewSet, basename='ingredients')
 router_v1.register('users', StandartUserViewSet, basename='users')
 
 urlpatterns = [
+    path('changes/', ChangesView.as_view(), name='changes'),
     path('', include(router_v1.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
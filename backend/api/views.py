@@ -1,4 +1,7 @@
-from django.db.models import Sum
+import math
+
+from django.core.files.storage import default_storage
+from django.db.models import Exists, OuterRef, Sum, Value
 from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
@@ -8,17 +11,34 @@ from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
+from recipes.catalog import get_tag_ids_by_slug
+from recipes.changes import get_changes
+from recipes.constants import INGREDIENT_SNAPSHOT_RETRY_AFTER, PAGE_SIZE
+from recipes.index import get_similar_recipe_ids, recipe_index
 from recipes.models import (Favourite, Ingredient, IngredientInRecipe, Recipe,
                             ShoppingCart, ShortURL, Tag)
-
+from recipes.snapshot import get_ingredient_snapshot
+from recipes.tasks import schedule_popularity_refresh
+from users.follows import get_followed_author_ids
+from users.models import Follow
+
+from .admission import AdmissionControlMixin
+from .fast_serializers import (RECIPE_COLUMNS, RECIPE_FIELDS,
+                               FastIngredientSerializer, FastRecipeSerializer,
+                               FastTagSerializer, get_recipe_fields)
 from .filters import IngredientFilter, RecipeFilter
 from .pagination import StandardPagination
 from .permissions import IsAdminOrReadOnly, IsAuthorOrReadOnly
-from .serializers import (AddToModelSerializer, CompactRecipeSerializer,
-                          IngredientSerializer, RecipeCreationSerializer,
-                          RecipeDetailSerializer, TagSerializer)
+from .recipe_cache import get_recipe_cache
+from .serializers import (AddToModelSerializer, ChangesQuerySerializer,
+                          CompactRecipeSerializer, CookableQuerySerializer,
+                          CookableRecipeSerializer, RecipeCreationSerializer,
+                          RecipeDetailSerializer)
+from .streaming import StreamingListMixin
+from .tasks import delete_replaced_file
 
 
 @require_GET
@@ -30,10 +50,22 @@ def short_url_redirect(request, short_code):
         raise Http404('Короткая ссылка не найдена.')
 
 
-class RecipeViewSet(ModelViewSet):
+def shopping_list_ingredients(user):
+    """Ингредиенты рецептов из корзины с суммарным количеством."""
+
+    return (
+        IngredientInRecipe.objects
+        .filter(recipe__recipes_shoppingcart_recipe_related__user=user)
+        .values('ingredient__name', 'ingredient__measurement_unit')
+        .annotate(total_amount=Sum('amount'))
+    )
+
+
+class RecipeViewSet(AdmissionControlMixin, StreamingListMixin, ModelViewSet):
     """ViewSet для рецептов."""
 
     queryset = Recipe.objects.all()
+    use_read_replica = True
     pagination_class = StandardPagination
     permission_classes = (IsAuthorOrReadOnly | IsAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
@@ -51,14 +83,144 @@ class RecipeViewSet(ModelViewSet):
             'short-link': short_link
         }, status=status.HTTP_200_OK)
 
+    def get_admission_cost(self, request):
+        """
+        Страница стоит столько токенов, во сколько раз она больше
+        стандартной.
+        """
+
+        return math.ceil(self.paginator.get_page_size(request) / PAGE_SIZE)
+
+    def get_queryset(self):
+        """
+        Для чтения заранее загружает связанные объекты и считает флаги
+        текущего пользователя подзапросами, чтобы не делать запросов
+        на каждый рецепт.
+
+        Для списка и рецепта с включённым кэшем представлений
+        загружаются только id и автор: остальное берётся из кэша.
+        Без кэша загружается только то, что нужно полям, запрошенным
+        параметрами fields и omit.
+        """
+
+        queryset = super().get_queryset()
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+        fields = RECIPE_FIELDS
+        if self.action not in ('list', 'retrieve'):
+            queryset = self.load_related(queryset, fields)
+        elif get_recipe_cache() is not None:
+            fields = get_recipe_fields(self.request)
+            queryset = queryset.only('id', 'author')
+        else:
+            fields = get_recipe_fields(self.request)
+            queryset = self.load_related(queryset.only('id', *(
+                field for field in RECIPE_COLUMNS if field in fields)), fields)
+        user = self.request.user
+        flags = {
+            'is_favorited': Favourite,
+            'is_in_shopping_cart': ShoppingCart,
+        }
+        queryset = queryset.annotate(**{
+            flag: (Value(False) if user.is_anonymous
+                   else Exists(model.objects.filter(
+                       user=user, recipe=OuterRef('pk'))))
+            for flag, model in flags.items() if flag in fields
+        })
+        if ('author' in fields and not user.is_anonymous
+                and get_followed_author_ids(self.request) is None):
+            queryset = queryset.annotate(
+                author_is_subscribed=Exists(Follow.objects.filter(
+                    user=user, author=OuterRef('author'))))
+        return queryset
+
+    @staticmethod
+    def load_related(queryset, fields):
+        if 'author' in fields:
+            queryset = queryset.select_related('author')
+        if 'ingredients' in fields:
+            queryset = queryset.prefetch_related('ingredient_links')
+        return queryset
+
+    @action(detail=True, methods=['GET'])
+    def similar(self, request, pk=None):
+        """Рецепты, похожие по ингредиентам и тегам."""
+
+        recipe = get_object_or_404(Recipe, pk=pk)
+        similar_ids = get_similar_recipe_ids(recipe.id)
+        recipes = Recipe.objects.in_bulk(similar_ids)
+        serializer = CompactRecipeSerializer(
+            [recipes[recipe_id] for recipe_id in similar_ids
+             if recipe_id in recipes],
+            many=True,
+            context={'request': request},
+        )
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['GET'], url_path='by-ingredients')
+    def by_ingredients(self, request):
+        """
+        Рецепты, которые можно приготовить из имеющихся ингредиентов,
+        по убыванию доли покрытия.
+        """
+
+        query = CookableQuerySerializer(data={
+            'ingredients': request.query_params.getlist('ingredients'),
+            'tags': request.query_params.getlist('tags'),
+            **({'max_cooking_time': request.query_params['max_cooking_time']}
+               if 'max_cooking_time' in request.query_params else {}),
+        })
+        query.is_valid(raise_exception=True)
+        tags = query.validated_data.get('tags')
+        tag_ids_by_slug = get_tag_ids_by_slug()
+        tag_ids = ([tag_ids_by_slug[slug] for slug in set(tags)
+                    if slug in tag_ids_by_slug]
+                   if tags else None)
+        if tags and not tag_ids:
+            matches = []
+        else:
+            matches = recipe_index.coverage(
+                query.validated_data['ingredients'], tag_ids,
+                query.validated_data.get('max_cooking_time'))
+        page = self.paginate_queryset(matches)
+        recipes = Recipe.objects.in_bulk(
+            [recipe_id for recipe_id, _, _ in page])
+        results = []
+        for recipe_id, available, total in page:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                continue
+            recipe.coverage = round(available / total, 3)
+            recipe.missing_count = total - available
+            results.append(recipe)
+        serializer = CookableRecipeSerializer(
+            results, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
+
     def perform_create(self, serializer):
         """Метод для сохранения рецепта с текущим пользователем как автором."""
 
         serializer.save(author=self.request.user)
 
+    def perform_update(self, serializer):
+        """Старое изображение удаляется в фоне после замены."""
+
+        old_image = serializer.instance.image.name
+        recipe = serializer.save()
+        delete_replaced_file(old_image, recipe.image.name)
+
+    def perform_destroy(self, instance):
+        """Изображение удалённого рецепта удаляется в фоне."""
+
+        image = instance.image.name
+        instance.delete()
+        delete_replaced_file(image, None)
+
     def get_serializer_class(self):
         """Метод для выбора сериализатора в зависимости от действия."""
 
+        if self.action in ('list', 'retrieve'):
+            return FastRecipeSerializer
         if self.request.method in SAFE_METHODS:
             return RecipeDetailSerializer
         return RecipeCreationSerializer
@@ -73,6 +235,7 @@ class RecipeViewSet(ModelViewSet):
         )
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        schedule_popularity_refresh()
         return Response(CompactRecipeSerializer(recipe).data,
                         status=status.HTTP_201_CREATED)
 
@@ -85,6 +248,7 @@ class RecipeViewSet(ModelViewSet):
             return Response({'detail': 'Запись не найдена для удаления.'},
                             status=status.HTTP_400_BAD_REQUEST)
         obj.delete()
+        schedule_popularity_refresh()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=['post'],
@@ -117,13 +281,7 @@ class RecipeViewSet(ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        ingredients = (
-            IngredientInRecipe.objects
-            .filter(recipe__recipes_shoppingcart_recipe_related__user=user)
-            .values('ingredient__name', 'ingredient__measurement_unit')
-            .annotate(total_amount=Sum('amount'))
-        )
-
+        ingredients = shopping_list_ingredients(user)
         shopping_list = '\n'.join([
             f'{ingredient["ingredient__name"]} '
             f'({ingredient["ingredient__measurement_unit"]}) - '
@@ -141,15 +299,58 @@ class TagViewSet(ReadOnlyModelViewSet):
     """ViewSet для работы с тегами."""
 
     queryset = Tag.objects.all()
-    serializer_class = TagSerializer
+    use_read_replica = True
+    serializer_class = FastTagSerializer
     permission_classes = [AllowAny]
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(StreamingListMixin, ReadOnlyModelViewSet):
     """ViewSet для работы с ингредиентами."""
 
     queryset = Ingredient.objects.all()
-    serializer_class = IngredientSerializer
+    use_read_replica = True
+    serializer_class = FastIngredientSerializer
     permission_classes = [AllowAny]
     filter_backends = [DjangoFilterBackend]
     filterset_class = IngredientFilter
+
+    @action(detail=False, methods=['GET'])
+    def snapshot(self, request):
+        """
+        Версия и адрес снимка всего каталога ингредиентов.
+
+        Клиент загружает снимок один раз и фильтрует его у себя, пока
+        версия не изменится. Пока первый снимок не опубликован фоновой
+        задачей, отвечает 503 с Retry-After.
+        """
+
+        snapshot = get_ingredient_snapshot()
+        if snapshot is None:
+            return Response(
+                {'detail': 'Снимок каталога ещё публикуется.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': str(INGREDIENT_SNAPSHOT_RETRY_AFTER)})
+        return Response({
+            'version': snapshot['version'],
+            'count': snapshot['count'],
+            'url': request.build_absolute_uri(
+                default_storage.url(snapshot['path'])),
+        })
+
+
+class ChangesView(APIView):
+    """
+    Лента изменений избранного, корзины, подписок и рецептов текущего
+    пользователя после курсора since.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = ChangesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return Response(get_changes(
+            request.user,
+            query.validated_data.get('since'),
+            query.validated_data['limit'],
+        ))
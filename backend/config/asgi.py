@@ -1,7 +1,28 @@
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from api.events import EVENTS_PATH, events_app  # noqa: E402
+
+if settings.DATABASES['default']['ENGINE'] == 'config.pooled_postgresql':
+    from config.pooled_postgresql.base import (start_pool_stats_logging,
+                                               warm_up_pools)
+
+    warm_up_pools()
+    start_pool_stats_logging()
+
+
+async def application(scope, receive, send):
+    """
+    Долгие SSE-соединения /api/events/ обслуживаются отдельным
+    ASGI-приложением, остальные запросы — Django.
+    """
+
+    if scope['type'] == 'http' and scope['path'] == EVENTS_PATH:
+        return await events_app(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -0,0 +1,21 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+def shared_cache(alias):
+    """
+    Кэш alias, если он общий для процессов, иначе None.
+
+    LocMemCache живёт в памяти одного процесса: сброс записи в нём
+    не виден другим воркерам, поэтому как общий уровень он не годится.
+    """
+
+    if not alias:
+        return None
+    cache = caches[alias]
+    if isinstance(cache, PROCESS_LOCAL_CACHES):
+        return None
+    return cache
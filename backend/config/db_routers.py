@@ -0,0 +1,101 @@
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+read_replica = ContextVar('read_replica', default=None)
+
+REPLICA_APP_LABELS = frozenset(('recipes', 'users'))
+
+LAG_QUERY = (
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() '
+    'THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) '
+    'END'
+)
+
+_replica_health = {}
+
+
+def get_replica_aliases():
+    """Возвращает алиасы всех настроенных реплик."""
+
+    return [alias for alias in settings.DATABASES if alias != 'default']
+
+
+def _replica_lag(alias):
+    """Запрашивает у реплики отставание воспроизведения WAL в секундах."""
+
+    with connections[alias].cursor() as cursor:
+        cursor.execute(LAG_QUERY)
+        lag = cursor.fetchone()[0]
+    return float(lag or 0)
+
+
+def is_replica_healthy(alias):
+    """
+    Проверяет, что реплика доступна и отстаёт не больше допустимого.
+
+    Результат проверки запоминается на REPLICA_LAG_CHECK_INTERVAL секунд,
+    чтобы не опрашивать реплику на каждом запросе.
+    """
+
+    now = time.monotonic()
+    checked_at, healthy = _replica_health.get(alias, (None, False))
+    if (checked_at is not None
+            and now - checked_at < settings.REPLICA_LAG_CHECK_INTERVAL):
+        return healthy
+    try:
+        lag = _replica_lag(alias)
+    except DatabaseError:
+        logger.warning('Реплика %s недоступна.', alias, exc_info=True)
+        healthy = False
+    else:
+        healthy = lag <= settings.REPLICA_MAX_LAG
+        if not healthy:
+            logger.warning('Реплика %s отстаёт на %.1f с.', alias, lag)
+    _replica_health[alias] = (now, healthy)
+    return healthy
+
+
+def choose_replica():
+    """Выбирает случайную здоровую реплику или None."""
+
+    replicas = [alias for alias in get_replica_aliases()
+                if is_replica_healthy(alias)]
+    if not replicas:
+        return None
+    return random.choice(replicas)
+
+
+class PrimaryReplicaRouter:
+    """
+    Роутер, направляющий чтение моделей приложений на реплики.
+
+    На реплику уходят только запросы, для которых ReplicaRoutingMiddleware
+    выбрала реплику в read_replica; всё остальное, включая запись, идёт
+    в default.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in REPLICA_APP_LABELS:
+            return read_replica.get()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = set(settings.DATABASES)
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_replica_aliases():
+            return False
+        return None
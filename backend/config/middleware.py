@@ -0,0 +1,86 @@
+import hashlib
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from .caches import shared_cache
+from .db_routers import choose_replica, get_replica_aliases, read_replica
+
+PRIMARY_PIN_KEY = 'db:pin-primary:{}'
+PRIMARY_PIN_COOKIE = 'pin_primary'
+PRIMARY_PIN_SALT = 'config.middleware.pin_primary'
+
+
+def get_pin_cache():
+    return shared_cache(settings.REPLICA_PIN_CACHE)
+
+
+def get_pin_key(request):
+    """
+    Ключ закрепления клиента за основной базой.
+
+    Клиенты API авторизуются токеном, поэтому ключом служит хэш заголовка
+    Authorization; анонимные запросы не закрепляются.
+    """
+
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    return PRIMARY_PIN_KEY.format(
+        hashlib.sha256(authorization.encode()).hexdigest())
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Включает чтение с реплик для безопасных запросов к вьюсетам,
+    отмеченным атрибутом use_read_replica. Реплика выбирается один раз
+    на запрос, и все его чтения идут в неё.
+
+    После успешной записи клиент на REPLICA_STICKY_SECONDS секунд
+    закрепляется за основной базой, чтобы видеть свои изменения.
+    Закрепление хранится в общем кэше REPLICA_PIN_CACHE, а без него —
+    в подписанной cookie.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = read_replica.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            read_replica.reset(token)
+        if (request.method not in SAFE_METHODS
+                and response.status_code < 400):
+            self.pin_to_primary(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method in SAFE_METHODS
+                and get_replica_aliases()
+                and getattr(getattr(view_func, 'cls', None),
+                            'use_read_replica', False)
+                and not self.is_pinned(request)):
+            read_replica.set(choose_replica())
+
+    def is_pinned(self, request):
+        pin_cache = get_pin_cache()
+        if pin_cache is None:
+            return request.get_signed_cookie(
+                PRIMARY_PIN_COOKIE, default=None, salt=PRIMARY_PIN_SALT,
+                max_age=settings.REPLICA_STICKY_SECONDS) is not None
+        key = get_pin_key(request)
+        return key is not None and pin_cache.get(key) is not None
+
+    def pin_to_primary(self, request, response):
+        pin_cache = get_pin_cache()
+        if pin_cache is None:
+            response.set_signed_cookie(
+                PRIMARY_PIN_COOKIE, '1', salt=PRIMARY_PIN_SALT,
+                max_age=settings.REPLICA_STICKY_SECONDS, httponly=True,
+                samesite='Lax')
+            return
+        key = get_pin_key(request)
+        if key is not None:
+            pin_cache.set(key, True, settings.REPLICA_STICKY_SECONDS)
@@ -0,0 +1,74 @@
+import logging
+
+from django.db import DatabaseError, connections
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from .pool import get_pool, start_stats_logging
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Бэкенд PostgreSQL, который берёт соединения из пула процесса.
+
+    Django закрывает соединение в конце каждого запроса (CONN_MAX_AGE = 0),
+    а этот бэкенд вместо закрытия возвращает его в пул, поэтому схема
+    одинаково работает под WSGI и ASGI.
+    """
+
+    @property
+    def connection_pool(self):
+        return get_pool(self.alias, self.settings_dict.get('POOL', {}))
+
+    def get_new_connection(self, conn_params):
+        connection = self.connection_pool.getconn(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params))
+        self.isolation_level = IsolationLevel(
+            self.settings_dict['OPTIONS'].get(
+                'isolation_level', IsolationLevel.READ_COMMITTED))
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.connection_pool.putconn(self.connection)
+
+    def warm_up(self):
+        """Заранее открывает min_size соединений пула."""
+
+        with self.wrap_database_errors:
+            self.connection_pool.warm_up(
+                lambda: super(DatabaseWrapper, self).get_new_connection(
+                    self.get_connection_params()))
+
+
+def warm_up_pools():
+    """
+    Открывает минимальное число соединений для всех пулов процесса.
+
+    Вызывается из точек входа WSGI и ASGI; недоступная база не мешает
+    запуску приложения, соединения тогда откроются по первому запросу.
+    """
+
+    for connection in connections.all():
+        if isinstance(connection, DatabaseWrapper):
+            try:
+                connection.warm_up()
+            except DatabaseError:
+                logger.warning('Не удалось прогреть пул %s.',
+                               connection.alias, exc_info=True)
+
+
+def start_pool_stats_logging():
+    """
+    Включает периодическую запись статистики пулов в лог, если для базы
+    default задан POOL['STATS_INTERVAL'].
+    """
+
+    interval = connections['default'].settings_dict.get(
+        'POOL', {}).get('STATS_INTERVAL')
+    if interval:
+        start_stats_logging(interval)
@@ -0,0 +1,284 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from psycopg2 import OperationalError
+from psycopg2.extensions import (TRANSACTION_STATUS_IDLE,
+                                 TRANSACTION_STATUS_UNKNOWN)
+
+logger = logging.getLogger(__name__)
+
+_pools = {}
+_pools_lock = threading.Lock()
+_stats_loggers = {}
+
+
+class PooledConnection:
+    """Соединение из пула вместе со временем его создания."""
+
+    __slots__ = ('connection', 'created_at')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    Потокобезопасный пул соединений psycopg2.
+
+    Перед выдачей соединение проверяется запросом SELECT 1, соединения
+    старше max_lifetime закрываются, а при исчерпании пула вызывающий
+    поток ждёт не дольше timeout секунд.
+    """
+
+    def __init__(self, alias, min_size, max_size, max_lifetime, timeout):
+        self.alias = alias
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self._idle = deque()
+        self._in_use = {}
+        self._opening = 0
+        self._condition = threading.Condition()
+        self._stats = dict.fromkeys(
+            ('connections_created', 'connections_closed', 'checkouts',
+             'timeouts', 'health_check_failures', 'expired'), 0)
+        self._wait_time = 0.0
+        self._waiting = 0
+
+    @property
+    def size(self):
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def stats(self):
+        """Снимок счётчиков пула для мониторинга."""
+
+        with self._condition:
+            return {
+                **self._stats,
+                'size': self.size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'waiting': self._waiting,
+                'wait_time_total': round(self._wait_time, 6),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+            }
+
+    def warm_up(self, connect):
+        """Открывает соединения до min_size."""
+
+        while True:
+            with self._condition:
+                if self.size >= self.min_size:
+                    return
+                self._opening += 1
+            pooled = self._open(connect)
+            with self._condition:
+                self._idle.append(pooled)
+                self._condition.notify()
+
+    def getconn(self, connect):
+        """Выдаёт живое соединение, при необходимости открывая новое."""
+
+        deadline = time.monotonic() + self.timeout
+        while True:
+            pooled = self._reserve(deadline)
+            if pooled is None:
+                pooled = self._open(connect)
+            elif not self._is_alive(pooled):
+                self._discard(pooled)
+                continue
+            with self._condition:
+                self._in_use[id(pooled.connection)] = pooled
+                self._stats['checkouts'] += 1
+            return pooled.connection
+
+    def putconn(self, connection):
+        """Возвращает соединение в пул или закрывает непригодное."""
+
+        with self._condition:
+            pooled = self._in_use.pop(id(connection), None)
+        if pooled is None:
+            connection.close()
+            return
+        if not self._reset(pooled):
+            self._discard(pooled)
+            return
+        with self._condition:
+            self._idle.append(pooled)
+            self._condition.notify()
+
+    def close_all(self):
+        """Закрывает все свободные соединения пула."""
+
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+        for pooled in idle:
+            self._discard(pooled)
+
+    def _reserve(self, deadline):
+        """
+        Берёт свободное соединение или место под новое.
+
+        Возвращает None, если вызывающему нужно открыть соединение самому.
+        """
+
+        with self._condition:
+            started = time.monotonic()
+            self._waiting += 1
+            try:
+                while True:
+                    if self._idle:
+                        return self._idle.pop()
+                    if self.size < self.max_size:
+                        self._opening += 1
+                        return None
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise OperationalError(
+                            f'Пул соединений {self.alias} исчерпан: '
+                            f'нет свободного соединения за '
+                            f'{self.timeout} с.')
+                    self._condition.wait(remaining)
+            finally:
+                self._waiting -= 1
+                self._wait_time += time.monotonic() - started
+
+    def _open(self, connect):
+        try:
+            connection = connect()
+        except BaseException:
+            with self._condition:
+                self._opening -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._opening -= 1
+            self._stats['connections_created'] += 1
+        return PooledConnection(connection)
+
+    def _is_alive(self, pooled):
+        if self._expired(pooled):
+            return False
+        connection = pooled.connection
+        if connection.closed:
+            self._count('health_check_failures')
+            return False
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if connection.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except Exception:
+            self._count('health_check_failures')
+            return False
+        return True
+
+    def _reset(self, pooled):
+        connection = pooled.connection
+        if connection.closed or self._expired(pooled):
+            return False
+        status = connection.info.transaction_status
+        if status == TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except Exception:
+                return False
+        return True
+
+    def _expired(self, pooled):
+        if (self.max_lifetime
+                and time.monotonic() - pooled.created_at > self.max_lifetime):
+            self._count('expired')
+            return True
+        return False
+
+    def _count(self, name):
+        with self._condition:
+            self._stats[name] += 1
+
+    def _discard(self, pooled):
+        try:
+            pooled.connection.close()
+        except Exception:
+            logger.debug('Ошибка при закрытии соединения.', exc_info=True)
+        with self._condition:
+            self._stats['connections_closed'] += 1
+            self._condition.notify()
+
+
+def get_pool(alias, options):
+    """
+    Возвращает пул для алиаса базы, создавая его при первом обращении.
+
+    Пулы привязаны к процессу: после fork воркер создаёт собственные.
+    """
+
+    key = (os.getpid(), alias)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(
+                    alias,
+                    min_size=options.get('MIN_SIZE', 1),
+                    max_size=options.get('MAX_SIZE', 10),
+                    max_lifetime=options.get('MAX_LIFETIME', 1800),
+                    timeout=options.get('TIMEOUT', 5),
+                )
+                _pools[key] = pool
+    return pool
+
+
+def pool_stats():
+    """Статистика всех пулов текущего процесса по алиасам баз."""
+
+    pid = os.getpid()
+    return {alias: pool.stats()
+            for (pool_pid, alias), pool in list(_pools.items())
+            if pool_pid == pid}
+
+
+def log_pool_stats():
+    """Пишет в лог статистику всех пулов текущего процесса."""
+
+    for alias, stats in pool_stats().items():
+        logger.info('Пул соединений %s: %s', alias, ' '.join(
+            f'{name}={value}' for name, value in stats.items()))
+
+
+def _log_pool_stats_forever(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            log_pool_stats()
+        except Exception:
+            logger.exception('Не удалось записать статистику пулов.')
+
+
+def start_stats_logging(interval):
+    """
+    Раз в interval секунд пишет статистику пулов процесса в лог.
+
+    Поток привязан к процессу, как и пулы: после fork функцию нужно
+    вызвать в воркере ещё раз. Повторный вызов в том же процессе ничего
+    не делает.
+    """
+
+    pid = os.getpid()
+    with _pools_lock:
+        if pid in _stats_loggers:
+            return
+        _stats_loggers[pid] = threading.Thread(
+            target=_log_pool_stats_forever, args=(interval,),
+            name='connection-pool-stats', daemon=True)
+        _stats_loggers[pid].start()
@@ -24,6 +24,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_filters',
     'rest_framework',
     'rest_framework.authtoken',
@@ -32,6 +33,7 @@ INSTALLED_APPS = [
     'recipes',
     'users',
     'api',
+    'taskqueue',
 ]
 
 MIDDLEWARE = [
@@ -42,6 +44,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'config.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -75,17 +78,117 @@ DATABASES = {
     }
 }
 
+# Пул соединений: соединение возвращается в пул в конце запроса.
+if config('DB_POOL', default=False, cast=bool):
+    DATABASES['default'].update({
+        'ENGINE': 'config.pooled_postgresql',
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MIN_SIZE': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'MAX_SIZE': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'MAX_LIFETIME': config('DB_POOL_MAX_LIFETIME', default=1800, cast=float),
+            'TIMEOUT': config('DB_POOL_TIMEOUT', default=5, cast=float),
+            # Как часто писать статистику пула в лог; 0 — не писать.
+            'STATS_INTERVAL': config('DB_POOL_STATS_INTERVAL', default=60, cast=float),
+        },
+    })
+
+# Реплики для чтения в формате host:port через запятую.
+for number, replica in enumerate(
+        config('DB_REPLICAS', default='', cast=lambda v: [s.strip() for s in v.split(',') if s.strip()]), start=1):
+    replica_host, _, replica_port = replica.partition(':')
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST': replica_host,
+        'PORT': replica_port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['config.db_routers.PrimaryReplicaRouter']
+
+# Сколько секунд после записи клиент читает только из основной базы.
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=5, cast=int)
+# Максимально допустимое отставание реплики в секундах.
+REPLICA_MAX_LAG = config('REPLICA_MAX_LAG', default=2, cast=float)
+REPLICA_LAG_CHECK_INTERVAL = config('REPLICA_LAG_CHECK_INTERVAL', default=1, cast=float)
+# Общий кэш для закрепления за основной базой; без него (пустое значение
+# или кэш в памяти процесса) закрепление хранится в подписанной cookie.
+REPLICA_PIN_CACHE = config('REPLICA_PIN_CACHE', default='default') or None
+
+# Для нескольких воркеров нужен общий кэш, например DatabaseCache.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='foodgram'),
+    }
+}
+
+# Кэш пользователей по токену: общий кэш и LRU процесса, записи которого
+# другие процессы не сбрасывают. Пустое значение или кэш в памяти процесса
+# отключают оба уровня.
+AUTH_TOKEN_CACHE = config('AUTH_TOKEN_CACHE', default='default') or None
+AUTH_TOKEN_CACHE_TIMEOUT = config('AUTH_TOKEN_CACHE_TIMEOUT', default=300, cast=int)
+AUTH_TOKEN_LOCAL_CACHE_SIZE = config('AUTH_TOKEN_LOCAL_CACHE_SIZE', default=10000, cast=int)
+AUTH_TOKEN_LOCAL_CACHE_TIMEOUT = config('AUTH_TOKEN_LOCAL_CACHE_TIMEOUT', default=5, cast=int)
+
+# Кэш общих для всех пользователей частей представлений рецептов: общий
+# кэш (пустое значение или кэш в памяти процесса отключают кэширование)
+# и LRU процесса.
+RECIPE_CACHE = config('RECIPE_CACHE', default='default') or None
+RECIPE_CACHE_TIMEOUT = config('RECIPE_CACHE_TIMEOUT', default=24 * 60 * 60, cast=int)
+RECIPE_CACHE_LOCAL_SIZE = config('RECIPE_CACHE_LOCAL_SIZE', default=5000, cast=int)
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
-    ]
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Потоковая отдача списков рецептов, подписок и ингредиентов. Ошибка
+# после первой пачки обрывает ответ со статусом 200, поэтому по умолчанию
+# выключена.
+STREAM_JSON_RESPONSES = config('STREAM_JSON_RESPONSES', default=False, cast=bool)
+
+# Ограничения дорогих действий вьюсетов: '<basename>.<action>' → лимиты.
+# user_rate/global_rate — корзина токенов ('число/период'), ёмкость равна
+# числу; user_concurrency/global_concurrency — число одновременных
+# запросов; запросы со стоимостью меньше min_cost не ограничиваются.
+# Каждая проверка пишет в основную базу, а общие лимиты параллельности
+# нужно подбирать под число воркеров, поэтому по умолчанию выключено.
+ADMISSION_CONTROL = config('ADMISSION_CONTROL', default=False, cast=bool)
+ADMISSION_LIMITS = {
+    'recipes.download_shopping_cart': {
+        'user_rate': '10/m',
+        'user_concurrency': 1,
+        'global_concurrency': 8,
+    },
+    'recipes.list': {
+        'min_cost': 2,
+        'user_rate': '120/m',
+        'global_concurrency': 16,
+    },
+    'users.subscriptions': {
+        'min_cost': 2,
+        'user_rate': '60/m',
+        'user_concurrency': 2,
+        'global_concurrency': 16,
+    },
 }
 
 DJOSER = {
@@ -137,6 +240,15 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static/')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 
+STORAGES = {
+    'default': {
+        'BACKEND': 'api.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
 CSRF_TRUSTED_ORIGINS = [
     "https://edagram.ddns.net",
     "http://localhost:8000",
@@ -0,0 +1,39 @@
+import os
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from config.pooled_postgresql import pool
+
+
+class FakeConnection:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class PoolStatsTests(SimpleTestCase):
+    def setUp(self):
+        self.pool = pool.get_pool('stats_test', {'MIN_SIZE': 2})
+        self.addCleanup(pool._pools.pop, (os.getpid(), 'stats_test'))
+
+    def test_stats_are_logged_per_alias(self):
+        self.pool.warm_up(FakeConnection)
+
+        with self.assertLogs(pool.logger, 'INFO') as logs:
+            pool.log_pool_stats()
+
+        line, = [message for message in logs.output
+                 if 'stats_test' in message]
+        self.assertIn('connections_created=2', line)
+        self.assertIn('idle=2', line)
+
+    def test_logging_thread_is_started_once_per_process(self):
+        with mock.patch.object(pool, '_stats_loggers', {}), \
+                mock.patch.object(pool.threading, 'Thread') as thread:
+            pool.start_stats_logging(60)
+            pool.start_stats_logging(60)
+
+        thread.assert_called_once()
+        thread.return_value.start.assert_called_once()
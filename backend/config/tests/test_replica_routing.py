@@ -0,0 +1,181 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import DatabaseError
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from api.tests.utils import enable_shared_cache
+from config import db_routers
+from config.db_routers import (PrimaryReplicaRouter, choose_replica,
+                               read_replica)
+from config.middleware import PRIMARY_PIN_COOKIE, ReplicaRoutingMiddleware
+from recipes.models import Recipe
+from taskqueue.models import Task
+
+AUTHORIZATION = 'Token 0123456789abcdef'
+
+
+class ReplicaView:
+    use_read_replica = True
+
+
+def replica_view(request):
+    return HttpResponse()
+
+
+replica_view.cls = ReplicaView
+
+
+def primary_view(request):
+    return HttpResponse()
+
+
+class RouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def read_db(self, model=Recipe):
+        token = read_replica.set('replica_1')
+        try:
+            return self.router.db_for_read(model)
+        finally:
+            read_replica.reset(token)
+
+    def test_reads_go_to_primary_without_replica(self):
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_reads_go_to_request_replica(self):
+        self.assertEqual(self.read_db(), 'replica_1')
+
+    def test_other_apps_stay_on_primary(self):
+        self.assertIsNone(self.read_db(Task))
+
+    def test_writes_go_to_primary(self):
+        token = read_replica.set('replica_1')
+        try:
+            self.assertEqual(self.router.db_for_write(Recipe), 'default')
+        finally:
+            read_replica.reset(token)
+
+
+@override_settings(REPLICA_MAX_LAG=2, REPLICA_LAG_CHECK_INTERVAL=60)
+class ChooseReplicaTests(SimpleTestCase):
+    def setUp(self):
+        db_routers._replica_health.clear()
+        self.addCleanup(db_routers._replica_health.clear)
+        patcher = mock.patch.object(db_routers, 'get_replica_aliases',
+                                    return_value=['replica_1'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def choose(self, lag=0):
+        with mock.patch.object(db_routers, '_replica_lag', return_value=lag):
+            return choose_replica()
+
+    def test_healthy_replica_is_chosen(self):
+        self.assertEqual(self.choose(), 'replica_1')
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        with self.assertLogs(db_routers.logger, 'WARNING'):
+            self.assertIsNone(self.choose(lag=5))
+
+    def test_unavailable_replica_falls_back_to_primary(self):
+        with mock.patch.object(db_routers, '_replica_lag',
+                               side_effect=DatabaseError), \
+                self.assertLogs(db_routers.logger, 'WARNING'):
+            self.assertIsNone(choose_replica())
+
+    def test_lag_check_is_cached(self):
+        with self.assertLogs(db_routers.logger, 'WARNING'):
+            self.assertIsNone(self.choose(lag=5))
+        self.assertIsNone(self.choose(lag=0))
+        db_routers._replica_health.clear()
+        self.assertEqual(self.choose(lag=0), 'replica_1')
+
+
+@override_settings(REPLICA_STICKY_SECONDS=5)
+class MiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        enable_shared_cache(self, REPLICA_PIN_CACHE='shared')
+        patcher = mock.patch('config.middleware.get_replica_aliases',
+                             return_value=['replica_1'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('config.middleware.choose_replica',
+                             return_value='replica_1')
+        self.choose_replica = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+
+    def handle(self, method, view=replica_view, status=200, cookies=None,
+               **extra):
+        """
+        Прогоняет запрос через middleware и возвращает выбранную реплику
+        и ответ.
+        """
+
+        seen = []
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            seen.append(read_replica.get())
+            return HttpResponse(status=status)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        request = getattr(self.factory, method)('/api/recipes/', **extra)
+        request.COOKIES.update(cookies or {})
+        response = middleware(request)
+        self.assertIsNone(read_replica.get())
+        return seen[0], response
+
+    def replica(self, method, **kwargs):
+        return self.handle(method, **kwargs)[0]
+
+    def test_safe_methods_use_replica(self):
+        self.assertEqual(
+            self.replica('get', HTTP_AUTHORIZATION=AUTHORIZATION),
+            'replica_1')
+        self.assertEqual(self.replica('head'), 'replica_1')
+
+    def test_replica_is_chosen_once_per_request(self):
+        self.replica('get')
+
+        self.choose_replica.assert_called_once_with()
+
+    def test_unsafe_methods_use_primary(self):
+        self.assertIsNone(self.replica('post'))
+
+    def test_views_without_flag_use_primary(self):
+        self.assertIsNone(self.replica('get', view=primary_view))
+
+    def test_client_is_pinned_after_write(self):
+        self.replica('post', HTTP_AUTHORIZATION=AUTHORIZATION)
+        self.assertIsNone(
+            self.replica('get', HTTP_AUTHORIZATION=AUTHORIZATION))
+        self.assertEqual(self.replica('get', HTTP_AUTHORIZATION='Token other'),
+                         'replica_1')
+
+    def test_failed_write_does_not_pin(self):
+        self.replica('post', status=400, HTTP_AUTHORIZATION=AUTHORIZATION)
+        self.assertEqual(
+            self.replica('get', HTTP_AUTHORIZATION=AUTHORIZATION),
+            'replica_1')
+
+    def test_pin_expires(self):
+        self.replica('post', HTTP_AUTHORIZATION=AUTHORIZATION)
+        caches['shared'].clear()
+        self.assertEqual(
+            self.replica('get', HTTP_AUTHORIZATION=AUTHORIZATION),
+            'replica_1')
+
+    @override_settings(REPLICA_PIN_CACHE='default')
+    def test_pin_is_kept_in_signed_cookie_without_shared_cache(self):
+        _, response = self.handle('post')
+        cookie = response.cookies[PRIMARY_PIN_COOKIE]
+
+        self.assertIsNone(self.replica(
+            'get', cookies={PRIMARY_PIN_COOKIE: cookie.value}))
+        self.assertEqual(self.replica(
+            'get', cookies={PRIMARY_PIN_COOKIE: 'forged'}), 'replica_1')
+        self.assertEqual(self.replica('get'), 'replica_1')
@@ -1,7 +1,15 @@
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+if settings.DATABASES['default']['ENGINE'] == 'config.pooled_postgresql':
+    from config.pooled_postgresql.base import (start_pool_stats_logging,
+                                               warm_up_pools)
+
+    warm_up_pools()
+    start_pool_stats_logging()
@@ -1,7 +1,7 @@
 from django.contrib import admin
 
 from .models import (Favourite, Ingredient, IngredientInRecipe, Recipe,
-                     ShoppingCart, Tag)
+                     RecipePopularity, ShoppingCart, Tag)
 
 
 class IngredientInRecipeInline(admin.TabularInline):
@@ -94,3 +94,12 @@ class FavouriteAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'recipe__name')
     list_filter = ('user', 'recipe')
     ordering = ('-id',)
+
+
+@admin.register(RecipePopularity)
+class RecipePopularityAdmin(admin.ModelAdmin):
+    """Админка для модели RecipePopularity."""
+
+    list_display = ('recipe', 'day_score', 'week_score', 'total_score')
+    search_fields = ('recipe__name',)
+    ordering = ('-total_score',)
@@ -0,0 +1,147 @@
+import threading
+import time
+import uuid
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .constants import CATALOG_VERSION_CHECK_INTERVAL
+from .models import CatalogVersion, Ingredient, Tag
+
+
+def get_catalog_version():
+    """Текущая версия каталога тегов и ингредиентов из основной базы."""
+
+    return CatalogVersion.objects.using('default').values_list(
+        'version', flat=True).first() or ''
+
+
+def bump_catalog_version():
+    """
+    Записывает новую версию каталога в текущей транзакции.
+
+    Версия — случайный токен, а не счётчик: номер из откаченной
+    транзакции мог бы повториться у следующего изменения, и процесс,
+    успевший прочитать откаченный каталог, счёл бы его актуальным.
+    Другие процессы заметят новую версию не позже чем через
+    CATALOG_VERSION_CHECK_INTERVAL секунд. Текущий сбрасывает свою копию
+    сразу и ещё раз после коммита, чтобы не держать каталог, прочитанный
+    до коммита.
+    """
+
+    CatalogVersion.objects.update_or_create(
+        pk=1, defaults={'version': uuid.uuid4().hex})
+    catalog.invalidate()
+    transaction.on_commit(catalog.invalidate)
+
+
+class Catalog:
+    """
+    Словари id → объект для тегов и ингредиентов в памяти процесса.
+
+    Обе таблицы маленькие и почти не меняются, поэтому каждый процесс
+    держит их целиком и перечитывает, когда меняется версия в таблице
+    CatalogVersion. Версия сверяется не чаще раза в
+    CATALOG_VERSION_CHECK_INTERVAL секунд. Ингредиенты хранятся
+    кортежами (название, единица измерения), теги — объектами Tag
+    в порядке Tag.Meta.ordering. id, которых нет в словарях, дочитываются
+    из основной базы: каталог мог ещё не узнать о только что добавленной
+    записи.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = None
+        self._ingredients = {}
+        self._tags = {}
+        self._tag_positions = {}
+
+    def ensure_fresh(self):
+        now = time.monotonic()
+        with self._lock:
+            if (self._checked_at is None
+                    or now - self._checked_at
+                    >= CATALOG_VERSION_CHECK_INTERVAL):
+                version = get_catalog_version()
+                if self._version != version:
+                    self._reload(version)
+                self._checked_at = now
+            return self._ingredients, self._tags, self._tag_positions
+
+    def get_version(self):
+        """Версия, по которой построены словари процесса."""
+
+        self.ensure_fresh()
+        return self._version
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+            self._checked_at = None
+
+    def _reload(self, version):
+        # Читаем основную базу: отстающая реплика вернула бы прежний
+        # каталог под новой версией.
+        self._ingredients = {
+            id: (name, measurement_unit)
+            for id, name, measurement_unit in Ingredient.objects.using(
+                'default').order_by().values_list(
+                    'id', 'name', 'measurement_unit')
+        }
+        tags = list(Tag.objects.using('default'))
+        self._tags = {tag.id: tag for tag in tags}
+        self._tag_positions = {
+            tag.id: position for position, tag in enumerate(tags)}
+        self._version = version
+
+    def get_ingredients(self, ingredient_ids):
+        """Словарь id → (название, единица) для существующих id."""
+
+        ingredients, _, _ = self.ensure_fresh()
+        found = {}
+        missing = []
+        for ingredient_id in ingredient_ids:
+            if ingredient_id in ingredients:
+                found[ingredient_id] = ingredients[ingredient_id]
+            else:
+                missing.append(ingredient_id)
+        if missing:
+            for id, name, measurement_unit in Ingredient.objects.using(
+                    'default').filter(id__in=missing).values_list(
+                        'id', 'name', 'measurement_unit'):
+                found[id] = (name, measurement_unit)
+        return found
+
+    def get_tags(self, tag_ids):
+        """Существующие теги из tag_ids в порядке Tag.Meta.ordering."""
+
+        _, tags, positions = self.ensure_fresh()
+        found = [tags[tag_id] for tag_id in set(tag_ids) if tag_id in tags]
+        missing = set(tag_ids) - tags.keys()
+        if missing:
+            found.extend(Tag.objects.using('default').filter(id__in=missing))
+        return sorted(found,
+                      key=lambda tag: positions.get(tag.id, len(positions)))
+
+    def get_tag_ids_by_slug(self):
+        _, tags, _ = self.ensure_fresh()
+        return {tag.slug: tag.id for tag in tags.values()}
+
+
+catalog = Catalog()
+
+
+def get_tag_ids_by_slug():
+    """Словарь слаг → id тега из каталога процесса."""
+
+    return catalog.get_tag_ids_by_slug()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def catalog_changed(sender, **kwargs):
+    bump_catalog_version()
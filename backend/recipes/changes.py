@@ -0,0 +1,236 @@
+import zlib
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Exists, Max, OuterRef, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from users.models import Follow
+
+from .constants import (CHANGES_COMPACT_AFTER, CHANGES_RETENTION,
+                        CHANGES_SEQUENCE_BATCH_SIZE)
+from .models import (ChangeLogEntry, ChangeLogHorizon, Favourite, Recipe,
+                     ShoppingCart)
+
+Kind = ChangeLogEntry.Kind
+Action = ChangeLogEntry.Action
+SEQUENCER_LOCK_ID = zlib.crc32(b'recipes.changelog.sequencer')
+CURRENT_TXID_SQL = 'pg_current_xact_id()::text::bigint'
+SNAPSHOT_XMIN_SQL = (
+    'SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint')
+RELATION_KINDS = {
+    Favourite: Kind.FAVORITE,
+    ShoppingCart: Kind.SHOPPING_CART,
+}
+
+
+def log_change(kind, action, user_id, object_id):
+    """
+    Пишет запись журнала в текущей транзакции.
+
+    В PostgreSQL запись запоминает id своей транзакции, а позицию в
+    журнале получает позже, в sequence_changes. Транзакции, пишущие
+    в журнал, друг друга не ждут.
+    """
+
+    txid = None
+    if connection.vendor == 'postgresql':
+        txid = RawSQL(CURRENT_TXID_SQL, [])
+    ChangeLogEntry.objects.create(kind=kind, action=action, user_id=user_id,
+                                  object_id=object_id, txid=txid)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        log_change(Kind.RECIPE, Action.UPSERT, instance.author_id,
+                   instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    log_change(Kind.RECIPE, Action.DELETE, instance.author_id, instance.pk)
+
+
+@receiver(post_save, sender=Favourite)
+@receiver(post_save, sender=ShoppingCart)
+def relation_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        log_change(RELATION_KINDS[sender], Action.UPSERT, instance.user_id,
+                   instance.recipe_id)
+
+
+@receiver(post_delete, sender=Favourite)
+@receiver(post_delete, sender=ShoppingCart)
+def relation_deleted(sender, instance, **kwargs):
+    log_change(RELATION_KINDS[sender], Action.DELETE, instance.user_id,
+               instance.recipe_id)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        log_change(Kind.FOLLOW, Action.UPSERT, instance.user_id,
+                   instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    log_change(Kind.FOLLOW, Action.DELETE, instance.user_id,
+               instance.author_id)
+
+
+def get_horizon():
+    return ChangeLogHorizon.objects.using('default').values_list(
+        'last_removed_position', flat=True).first() or 0
+
+
+def get_last_position():
+    last_position = ChangeLogEntry.objects.using('default').aggregate(
+        Max('position'))['position__max']
+    return max(last_position or 0, get_horizon())
+
+
+def sequence_changes(limit=CHANGES_SEQUENCE_BATCH_SIZE):
+    """
+    Выдаёт позиции записям журнала завершившихся транзакций.
+
+    В PostgreSQL позицию получают только записи транзакций с id меньше
+    xmin текущего снимка: все они уже завершены, и записей с меньшим
+    txid больше не появится. Записи нумеруются по (txid, id), поэтому
+    позиции растут в порядке фиксации: долгая транзакция задерживает
+    нумерацию более поздних, но не блокирует их запись. Нумерует один
+    процесс за раз, остальные сразу выходят. В SQLite транзакции пишут
+    по одной, и записи нумеруются по id. Возвращает число
+    пронумерованных записей.
+    """
+
+    with transaction.atomic(using='default'):
+        pending = ChangeLogEntry.objects.using('default').filter(
+            position__isnull=True)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_try_advisory_xact_lock(%s)',
+                               [SEQUENCER_LOCK_ID])
+                if not cursor.fetchone()[0]:
+                    return 0
+                cursor.execute(SNAPSHOT_XMIN_SQL)
+                pending = pending.filter(txid__lt=cursor.fetchone()[0])
+        entry_ids = list(pending.order_by('txid', 'id').values_list(
+            'id', flat=True)[:limit])
+        if not entry_ids:
+            return 0
+        last_position = get_last_position()
+        ChangeLogEntry.objects.using('default').bulk_update(
+            [ChangeLogEntry(id=entry_id, position=last_position + number)
+             for number, entry_id in enumerate(entry_ids, start=1)],
+            ['position'])
+    return len(entry_ids)
+
+
+def get_high_water_mark():
+    """
+    Последняя позиция журнала, которую можно отдавать клиентам.
+
+    Записи незавершённых транзакций получат позиции больше неё, поэтому
+    курсор их не перескочит.
+    """
+
+    sequence_changes()
+    return get_last_position()
+
+
+def relevant_changes(user):
+    """
+    Изменения, которые касаются пользователя: его избранное, корзина,
+    подписки и рецепты, а также рецепты авторов, на которых он подписан,
+    и рецепты из его избранного и корзины.
+    """
+
+    return ChangeLogEntry.objects.filter(
+        Q(user_id=user.pk)
+        | Q(kind=Kind.RECIPE,
+            user_id__in=Follow.objects.filter(user=user).values('author_id'))
+        | Q(kind=Kind.RECIPE,
+            object_id__in=Favourite.objects.filter(
+                user=user).values('recipe_id'))
+        | Q(kind=Kind.RECIPE,
+            object_id__in=ShoppingCart.objects.filter(
+                user=user).values('recipe_id'))
+    )
+
+
+def get_changes(user, since, limit):
+    """
+    Страница изменений для пользователя после курсора since.
+
+    Если курсора нет или журнал до него уже удалён, возвращает resync:
+    клиент загружает данные заново и продолжает с выданного курсора.
+    Курсор продвигается и через записи, не касающиеся пользователя.
+    """
+
+    high_water = get_high_water_mark()
+    horizon = get_horizon()
+    if since is None or since < horizon:
+        return {'cursor': high_water, 'has_more': False, 'resync': True,
+                'results': []}
+    entries = list(relevant_changes(user).filter(
+        position__gt=since, position__lte=high_water,
+    ).order_by('position')[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    return {
+        'cursor': entries[-1].position if has_more else max(since, high_water),
+        'has_more': has_more,
+        'resync': False,
+        'results': [
+            {
+                'cursor': entry.position,
+                'type': entry.kind,
+                'action': entry.action,
+                'object_id': entry.object_id,
+                'changed_at': entry.created_at,
+            }
+            for entry in entries
+        ],
+    }
+
+
+@transaction.atomic
+def compact_changelog(now=None):
+    """
+    Сжимает журнал изменений.
+
+    Записи старше CHANGES_COMPACT_AFTER, для которых есть более новая
+    запись о том же объекте, удаляются: клиенту достаточно последнего
+    состояния. Записи старше CHANGES_RETENTION удаляются совсем, а
+    граница сдвигается, чтобы более старые курсоры получали resync.
+    Возвращает числа сжатых и удалённых записей.
+    """
+
+    now = now or timezone.now()
+    horizon, _ = ChangeLogHorizon.objects.select_for_update().get_or_create(
+        pk=1)
+    compacted, _ = ChangeLogEntry.objects.filter(
+        Exists(ChangeLogEntry.objects.filter(
+            kind=OuterRef('kind'),
+            object_id=OuterRef('object_id'),
+            user_id=OuterRef('user_id'),
+            position__gt=OuterRef('position'),
+        )),
+        created_at__lt=now - timedelta(seconds=CHANGES_COMPACT_AFTER),
+    ).delete()
+    last_removed_position = ChangeLogEntry.objects.filter(
+        created_at__lt=now - timedelta(seconds=CHANGES_RETENTION),
+    ).aggregate(Max('position'))['position__max']
+    removed = 0
+    if last_removed_position is not None:
+        removed, _ = ChangeLogEntry.objects.filter(
+            position__lte=last_removed_position).delete()
+        horizon.last_removed_position = max(horizon.last_removed_position,
+                                            last_removed_position)
+        horizon.save(update_fields=['last_removed_position'])
+    return compacted, removed
@@ -11,3 +11,22 @@ SHORTURL_SHORTCODE_MAX_LENGTH = 8
 MIN_INGREDIENT_AMOUNT = 1
 MAX_INGREDIENT_AMOUNT = 32767
 SHORT_CODE_LENGTH = 8
+MAX_IMAGE_SIZE = 10 * 1024 * 1024
+MAX_IMAGE_SIDE = 8000
+SIMILAR_RECIPES_LIMIT = 10
+SIMILAR_TAG_WEIGHT = 0.5
+SIMILAR_CACHE_TIMEOUT = 60 * 60
+RECIPE_INDEX_REFRESH_INTERVAL = 1
+POPULARITY_REFRESH_DELAY = 60
+INGREDIENT_SNAPSHOT_CACHE_TIMEOUT = 5 * 60
+INGREDIENT_SNAPSHOT_GRACE_PERIOD = 24 * 60 * 60
+INGREDIENT_SNAPSHOT_VERSION_LENGTH = 16
+INGREDIENT_SNAPSHOT_PATH_MAX_LENGTH = 255
+INGREDIENT_SNAPSHOT_RETRY_AFTER = 5
+CHANGES_PAGE_SIZE = 100
+CHANGES_MAX_PAGE_SIZE = 1000
+CHANGES_COMPACT_AFTER = 24 * 60 * 60
+CHANGES_RETENTION = 30 * 24 * 60 * 60
+CHANGES_SEQUENCE_BATCH_SIZE = 1000
+CATALOG_VERSION_LENGTH = 32
+CATALOG_VERSION_CHECK_INTERVAL = 1
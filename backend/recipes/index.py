@@ -0,0 +1,301 @@
+import math
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.core.cache import cache
+from django.dispatch import receiver
+
+from .changes import get_high_water_mark, get_horizon
+from .constants import (RECIPE_INDEX_REFRESH_INTERVAL, SIMILAR_CACHE_TIMEOUT,
+                        SIMILAR_RECIPES_LIMIT, SIMILAR_TAG_WEIGHT)
+from .models import ChangeLogEntry, IngredientInRecipe, Recipe
+from .signals import recipe_changed
+
+SIMILAR_CACHE_KEY = 'recipes:similar:{}:{}'
+
+
+class CompactIndex:
+    """
+    Неизменяемый снимок индекса в виде массивов numpy.
+
+    Рецепты пронумерованы позициями по возрастанию id; списки рецептов
+    ингредиентов и тегов хранятся отсортированными массивами позиций.
+    """
+
+    def __init__(self, recipe_ingredients, recipe_tags, recipe_cooking_time,
+                 ingredient_postings, tag_postings):
+        recipe_ids = sorted(recipe_ingredients)
+        positions = {recipe_id: position
+                     for position, recipe_id in enumerate(recipe_ids)}
+        self.recipe_ids = np.array(recipe_ids, dtype=np.int64)
+        self.sizes = np.array(
+            [len(recipe_ingredients[recipe_id]) for recipe_id in recipe_ids],
+            dtype=np.int32)
+        self.cooking_times = np.array(
+            [recipe_cooking_time[recipe_id] for recipe_id in recipe_ids],
+            dtype=np.int32)
+        self.ingredients = self._compact(ingredient_postings, positions)
+        self.tags = self._compact(tag_postings, positions)
+
+    @staticmethod
+    def _compact(postings, positions):
+        return {
+            key: np.array(sorted(positions[recipe_id]
+                                 for recipe_id in recipe_ids),
+                          dtype=np.int32)
+            for key, recipe_ids in postings.items()
+        }
+
+    def coverage(self, ingredient_ids, tag_ids=None, max_cooking_time=None):
+        """
+        Считает покрытие рецептов набором ингредиентов за один проход.
+
+        Возвращает кортежи (id рецепта, есть ингредиентов, всего
+        ингредиентов) по убыванию доли покрытия, затем по возрастанию
+        числа недостающих ингредиентов.
+        """
+
+        postings = [self.ingredients[ingredient_id]
+                    for ingredient_id in set(ingredient_ids)
+                    if ingredient_id in self.ingredients]
+        if not postings:
+            return []
+        counts = np.bincount(np.concatenate(postings),
+                             minlength=len(self.recipe_ids))
+        mask = counts > 0
+        if tag_ids:
+            tagged = np.zeros(len(self.recipe_ids), dtype=bool)
+            for tag_id in tag_ids:
+                if tag_id in self.tags:
+                    tagged[self.tags[tag_id]] = True
+            mask &= tagged
+        if max_cooking_time is not None:
+            mask &= self.cooking_times <= max_cooking_time
+        positions = np.flatnonzero(mask)
+        counts = counts[positions]
+        sizes = self.sizes[positions]
+        recipe_ids = self.recipe_ids[positions]
+        order = np.lexsort((-recipe_ids, sizes - counts, -(counts / sizes)))
+        return list(zip(recipe_ids[order].tolist(), counts[order].tolist(),
+                        sizes[order].tolist()))
+
+
+class RecipeIndex:
+    """
+    Инвертированный индекс рецептов по ингредиентам и тегам.
+
+    Для подбора по имеющимся ингредиентам из него лениво строится
+    CompactIndex, который сбрасывается при любом изменении.
+
+    Живёт в памяти процесса. Изменения рецептов применяются точечно по
+    журналу ChangeLogEntry, который общий для всех процессов; курсор
+    журнала служит версией индекса. Журнал проверяется не чаще раза
+    в RECIPE_INDEX_REFRESH_INTERVAL секунд, а после изменения рецепта
+    в этом процессе — при следующем обращении. Если журнал до курсора
+    уже удалён, индекс строится заново. Данные читаются из default:
+    отстающая реплика не должна попасть в индекс под новым курсором.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._cursor = None
+        self._checked_at = None
+        self.recipe_ingredients = {}
+        self.recipe_tags = {}
+        self.recipe_cooking_time = {}
+        self.ingredient_postings = defaultdict(set)
+        self.tag_postings = defaultdict(set)
+        self._compact = None
+
+    @property
+    def cursor(self):
+        return self._cursor
+
+    def ensure_fresh(self):
+        now = time.monotonic()
+        with self._lock:
+            if (self._checked_at is not None
+                    and now - self._checked_at
+                    < RECIPE_INDEX_REFRESH_INTERVAL):
+                return
+            if self._cursor is None or self._cursor < get_horizon():
+                self.rebuild()
+            else:
+                self._apply_changes()
+            self._checked_at = now
+
+    def expire(self):
+        """Проверить журнал при следующем обращении."""
+
+        self._checked_at = None
+
+    def rebuild(self):
+        """
+        Строит индекс по всей таблице связей.
+
+        Курсор берётся до чтения таблиц: записи журнала после него
+        применяются поверх, и повторная загрузка рецепта ничего
+        не меняет.
+        """
+
+        cursor = get_high_water_mark()
+        recipe_cooking_time = dict(
+            Recipe.objects.using('default').values_list(
+                'id', 'cooking_time'))
+        recipe_ingredients = {
+            recipe_id: set() for recipe_id in recipe_cooking_time}
+        recipe_tags = {recipe_id: set() for recipe_id in recipe_ingredients}
+        for recipe_id, ingredient_id in IngredientInRecipe.objects.using(
+                'default').values_list('recipe_id', 'ingredient_id'):
+            if recipe_id in recipe_ingredients:
+                recipe_ingredients[recipe_id].add(ingredient_id)
+        for recipe_id, tag_id in Recipe.tags.through.objects.using(
+                'default').values_list('recipe_id', 'tag_id'):
+            if recipe_id in recipe_tags:
+                recipe_tags[recipe_id].add(tag_id)
+        with self._lock:
+            self.recipe_ingredients = {}
+            self.recipe_tags = {}
+            self.recipe_cooking_time = {}
+            self.ingredient_postings = defaultdict(set)
+            self.tag_postings = defaultdict(set)
+            for recipe_id, cooking_time in recipe_cooking_time.items():
+                self._add(recipe_id, recipe_ingredients[recipe_id],
+                          recipe_tags[recipe_id], cooking_time)
+            self._cursor = cursor
+            self._apply_changes()
+
+    def _apply_changes(self):
+        high_water = get_high_water_mark()
+        if high_water <= self._cursor:
+            return
+        for recipe_id in set(ChangeLogEntry.objects.using('default').filter(
+                kind=ChangeLogEntry.Kind.RECIPE, position__gt=self._cursor,
+                position__lte=high_water).values_list(
+                    'object_id', flat=True)):
+            self._reload_recipe(recipe_id)
+        self._cursor = high_water
+
+    def similar(self, recipe_id, limit=SIMILAR_RECIPES_LIMIT):
+        """
+        Возвращает id похожих рецептов по убыванию сходства.
+
+        Сходство — взвешенный коэффициент Жаккара: ингредиенты весят
+        по обратной частоте (редкие важнее), теги — SIMILAR_TAG_WEIGHT.
+        Кандидаты — только рецепты с хотя бы одним общим ингредиентом.
+        """
+
+        self.ensure_fresh()
+        with self._lock:
+            ingredients = self.recipe_ingredients.get(recipe_id)
+            if not ingredients:
+                return []
+            tags = self.recipe_tags[recipe_id]
+            total = len(self.recipe_ingredients)
+            weights = {ingredient_id: self._weight(ingredient_id, total)
+                       for ingredient_id in ingredients}
+            target_weight = sum(weights.values())
+            candidates = set().union(*(
+                self.ingredient_postings[ingredient_id]
+                for ingredient_id in ingredients))
+            candidates.discard(recipe_id)
+            scores = []
+            for candidate in candidates:
+                other_ingredients = self.recipe_ingredients[candidate]
+                other_tags = self.recipe_tags[candidate]
+                common = sum(weights[ingredient_id] for ingredient_id
+                             in ingredients & other_ingredients)
+                common += SIMILAR_TAG_WEIGHT * len(tags & other_tags)
+                union = target_weight + sum(
+                    self._weight(ingredient_id, total) for ingredient_id
+                    in other_ingredients - ingredients)
+                union += SIMILAR_TAG_WEIGHT * len(tags | other_tags)
+                scores.append((common / union, candidate))
+        scores.sort(key=lambda item: (-item[0], -item[1]))
+        return [candidate for _, candidate in scores[:limit]]
+
+    def coverage(self, ingredient_ids, tag_ids=None, max_cooking_time=None):
+        """Покрытие рецептов имеющимися ингредиентами."""
+
+        self.ensure_fresh()
+        with self._lock:
+            if self._compact is None:
+                self._compact = CompactIndex(
+                    self.recipe_ingredients, self.recipe_tags,
+                    self.recipe_cooking_time, self.ingredient_postings,
+                    self.tag_postings)
+            compact = self._compact
+        return compact.coverage(ingredient_ids, tag_ids, max_cooking_time)
+
+    def _weight(self, ingredient_id, total):
+        """Обратная частота ингредиента среди рецептов."""
+
+        return math.log(
+            1 + total / len(self.ingredient_postings[ingredient_id]))
+
+    def _reload_recipe(self, recipe_id):
+        self._remove(recipe_id)
+        cooking_time = Recipe.objects.using('default').filter(
+            pk=recipe_id).values_list('cooking_time', flat=True).first()
+        if cooking_time is None:
+            return
+        self._add(
+            recipe_id,
+            set(IngredientInRecipe.objects.using('default').filter(
+                recipe_id=recipe_id).values_list('ingredient_id', flat=True)),
+            set(Recipe.tags.through.objects.using('default').filter(
+                recipe_id=recipe_id).values_list('tag_id', flat=True)),
+            cooking_time,
+        )
+
+    def _add(self, recipe_id, ingredients, tags, cooking_time):
+        self._compact = None
+        self.recipe_ingredients[recipe_id] = frozenset(ingredients)
+        self.recipe_tags[recipe_id] = frozenset(tags)
+        self.recipe_cooking_time[recipe_id] = cooking_time
+        for ingredient_id in ingredients:
+            self.ingredient_postings[ingredient_id].add(recipe_id)
+        for tag_id in tags:
+            self.tag_postings[tag_id].add(recipe_id)
+
+    def _remove(self, recipe_id):
+        self._compact = None
+        self.recipe_cooking_time.pop(recipe_id, None)
+        for ingredient_id in self.recipe_ingredients.pop(recipe_id, ()):
+            postings = self.ingredient_postings[ingredient_id]
+            postings.discard(recipe_id)
+            if not postings:
+                del self.ingredient_postings[ingredient_id]
+        for tag_id in self.recipe_tags.pop(recipe_id, ()):
+            postings = self.tag_postings[tag_id]
+            postings.discard(recipe_id)
+            if not postings:
+                del self.tag_postings[tag_id]
+
+
+recipe_index = RecipeIndex()
+
+
+def get_similar_recipe_ids(recipe_id):
+    """
+    Похожие рецепты с кэшированием результата на рецепт.
+
+    Ключ содержит курсор журнала, до которого доведён индекс: изменение
+    любого рецепта может добавить его в чужие списки или убрать из них,
+    поэтому после него не читается ни один из прежних списков.
+    """
+
+    recipe_index.ensure_fresh()
+    key = SIMILAR_CACHE_KEY.format(recipe_id, recipe_index.cursor)
+    similar = cache.get(key)
+    if similar is None:
+        similar = recipe_index.similar(recipe_id)
+        cache.set(key, similar, SIMILAR_CACHE_TIMEOUT)
+    return similar
+
+
+@receiver(recipe_changed)
+def update_recipe_index(sender, recipe_id, **kwargs):
+    recipe_index.expire()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from recipes.changes import compact_changelog
+
+
+class Command(BaseCommand):
+    help = ('Сжимает журнал изменений: удаляет перекрытые более новыми '
+            'и слишком старые записи')
+
+    def handle(self, *args, **kwargs):
+        compacted, removed = compact_changelog()
+        self.stdout.write(self.style.SUCCESS(
+            f'Журнал сжат: перекрытых записей {compacted}, '
+            f'устаревших {removed}.'))
@@ -1,20 +1,31 @@
 import csv
 
 from django.core.management.base import BaseCommand
+from django.db import transaction
 
+from recipes.catalog import bump_catalog_version
 from recipes.models import Ingredient
+from recipes.snapshot import publish_ingredient_snapshot
 
 
 class Command(BaseCommand):
-    help = 'Импортирует ингредиенты из CSV'
+    help = ('Импортирует ингредиенты из CSV. Ингредиенты, которые уже '
+            'есть в базе, пропускаются, и команда сообщает их число')
 
     def handle(self, *args, **kwargs):
         with open('ingredients.csv', 'r', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            for row in reader:
-                name, measurement_unit = row
-                Ingredient.objects.create(
-                    name=name, measurement_unit=measurement_unit
-                )
+            ingredients = [
+                Ingredient(name=name, measurement_unit=measurement_unit)
+                for name, measurement_unit in csv.reader(file)
+            ]
+        with transaction.atomic():
+            existing = Ingredient.objects.count()
+            Ingredient.objects.bulk_create(
+                ingredients, batch_size=1000, ignore_conflicts=True)
+            created = Ingredient.objects.count() - existing
+            bump_catalog_version()
+        snapshot = publish_ingredient_snapshot()
         self.stdout.write(self.style.SUCCESS(
-            'Ингредиенты успешно импортированы!'))
+            f'Ингредиенты успешно импортированы! Добавлено: {created}, '
+            f'пропущено как уже существующие: {len(ingredients) - created}. '
+            f'Версия каталога: {snapshot["version"]}.'))
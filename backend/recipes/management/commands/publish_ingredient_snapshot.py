@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from recipes.snapshot import publish_ingredient_snapshot
+
+
+class Command(BaseCommand):
+    help = ('Публикует сжатый снимок каталога ингредиентов в хранилище '
+            'медиафайлов')
+
+    def handle(self, *args, **kwargs):
+        snapshot = publish_ingredient_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f'Снимок опубликован: {snapshot["path"]}, '
+            f'ингредиентов: {snapshot["count"]}.'))
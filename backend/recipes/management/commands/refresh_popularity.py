@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from recipes.popularity import refresh_popularity
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рейтинги популярности рецептов по новым '
+            'добавлениям в избранное и корзину')
+
+    def handle(self, *args, **kwargs):
+        events = refresh_popularity()
+        self.stdout.write(self.style.SUCCESS(
+            f'Рейтинги обновлены, учтено событий: {events}.'))
@@ -0,0 +1,80 @@
+# Generated by Django 4.2.16 on 2026-10-19 06:32
+
+import datetime
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+# Существующим строкам даты добавления неизвестны: старая дата не даёт
+# им попасть в суточный и недельный рейтинги при первом пересчёте.
+HISTORICAL_CREATED_AT = datetime.datetime(
+    2000, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_alter_recipe_name_shorturl'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularityCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('refreshed_at', models.DateTimeField(verbose_name='Дата пересчёта')),
+            ],
+            options={
+                'verbose_name': 'Пересчёт популярности',
+                'verbose_name_plural': 'Пересчёты популярности',
+            },
+        ),
+        migrations.AddField(
+            model_name='favourite',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=HISTORICAL_CREATED_AT, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='favourite',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=HISTORICAL_CREATED_AT, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='shoppingcart',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+        ),
+        migrations.AlterField(
+            model_name='ingredientinrecipe',
+            name='amount',
+            field=models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1, message='Количество не может быть меньше 1.'), django.core.validators.MaxValueValidator(32767, message='Количество не может быть больше 32767.')], verbose_name='Количество'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='cooking_time',
+            field=models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1, message='Время приготовления должно быть не менее 1 минуты'), django.core.validators.MaxValueValidator(10000, message='Время приготовления не может превышать 10000 минут')], verbose_name='Время приготовления (в минутах)'),
+        ),
+        migrations.CreateModel(
+            name='RecipePopularity',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('day_score', models.FloatField(default=0, verbose_name='Рейтинг за сутки')),
+                ('week_score', models.FloatField(default=0, verbose_name='Рейтинг за неделю')),
+                ('total_score', models.PositiveIntegerField(default=0, verbose_name='Рейтинг за всё время')),
+            ],
+            options={
+                'verbose_name': 'Популярность рецепта',
+                'verbose_name_plural': 'Популярность рецептов',
+                'indexes': [models.Index(fields=['-day_score'], name='recipes_popularity_day_idx'), models.Index(fields=['-week_score'], name='recipes_popularity_week_idx'), models.Index(fields=['-total_score'], name='recipes_popularity_total_idx')],
+            },
+        ),
+    ]
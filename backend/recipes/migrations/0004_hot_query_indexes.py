@@ -0,0 +1,53 @@
+# Generated by Django 4.2.16 on 2026-10-19 06:34
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+INGREDIENT_NAME_INDEX = models.Index(
+    django.contrib.postgres.indexes.OpClass(
+        django.db.models.functions.text.Upper('name'),
+        name='text_pattern_ops'),
+    name='recipes_ingredient_name_upper',
+)
+
+
+def add_ingredient_name_index(apps, schema_editor):
+    # Класс операторов text_pattern_ops есть только в PostgreSQL; для
+    # локальной SQLite индекс не создаётся.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.add_index(
+            apps.get_model('recipes', 'Ingredient'), INGREDIENT_NAME_INDEX)
+
+
+def remove_ingredient_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.remove_index(
+            apps.get_model('recipes', 'Ingredient'), INGREDIENT_NAME_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_popularity'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(add_ingredient_name_index,
+                                     remove_ingredient_name_index),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='ingredient',
+                    index=INGREDIENT_NAME_INDEX,
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-id'], name='recipes_recipe_author_id_idx'),
+        ),
+    ]
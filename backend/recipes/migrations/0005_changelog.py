@@ -0,0 +1,42 @@
+# Generated by Django 4.2.16 on 2026-10-19 06:47
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogHorizon',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_removed_id', models.PositiveBigIntegerField(default=0, verbose_name='Последний удалённый id')),
+            ],
+            options={
+                'verbose_name': 'Граница журнала изменений',
+                'verbose_name_plural': 'Границы журнала изменений',
+            },
+        ),
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('recipe', 'Рецепт'), ('favorite', 'Избранное'), ('shopping_cart', 'Корзина'), ('follow', 'Подписка')], max_length=13, verbose_name='Тип объекта')),
+                ('action', models.CharField(choices=[('upsert', 'Создание или изменение'), ('delete', 'Удаление')], max_length=6, verbose_name='Действие')),
+                ('user_id', models.PositiveBigIntegerField(verbose_name='Пользователь')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='Объект')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Изменение',
+                'verbose_name_plural': 'Журнал изменений',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['user_id', 'id'], name='recipes_changelog_user_idx'), models.Index(fields=['kind', 'object_id', 'id'], name='recipes_changelog_object_idx'), models.Index(fields=['created_at'], name='recipes_changelog_created_idx')],
+            },
+        ),
+    ]
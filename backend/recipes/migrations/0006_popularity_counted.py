@@ -0,0 +1,42 @@
+# Generated by Django 4.2.16 on 2026-10-19 07:29
+
+from django.db import migrations, models
+
+
+def mark_counted(apps, schema_editor):
+    # События до последнего пересчёта уже учтены курсором по created_at.
+    checkpoint = apps.get_model('recipes', 'PopularityCheckpoint').objects.first()
+    if checkpoint is None:
+        return
+    for model_name in ('Favourite', 'ShoppingCart'):
+        apps.get_model('recipes', model_name).objects.filter(
+            created_at__lte=checkpoint.refreshed_at).update(counted=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_changelog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favourite',
+            name='counted',
+            field=models.BooleanField(default=False, verbose_name='Учтено в популярности'),
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='counted',
+            field=models.BooleanField(default=False, verbose_name='Учтено в популярности'),
+        ),
+        migrations.AddIndex(
+            model_name='favourite',
+            index=models.Index(condition=models.Q(('counted', False)), fields=['id'], name='recipes_favourite_uncounted'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcart',
+            index=models.Index(condition=models.Q(('counted', False)), fields=['id'], name='recipes_shoppingcart_uncounted'),
+        ),
+        migrations.RunPython(mark_counted, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.16 on 2026-10-19 07:33
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_popularity_counted'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=16, unique=True, verbose_name='Версия')),
+                ('path', models.CharField(max_length=255, verbose_name='Путь к файлу')),
+                ('count', models.PositiveIntegerField(verbose_name='Число ингредиентов')),
+                ('published_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата публикации')),
+                ('replaced_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата замены')),
+            ],
+            options={
+                'verbose_name': 'Снимок каталога ингредиентов',
+                'verbose_name_plural': 'Снимки каталога ингредиентов',
+                'ordering': ['-published_at'],
+            },
+        ),
+    ]
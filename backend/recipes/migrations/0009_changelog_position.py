@@ -0,0 +1,60 @@
+# Generated by Django 4.2.16 on 2026-10-19 09:12
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def number_existing_entries(apps, schema_editor):
+    ChangeLogEntry = apps.get_model('recipes', 'ChangeLogEntry')
+    ChangeLogEntry.objects.update(position=F('id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_catalog_version'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='changeloghorizon',
+            old_name='last_removed_id',
+            new_name='last_removed_position',
+        ),
+        migrations.AlterField(
+            model_name='changeloghorizon',
+            name='last_removed_position',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='Последняя удалённая позиция'),
+        ),
+        migrations.RemoveIndex(
+            model_name='changelogentry',
+            name='recipes_changelog_user_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='changelogentry',
+            name='recipes_changelog_object_idx',
+        ),
+        migrations.AddField(
+            model_name='changelogentry',
+            name='position',
+            field=models.PositiveBigIntegerField(blank=True, null=True, unique=True, verbose_name='Позиция'),
+        ),
+        migrations.AddField(
+            model_name='changelogentry',
+            name='txid',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='Транзакция'),
+        ),
+        migrations.RunPython(number_existing_entries, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='changelogentry',
+            index=models.Index(fields=['user_id', 'position'], name='recipes_changelog_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changelogentry',
+            index=models.Index(fields=['kind', 'object_id', 'position'], name='recipes_changelog_object_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changelogentry',
+            index=models.Index(condition=models.Q(('position__isnull', True)), fields=['txid', 'id'], name='recipes_changelog_pending_idx'),
+        ),
+    ]
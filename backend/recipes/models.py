@@ -2,10 +2,15 @@ import random
 import string
 
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import OpClass
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models.functions import Upper
+from django.utils import timezone
 
-from .constants import (INGREDIENT_NAME_MAX_LENGTH, MAX_COOKING_TIME,
+from .constants import (CATALOG_VERSION_LENGTH, INGREDIENT_NAME_MAX_LENGTH,
+                        INGREDIENT_SNAPSHOT_PATH_MAX_LENGTH,
+                        INGREDIENT_SNAPSHOT_VERSION_LENGTH, MAX_COOKING_TIME,
                         MAX_INGREDIENT_AMOUNT, MEASUREMENT_UNIT_MAX_LENGTH,
                         MIN_COOKING_TIME, MIN_INGREDIENT_AMOUNT,
                         RECIPE_NAME_MAX_LENGTH, SHORT_CODE_LENGTH,
@@ -34,6 +39,11 @@ class Ingredient(models.Model):
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ['name']
+        indexes = [
+            # Поиск по началу названия без учёта регистра (istartswith).
+            models.Index(OpClass(Upper('name'), name='text_pattern_ops'),
+                         name='recipes_ingredient_name_upper'),
+        ]
 
     def __str__(self):
         """Метод строкового представления модели."""
@@ -121,6 +131,10 @@ class Recipe(models.Model):
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-id', ]
+        indexes = [
+            models.Index(fields=['author', '-id'],
+                         name='recipes_recipe_author_id_idx'),
+        ]
 
     def __str__(self):
         """Метод строкового представления модели."""
@@ -188,6 +202,15 @@ class BaseUserRecipeRelation(models.Model):
         related_name='%(app_label)s_%(class)s_recipe_related',
         verbose_name='Рецепт'
     )
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name='Дата добавления'
+    )
+    counted = models.BooleanField(
+        default=False,
+        verbose_name='Учтено в популярности'
+    )
 
     class Meta:
         abstract = True
@@ -197,6 +220,10 @@ class BaseUserRecipeRelation(models.Model):
                 name='%(app_label)s_%(class)s_user_recipe_unique'
             )
         ]
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(counted=False),
+                         name='%(app_label)s_%(class)s_uncounted'),
+        ]
 
     def __str__(self):
         return f'{self.user} добавил {self.recipe}'
@@ -224,6 +251,109 @@ class ShoppingCart(BaseUserRecipeRelation):
         return f'{self.user} добавил {self.recipe} в корзину'
 
 
+class RecipePopularity(models.Model):
+    """
+    Рейтинг популярности рецепта.
+
+    Пересчитывается командой refresh_popularity по ещё не учтённым
+    добавлениям в избранное и корзину. Суточный и недельный рейтинги
+    экспоненциально затухают с постоянной времени в сутки и неделю
+    соответственно.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='popularity',
+        verbose_name='Рецепт'
+    )
+    day_score = models.FloatField(
+        default=0,
+        verbose_name='Рейтинг за сутки'
+    )
+    week_score = models.FloatField(
+        default=0,
+        verbose_name='Рейтинг за неделю'
+    )
+    total_score = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Рейтинг за всё время'
+    )
+
+    class Meta:
+        """Мета-параметры модели."""
+
+        verbose_name = 'Популярность рецепта'
+        verbose_name_plural = 'Популярность рецептов'
+        indexes = [
+            models.Index(fields=['-day_score'],
+                         name='recipes_popularity_day_idx'),
+            models.Index(fields=['-week_score'],
+                         name='recipes_popularity_week_idx'),
+            models.Index(fields=['-total_score'],
+                         name='recipes_popularity_total_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe}: {self.total_score}'
+
+
+class PopularityCheckpoint(models.Model):
+    """Момент последнего пересчёта рейтингов популярности."""
+
+    refreshed_at = models.DateTimeField(
+        verbose_name='Дата пересчёта'
+    )
+
+    class Meta:
+        verbose_name = 'Пересчёт популярности'
+        verbose_name_plural = 'Пересчёты популярности'
+
+    def __str__(self):
+        return f'{self.refreshed_at:%Y-%m-%d %H:%M:%S}'
+
+
+class IngredientSnapshot(models.Model):
+    """
+    Опубликованная версия снимка каталога ингредиентов.
+
+    Текущая версия — единственная с пустым replaced_at. Файлы заменённых
+    версий удаляются через INGREDIENT_SNAPSHOT_GRACE_PERIOD после
+    замены, чтобы клиенты успели дочитать их.
+    """
+
+    version = models.CharField(
+        max_length=INGREDIENT_SNAPSHOT_VERSION_LENGTH,
+        unique=True,
+        verbose_name='Версия'
+    )
+    path = models.CharField(
+        max_length=INGREDIENT_SNAPSHOT_PATH_MAX_LENGTH,
+        verbose_name='Путь к файлу'
+    )
+    count = models.PositiveIntegerField(
+        verbose_name='Число ингредиентов'
+    )
+    published_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Дата публикации'
+    )
+    replaced_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата замены'
+    )
+
+    class Meta:
+        ordering = ['-published_at']
+        verbose_name = 'Снимок каталога ингредиентов'
+        verbose_name_plural = 'Снимки каталога ингредиентов'
+
+    def __str__(self):
+        return self.version
+
+
 class ShortURL(models.Model):
     recipe = models.OneToOneField(
         Recipe,
@@ -249,3 +379,109 @@ class ShortURL(models.Model):
 
     def __str__(self):
         return self.short_code
+
+
+class ChangeLogEntry(models.Model):
+    """
+    Запись журнала изменений для синхронизации клиентов.
+
+    Журнал только дополняется. Курсором служит position: её выдаёт
+    sequence_changes после завершения транзакции txid, записавшей
+    изменение. user_id — автор рецепта или пользователь, изменивший
+    избранное, корзину или подписки; object_id — рецепт или автор,
+    на которого подписались.
+    """
+
+    class Kind(models.TextChoices):
+        RECIPE = 'recipe', 'Рецепт'
+        FAVORITE = 'favorite', 'Избранное'
+        SHOPPING_CART = 'shopping_cart', 'Корзина'
+        FOLLOW = 'follow', 'Подписка'
+
+    class Action(models.TextChoices):
+        UPSERT = 'upsert', 'Создание или изменение'
+        DELETE = 'delete', 'Удаление'
+
+    kind = models.CharField(
+        max_length=max(len(value) for value in Kind.values),
+        choices=Kind.choices,
+        verbose_name='Тип объекта'
+    )
+    action = models.CharField(
+        max_length=max(len(value) for value in Action.values),
+        choices=Action.choices,
+        verbose_name='Действие'
+    )
+    user_id = models.PositiveBigIntegerField(verbose_name='Пользователь')
+    object_id = models.PositiveBigIntegerField(verbose_name='Объект')
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Дата изменения'
+    )
+    txid = models.BigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Транзакция'
+    )
+    position = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        unique=True,
+        verbose_name='Позиция'
+    )
+
+    class Meta:
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Журнал изменений'
+        ordering = ['id', ]
+        indexes = [
+            models.Index(fields=['user_id', 'position'],
+                         name='recipes_changelog_user_idx'),
+            models.Index(fields=['kind', 'object_id', 'position'],
+                         name='recipes_changelog_object_idx'),
+            models.Index(fields=['created_at'],
+                         name='recipes_changelog_created_idx'),
+            models.Index(fields=['txid', 'id'],
+                         condition=models.Q(position__isnull=True),
+                         name='recipes_changelog_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f'#{self.pk} {self.kind} {self.object_id} {self.action}'
+
+
+class CatalogVersion(models.Model):
+    """
+    Версия каталога тегов и ингредиентов.
+
+    Меняется в транзакции, изменяющей каталог; процессы сверяют с ней
+    свои копии каталога в памяти.
+    """
+
+    version = models.CharField(
+        max_length=CATALOG_VERSION_LENGTH,
+        verbose_name='Версия'
+    )
+
+    class Meta:
+        verbose_name = 'Версия каталога'
+        verbose_name_plural = 'Версии каталога'
+
+    def __str__(self):
+        return str(self.version)
+
+
+class ChangeLogHorizon(models.Model):
+    """Последняя позиция журнала изменений, удалённая при сжатии."""
+
+    last_removed_position = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Последняя удалённая позиция'
+    )
+
+    class Meta:
+        verbose_name = 'Граница журнала изменений'
+        verbose_name_plural = 'Границы журнала изменений'
+
+    def __str__(self):
+        return str(self.last_removed_position)
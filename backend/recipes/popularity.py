@@ -0,0 +1,104 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (Favourite, PopularityCheckpoint, RecipePopularity,
+                     ShoppingCart)
+
+DAY = timedelta(days=1).total_seconds()
+WEEK = timedelta(days=7).total_seconds()
+EVENT_MODELS = (Favourite, ShoppingCart)
+COUNTED_BATCH_SIZE = 1000
+
+
+def decay(seconds, period):
+    return math.exp(-seconds / period)
+
+
+@transaction.atomic
+def refresh_popularity(now=None):
+    """
+    Пересчитывает рейтинги по ещё не учтённым событиям.
+
+    Накопленные рейтинги затухают одним UPDATE, затем к ним добавляется
+    вклад добавлений в избранное и корзину с counted=False, и они
+    помечаются учтёнными. Флаг вместо курсора по времени не теряет
+    событий, закоммиченных после пересчёта с более ранней created_at.
+    Возвращает число обработанных событий.
+    """
+
+    now = now or timezone.now()
+    checkpoint = PopularityCheckpoint.objects.select_for_update().first()
+    if checkpoint is not None:
+        elapsed = (now - checkpoint.refreshed_at).total_seconds()
+        RecipePopularity.objects.update(
+            day_score=F('day_score') * decay(elapsed, DAY),
+            week_score=F('week_score') * decay(elapsed, WEEK),
+        )
+
+    scores = defaultdict(lambda: [0.0, 0.0, 0])
+    for model in EVENT_MODELS:
+        event_ids = []
+        for event_id, recipe_id, created_at in model.objects.filter(
+                counted=False).select_for_update(skip_locked=True).values_list(
+                    'id', 'recipe_id', 'created_at').iterator():
+            age = max((now - created_at).total_seconds(), 0)
+            score = scores[recipe_id]
+            score[0] += decay(age, DAY)
+            score[1] += decay(age, WEEK)
+            score[2] += 1
+            event_ids.append(event_id)
+        for start in range(0, len(event_ids), COUNTED_BATCH_SIZE):
+            model.objects.filter(
+                id__in=event_ids[start:start + COUNTED_BATCH_SIZE]
+            ).update(counted=True)
+
+    existing = RecipePopularity.objects.in_bulk(list(scores))
+    to_create = []
+    for recipe_id, (day_score, week_score, total_score) in scores.items():
+        popularity = existing.get(recipe_id)
+        if popularity is None:
+            to_create.append(RecipePopularity(
+                recipe_id=recipe_id, day_score=day_score,
+                week_score=week_score, total_score=total_score))
+            continue
+        popularity.day_score += day_score
+        popularity.week_score += week_score
+        popularity.total_score += total_score
+    RecipePopularity.objects.bulk_update(
+        existing.values(), ('day_score', 'week_score', 'total_score'),
+        batch_size=1000)
+    RecipePopularity.objects.bulk_create(to_create, batch_size=1000)
+
+    if checkpoint is None:
+        PopularityCheckpoint.objects.create(refreshed_at=now)
+    else:
+        checkpoint.refreshed_at = now
+        checkpoint.save(update_fields=('refreshed_at',))
+    return sum(score[2] for score in scores.values())
+
+
+@receiver(post_delete, sender=Favourite)
+@receiver(post_delete, sender=ShoppingCart)
+def forget_event(sender, instance, **kwargs):
+    """
+    Вычитает из рейтинга уже учтённое событие, которое было удалено.
+    """
+
+    checkpoint = PopularityCheckpoint.objects.first()
+    if checkpoint is None or not instance.counted:
+        return
+    age = max(
+        (checkpoint.refreshed_at - instance.created_at).total_seconds(), 0)
+    RecipePopularity.objects.filter(recipe_id=instance.recipe_id).update(
+        day_score=Greatest(F('day_score') - decay(age, DAY), Value(0.0)),
+        week_score=Greatest(F('week_score') - decay(age, WEEK), Value(0.0)),
+        total_score=Greatest(F('total_score') - 1, Value(0)),
+    )
@@ -0,0 +1,72 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .models import IngredientInRecipe, Recipe
+
+# Отправляется после коммита транзакции, изменившей рецепт, его теги
+# или ингредиенты, один раз на рецепт. Аргументы: recipe_id.
+recipe_changed = Signal()
+
+PENDING_CHANGES_ATTR = '_pending_recipe_changes'
+
+
+class PendingRecipeChanges:
+    """Колбэк on_commit с id рецептов, изменённых в транзакции."""
+
+    def __init__(self):
+        self.recipe_ids = set()
+        self.sent = False
+
+    def __call__(self):
+        self.sent = True
+        for recipe_id in sorted(self.recipe_ids):
+            recipe_changed.send(sender=Recipe, recipe_id=recipe_id)
+
+
+def notify_recipe_changed(recipe_id):
+    """
+    Откладывает сигнал recipe_changed до коммита транзакции.
+
+    Одно сохранение рецепта вызывает несколько сигналов моделей: сам
+    рецепт, очистка и запись тегов, связи с ингредиентами. Их id копятся
+    в множестве одного колбэка on_commit, поэтому после коммита сигнал
+    уходит по разу на рецепт. Если колбэк пропал из очереди соединения
+    (откат или уже выполнен), заводится новый.
+    """
+
+    connection = transaction.get_connection()
+    pending = getattr(connection, PENDING_CHANGES_ATTR, None)
+    if pending is None or pending.sent or not any(
+            entry[1] is pending for entry in connection.run_on_commit):
+        pending = PendingRecipeChanges()
+        pending.recipe_ids.add(recipe_id)
+        setattr(connection, PENDING_CHANGES_ATTR, pending)
+        transaction.on_commit(pending)
+        return
+    pending.recipe_ids.add(recipe_id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_saved_or_deleted(sender, instance, **kwargs):
+    notify_recipe_changed(instance.pk)
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+def ingredient_link_saved_or_deleted(sender, instance, **kwargs):
+    notify_recipe_changed(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_links_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        notify_recipe_changed(instance.pk)
+    elif pk_set:
+        for recipe_id in pk_set:
+            notify_recipe_changed(recipe_id)
@@ -0,0 +1,174 @@
+import gzip
+import hashlib
+import posixpath
+from datetime import timedelta
+from functools import partial
+
+import orjson
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .constants import (INGREDIENT_SNAPSHOT_CACHE_TIMEOUT,
+                        INGREDIENT_SNAPSHOT_GRACE_PERIOD,
+                        INGREDIENT_SNAPSHOT_VERSION_LENGTH)
+from .models import Ingredient, IngredientSnapshot
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SNAPSHOT_DIR = 'catalog'
+SNAPSHOT_PREFIX = 'ingredients.'
+SNAPSHOT_CACHE_KEY = 'recipes:ingredient-snapshot'
+SNAPSHOT_TASK_KEY = 'recipes:publish-ingredient-snapshot'
+
+
+def build_ingredient_snapshot():
+    """
+    Каталог ингредиентов в JSON, как в ответе /api/ingredients/.
+
+    Возвращает байты, версию — начало sha256 от содержимого — и число
+    ингредиентов.
+    """
+
+    ingredients = [
+        {'id': id, 'name': name, 'measurement_unit': measurement_unit}
+        for id, name, measurement_unit in Ingredient.objects.values_list(
+            'id', 'name', 'measurement_unit')
+    ]
+    data = orjson.dumps(ingredients)
+    version = hashlib.sha256(data).hexdigest()[
+        :INGREDIENT_SNAPSHOT_VERSION_LENGTH]
+    return data, version, len(ingredients)
+
+
+def snapshot_name(version):
+    return posixpath.join(SNAPSHOT_DIR, f'{SNAPSHOT_PREFIX}{version}.json')
+
+
+def snapshot_info(snapshot):
+    return {
+        'version': snapshot.version,
+        'path': snapshot.path,
+        'count': snapshot.count,
+    }
+
+
+def _save(name, data):
+    if not default_storage.exists(name):
+        default_storage.save(name, ContentFile(data))
+
+
+def publish_ingredient_snapshot():
+    """
+    Записывает снимок каталога в хранилище медиафайлов.
+
+    Рядом с JSON кладутся сжатые копии .gz и, если установлен brotli,
+    .br — nginx отдаёт их без сжатия на лету. Имя файла содержит хэш,
+    поэтому снимок неизменяем и уже записанная версия не перезаписывается.
+    Версия записывается в IngredientSnapshot только после файлов,
+    у прежней текущей версии отмечается время замены.
+    """
+
+    data, version, count = build_ingredient_snapshot()
+    name = snapshot_name(version)
+    if brotli is not None:
+        _save(f'{name}.br', brotli.compress(data))
+    _save(f'{name}.gz', gzip.compress(data, compresslevel=9, mtime=0))
+    _save(name, data)
+
+    now = timezone.now()
+    with transaction.atomic():
+        IngredientSnapshot.objects.filter(replaced_at__isnull=True).exclude(
+            version=version).update(replaced_at=now)
+        snapshot, created = IngredientSnapshot.objects.get_or_create(
+            version=version,
+            defaults={'path': name, 'count': count, 'published_at': now})
+        if not created and snapshot.replaced_at is not None:
+            # Каталог вернулся к одной из недавних версий.
+            snapshot.replaced_at = None
+            snapshot.save(update_fields=('replaced_at',))
+        info = snapshot_info(snapshot)
+        transaction.on_commit(partial(
+            cache.set, SNAPSHOT_CACHE_KEY, info,
+            INGREDIENT_SNAPSHOT_CACHE_TIMEOUT))
+    remove_stale_snapshots(now)
+    return info
+
+
+def remove_stale_snapshots(now=None):
+    """
+    Удаляет версии, заменённые больше INGREDIENT_SNAPSHOT_GRACE_PERIOD
+    секунд назад, и их файлы.
+
+    Файлы, которых нет в IngredientSnapshot, остаются от прерванных
+    публикаций и удаляются по тому же сроку от времени записи.
+    """
+
+    deadline = (now or timezone.now()) - timedelta(
+        seconds=INGREDIENT_SNAPSHOT_GRACE_PERIOD)
+    stale = IngredientSnapshot.objects.filter(replaced_at__lt=deadline)
+    stale_versions = set(stale.values_list('version', flat=True))
+    known_versions = set(IngredientSnapshot.objects.values_list(
+        'version', flat=True)) - stale_versions
+    if default_storage.exists(SNAPSHOT_DIR):
+        _, files = default_storage.listdir(SNAPSHOT_DIR)
+        for file_name in files:
+            if not file_name.startswith(SNAPSHOT_PREFIX):
+                continue
+            version = file_name.split('.')[1]
+            if version in known_versions:
+                continue
+            path = posixpath.join(SNAPSHOT_DIR, file_name)
+            if (version in stale_versions
+                    or default_storage.get_modified_time(path) < deadline):
+                default_storage.delete(path)
+    stale.filter(version__in=stale_versions).delete()
+
+
+def get_ingredient_snapshot():
+    """
+    Текущая опубликованная версия снимка каталога.
+
+    Берётся из кэша, затем из IngredientSnapshot. Если снимок ещё ни
+    разу не публиковался, публикация ставится в очередь и возвращается
+    None: запрос не строит каталог сам.
+    """
+
+    info = cache.get(SNAPSHOT_CACHE_KEY)
+    if info is not None:
+        return info
+    snapshot = IngredientSnapshot.objects.filter(
+        replaced_at__isnull=True).first()
+    if snapshot is None:
+        schedule_snapshot_publish()
+        return None
+    info = snapshot_info(snapshot)
+    cache.set(SNAPSHOT_CACHE_KEY, info, INGREDIENT_SNAPSHOT_CACHE_TIMEOUT)
+    return info
+
+
+def schedule_snapshot_publish():
+    """
+    Откладывает публикацию снимка в фоновую задачу после коммита.
+
+    Серия изменений, пока задача ждёт в очереди, даёт одну публикацию.
+    """
+
+    from .tasks import publish_ingredient_snapshot_task
+
+    transaction.on_commit(partial(
+        publish_ingredient_snapshot_task.enqueue,
+        dedup_key=SNAPSHOT_TASK_KEY))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    schedule_snapshot_publish()
@@ -0,0 +1,29 @@
+from taskqueue.queue import task
+
+from .constants import POPULARITY_REFRESH_DELAY
+from .popularity import refresh_popularity
+from .snapshot import publish_ingredient_snapshot
+
+POPULARITY_REFRESH_KEY = 'recipes:refresh-popularity'
+
+
+@task('recipes.refresh_popularity', priority=-1, concurrency=1)
+def refresh_popularity_task():
+    refresh_popularity()
+
+
+def schedule_popularity_refresh():
+    """
+    Откладывает пересчёт рейтингов на POPULARITY_REFRESH_DELAY секунд.
+
+    Пока пересчёт ждёт в очереди, новые события к нему присоединяются
+    по ключу дедупликации.
+    """
+
+    refresh_popularity_task.enqueue(dedup_key=POPULARITY_REFRESH_KEY,
+                                    delay=POPULARITY_REFRESH_DELAY)
+
+
+@task('recipes.publish_ingredient_snapshot', concurrency=1)
+def publish_ingredient_snapshot_task():
+    publish_ingredient_snapshot()
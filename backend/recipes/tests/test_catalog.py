@@ -0,0 +1,45 @@
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase
+
+from recipes.catalog import Catalog, catalog, get_tag_ids_by_slug
+
+from .utils import create_tag
+
+
+class CatalogTests(TestCase):
+    def setUp(self):
+        catalog.invalidate()
+        self.addCleanup(catalog.invalidate)
+
+    def test_own_change_is_seen_after_commit(self):
+        get_tag_ids_by_slug()
+        with self.captureOnCommitCallbacks(execute=True):
+            tag = create_tag('breakfast')
+
+        self.assertEqual(get_tag_ids_by_slug(), {'breakfast': tag.id})
+
+    def test_other_process_sees_change_after_check_interval(self):
+        other = Catalog()
+        with mock.patch('recipes.catalog.time.monotonic', return_value=100):
+            self.assertEqual(other.get_tag_ids_by_slug(), {})
+            tag = create_tag('breakfast')
+            self.assertEqual(other.get_tag_ids_by_slug(), {})
+        with mock.patch('recipes.catalog.time.monotonic', return_value=102):
+            self.assertEqual(other.get_tag_ids_by_slug(),
+                             {'breakfast': tag.id})
+
+    @mock.patch('recipes.catalog.CATALOG_VERSION_CHECK_INTERVAL', 0)
+    def test_rolled_back_catalog_is_not_kept(self):
+        other = Catalog()
+        try:
+            with transaction.atomic():
+                create_tag('dinner')
+                self.assertIn('dinner', other.get_tag_ids_by_slug())
+                raise ValueError
+        except ValueError:
+            pass
+        tag = create_tag('breakfast')
+
+        self.assertEqual(other.get_tag_ids_by_slug(), {'breakfast': tag.id})
@@ -0,0 +1,80 @@
+import threading
+from unittest import skipUnless
+
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+
+from recipes.changes import get_changes, get_high_water_mark, log_change
+from recipes.models import ChangeLogEntry, Favourite
+
+from .utils import create_recipe, create_user
+
+Kind = ChangeLogEntry.Kind
+Action = ChangeLogEntry.Action
+
+
+class ChangesTests(TransactionTestCase):
+    def setUp(self):
+        self.author = create_user('author')
+        self.reader = create_user('reader')
+        self.recipe = create_recipe(self.author)
+
+    def test_committed_change_is_returned_immediately(self):
+        # Позицию запись получает после фиксации своей транзакции, поэтому
+        # тест идёт без общей транзакции TestCase.
+        since = get_high_water_mark()
+        Favourite.objects.create(user=self.reader, recipe=self.recipe)
+
+        changes = get_changes(self.reader, since, 100)
+
+        self.assertEqual(
+            [(change['type'], change['action'], change['object_id'])
+             for change in changes['results']],
+            [(Kind.FAVORITE, Action.UPSERT, self.recipe.id)])
+        self.assertEqual(changes['cursor'], get_high_water_mark())
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'Номера транзакций есть только в PostgreSQL.')
+class ChangeOrderingTests(TransactionTestCase):
+    def run_in_thread(self, target):
+        def run():
+            try:
+                target()
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def test_positions_follow_commit_order(self):
+        log_change(Kind.FOLLOW, Action.UPSERT, 1, 2)
+        committed = get_high_water_mark()
+        logged, release = threading.Event(), threading.Event()
+
+        def long_transaction():
+            with transaction.atomic():
+                log_change(Kind.FOLLOW, Action.UPSERT, 3, 4)
+                logged.set()
+                release.wait(10)
+
+        slow = self.run_in_thread(long_transaction)
+        self.assertTrue(logged.wait(10))
+        fast = self.run_in_thread(
+            lambda: log_change(Kind.FOLLOW, Action.UPSERT, 5, 6))
+        fast.join(10)
+
+        # Вторая транзакция не ждёт первую, но курсор не уходит за
+        # запись, которую первая ещё не зафиксировала.
+        self.assertFalse(fast.is_alive())
+        self.assertEqual(get_high_water_mark(), committed)
+        release.set()
+        slow.join(10)
+
+        self.assertEqual(
+            list(ChangeLogEntry.objects.filter(
+                position__gt=committed,
+                position__lte=get_high_water_mark(),
+            ).order_by('position').values_list('user_id', flat=True)),
+            [3, 5])
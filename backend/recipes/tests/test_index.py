@@ -0,0 +1,140 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+from recipes.index import CompactIndex, get_similar_recipe_ids, recipe_index
+from recipes.signals import recipe_changed
+
+from .utils import create_ingredient, create_recipe, create_tag, create_user
+
+
+class RecipeChangedTests(TestCase):
+    def setUp(self):
+        self.author = create_user('author')
+        self.tag = create_tag('breakfast')
+        self.ingredient = create_ingredient('Мука')
+        self.sent = []
+
+        def receiver(sender, recipe_id, **kwargs):
+            self.sent.append(recipe_id)
+
+        recipe_changed.connect(receiver)
+        self.addCleanup(recipe_changed.disconnect, receiver)
+
+    def test_signal_is_sent_once_per_recipe_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                recipe = create_recipe(self.author, [self.ingredient],
+                                       [self.tag])
+                recipe.name = 'Новое название'
+                recipe.save()
+                recipe.tags.clear()
+                recipe.tags.set([self.tag])
+                self.assertEqual(self.sent, [])
+        self.assertEqual(self.sent, [recipe.id])
+
+    def test_rolled_back_changes_are_not_sent(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    create_recipe(self.author, [self.ingredient])
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            recipe = create_recipe(self.author, [self.ingredient])
+        self.assertEqual(self.sent, [recipe.id])
+
+
+class SimilarRecipesTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        recipe_index.rebuild()
+        self.author = create_user('author')
+        self.ingredients = [create_ingredient(name)
+                            for name in ('Мука', 'Яйца', 'Молоко')]
+
+    def test_cached_lists_include_new_recipes(self):
+        pancakes = create_recipe(self.author, self.ingredients)
+        crepes = create_recipe(self.author, self.ingredients)
+        self.assertEqual(get_similar_recipe_ids(pancakes.id), [crepes.id])
+        waffles = create_recipe(self.author, self.ingredients[:2])
+        self.assertEqual(get_similar_recipe_ids(pancakes.id),
+                         [crepes.id, waffles.id])
+
+    def test_cached_lists_drop_deleted_recipes(self):
+        pancakes = create_recipe(self.author, self.ingredients)
+        crepes = create_recipe(self.author, self.ingredients)
+        self.assertEqual(get_similar_recipe_ids(pancakes.id), [crepes.id])
+        crepes.delete()
+        self.assertEqual(get_similar_recipe_ids(pancakes.id), [])
+
+    def test_changes_from_other_processes_are_applied(self):
+        pancakes = create_recipe(self.author, self.ingredients)
+        crepes = create_recipe(self.author, self.ingredients)
+        self.assertEqual(get_similar_recipe_ids(pancakes.id), [crepes.id])
+        # Рецепт изменили в другом процессе: сигнал сюда не дошёл, есть
+        # только запись в журнале изменений.
+        with mock.patch('recipes.index.recipe_index.expire'):
+            crepes.ingredient_links.all().delete()
+            crepes.save()
+        recipe_index.expire()
+
+        self.assertEqual(get_similar_recipe_ids(pancakes.id), [])
+
+
+class CompactIndexTests(SimpleTestCase):
+    def build(self, recipes):
+        """Индекс по словарю id → (ингредиенты, теги, время)."""
+
+        ingredient_postings, tag_postings = {}, {}
+        for recipe_id, (ingredients, tags, _) in recipes.items():
+            for ingredient_id in ingredients:
+                ingredient_postings.setdefault(ingredient_id, set()).add(
+                    recipe_id)
+            for tag_id in tags:
+                tag_postings.setdefault(tag_id, set()).add(recipe_id)
+        return CompactIndex(
+            {recipe_id: set(recipe[0]) for recipe_id, recipe
+             in recipes.items()},
+            {recipe_id: set(recipe[1]) for recipe_id, recipe
+             in recipes.items()},
+            {recipe_id: recipe[2] for recipe_id, recipe in recipes.items()},
+            ingredient_postings, tag_postings)
+
+    def setUp(self):
+        self.index = self.build({
+            1: ({10, 11}, {1}, 10),
+            2: ({10, 11, 12, 13}, {2}, 60),
+            3: ({10}, {1, 2}, 30),
+            4: ({12}, {1}, 10),
+            5: ({10, 12}, set(), 10),
+        })
+
+    def test_recipes_are_ranked_by_coverage(self):
+        self.assertEqual(self.index.coverage([10, 11]), [
+            (3, 1, 1),
+            (1, 2, 2),
+            (5, 1, 2),
+            (2, 2, 4),
+        ])
+
+    def test_tag_filter(self):
+        self.assertEqual(
+            [recipe_id for recipe_id, _, _
+             in self.index.coverage([10, 11], tag_ids=[2, 99])],
+            [3, 2])
+
+    def test_cooking_time_filter(self):
+        self.assertEqual(
+            [recipe_id for recipe_id, _, _
+             in self.index.coverage([10, 11], max_cooking_time=10)],
+            [1, 5])
+
+    def test_unknown_ingredients(self):
+        self.assertEqual(self.index.coverage([99]), [])
+
+    def test_empty_index(self):
+        self.assertEqual(self.build({}).coverage([10]), [])
@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from recipes.models import Favourite, RecipePopularity, ShoppingCart
+from recipes.popularity import refresh_popularity
+
+from .utils import create_recipe, create_user
+
+
+class RefreshPopularityTests(TestCase):
+    def setUp(self):
+        self.author = create_user('author')
+        self.reader = create_user('reader')
+        self.recipe = create_recipe(self.author)
+
+    def total_score(self):
+        return RecipePopularity.objects.get(recipe=self.recipe).total_score
+
+    def test_events_are_counted_once(self):
+        Favourite.objects.create(user=self.reader, recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.reader, recipe=self.recipe)
+
+        self.assertEqual(refresh_popularity(), 2)
+        self.assertEqual(refresh_popularity(), 0)
+        self.assertEqual(self.total_score(), 2)
+
+    def test_event_committed_after_refresh_is_counted(self):
+        now = timezone.now()
+        refresh_popularity(now)
+        # Транзакция получила created_at до пересчёта, а закоммитилась
+        # после него.
+        Favourite.objects.create(user=self.reader, recipe=self.recipe,
+                                 created_at=now - timedelta(seconds=5))
+
+        self.assertEqual(refresh_popularity(now + timedelta(seconds=1)), 1)
+        self.assertEqual(self.total_score(), 1)
+
+    def test_deleting_counted_event_subtracts_it(self):
+        favourite = Favourite.objects.create(user=self.reader,
+                                             recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.reader, recipe=self.recipe)
+        refresh_popularity()
+
+        Favourite.objects.get(id=favourite.id).delete()
+
+        self.assertEqual(self.total_score(), 1)
+
+    def test_deleting_uncounted_event_keeps_score(self):
+        ShoppingCart.objects.create(user=self.reader, recipe=self.recipe)
+        refresh_popularity()
+        Favourite.objects.create(user=self.reader, recipe=self.recipe).delete()
+
+        self.assertEqual(refresh_popularity(), 0)
+        self.assertEqual(self.total_score(), 1)
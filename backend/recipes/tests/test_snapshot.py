@@ -0,0 +1,92 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from recipes.constants import INGREDIENT_SNAPSHOT_GRACE_PERIOD
+from recipes.models import IngredientSnapshot
+from recipes.snapshot import (get_ingredient_snapshot,
+                              publish_ingredient_snapshot,
+                              remove_stale_snapshots)
+from taskqueue.models import Task
+
+from .utils import create_ingredient
+
+SNAPSHOT_URL = '/api/ingredients/snapshot/'
+
+
+class IngredientSnapshotTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cache.clear()
+        create_ingredient('Мука')
+
+    def publish(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return publish_ingredient_snapshot()
+
+    def test_request_does_not_build_unpublished_snapshot(self):
+        with mock.patch('recipes.snapshot.build_ingredient_snapshot') as build:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = APIClient().get(SNAPSHOT_URL)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+        build.assert_not_called()
+        self.assertTrue(Task.objects.filter(
+            name='recipes.publish_ingredient_snapshot').exists())
+
+    def test_last_published_version_is_served_without_cache(self):
+        published = self.publish()
+        cache.clear()
+        with mock.patch('recipes.snapshot.build_ingredient_snapshot') as build:
+            self.assertEqual(get_ingredient_snapshot(), published)
+
+        build.assert_not_called()
+        self.assertTrue(default_storage.exists(published['path']))
+
+    def test_replacement_time_is_recorded(self):
+        first = self.publish()
+        create_ingredient('Сахар')
+        second = self.publish()
+
+        self.assertNotEqual(first['version'], second['version'])
+        self.assertIsNotNone(
+            IngredientSnapshot.objects.get(
+                version=first['version']).replaced_at)
+        self.assertEqual(get_ingredient_snapshot(), second)
+
+    def test_replaced_version_is_kept_for_grace_period(self):
+        first = self.publish()
+        create_ingredient('Сахар')
+        second = self.publish()
+        replaced_at = IngredientSnapshot.objects.get(
+            version=first['version']).replaced_at
+        grace = timedelta(seconds=INGREDIENT_SNAPSHOT_GRACE_PERIOD)
+
+        remove_stale_snapshots(replaced_at + grace - timedelta(seconds=1))
+        self.assertTrue(default_storage.exists(first['path']))
+
+        remove_stale_snapshots(replaced_at + grace + timedelta(seconds=1))
+        self.assertFalse(default_storage.exists(first['path']))
+        self.assertFalse(default_storage.exists(f'{first["path"]}.gz'))
+        self.assertFalse(IngredientSnapshot.objects.filter(
+            version=first['version']).exists())
+        self.assertTrue(default_storage.exists(second['path']))
+
+    def test_old_file_of_current_version_is_kept(self):
+        published = self.publish()
+
+        remove_stale_snapshots(timezone.now() + timedelta(days=365))
+
+        self.assertTrue(default_storage.exists(published['path']))
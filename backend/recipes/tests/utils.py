@@ -0,0 +1,31 @@
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from users.models import User
+
+
+def create_user(username):
+    return User.objects.create_user(
+        email=f'{username}@example.com', username=username,
+        password='password', first_name=username, last_name=username)
+
+
+def create_tag(slug):
+    return Tag.objects.create(name=slug.capitalize(), slug=slug)
+
+
+def create_ingredient(name, measurement_unit='г'):
+    return Ingredient.objects.create(
+        name=name, measurement_unit=measurement_unit)
+
+
+def create_recipe(author, ingredients=(), tags=(), name='Рецепт',
+                  cooking_time=10):
+    """Рецепт с ингредиентами по 100 единиц и тегами."""
+
+    recipe = Recipe.objects.create(
+        author=author, name=name, text='Описание',
+        cooking_time=cooking_time, image='recipes/images/recipe.png')
+    recipe.tags.set(tags)
+    IngredientInRecipe.objects.bulk_create(
+        IngredientInRecipe(recipe=recipe, ingredient=ingredient, amount=100)
+        for ingredient in ingredients)
+    return recipe
@@ -0,0 +1,31 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """Админка для модели Task."""
+
+    list_display = ('id', 'name', 'status', 'priority', 'attempts',
+                    'run_after', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'dedup_key')
+    readonly_fields = ('locked_at', 'locked_by', 'last_error', 'created_at',
+                       'finished_at')
+    ordering = ('-id',)
+    actions = ['retry']
+
+    @admin.action(description='Повторить выбранные задачи')
+    def retry(self, request, queryset):
+        """Возвращает задачи с ошибкой в очередь."""
+
+        queued_keys = Task.objects.filter(
+            status=Task.Status.QUEUED, dedup_key__isnull=False,
+        ).values('dedup_key')
+        queryset.filter(status=Task.Status.FAILED).exclude(
+            dedup_key__in=queued_keys,
+        ).update(
+            status=Task.Status.QUEUED, attempts=0, run_after=timezone.now(),
+            finished_at=None)
@@ -0,0 +1,10 @@
+TASK_NAME_MAX_LENGTH = 200
+TASK_DEDUP_KEY_MAX_LENGTH = 200
+TASK_WORKER_MAX_LENGTH = 100
+TASK_DEFAULT_MAX_ATTEMPTS = 3
+TASK_RETRY_BASE_DELAY = 10
+TASK_LEASE_TIMEOUT = 15 * 60
+TASK_POLL_INTERVAL = 1
+TASK_MAINTENANCE_INTERVAL = 60
+TASK_RETENTION = 7 * 24 * 60 * 60
+TASK_FAILED_RETENTION = 30 * 24 * 60 * 60
@@ -0,0 +1,73 @@
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from taskqueue.constants import (TASK_FAILED_RETENTION, TASK_LEASE_TIMEOUT,
+                                 TASK_MAINTENANCE_INTERVAL, TASK_POLL_INTERVAL,
+                                 TASK_RETENTION)
+from taskqueue.queue import (claim_task, execute_task, purge_finished_tasks,
+                             registry, release_stale_tasks)
+
+
+class Command(BaseCommand):
+    help = ('Запускает воркер фоновых задач. Для параллельной обработки '
+            'запустите несколько воркеров')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться.')
+        parser.add_argument(
+            '--max-tasks', type=int, default=0,
+            help='Завершиться после указанного числа задач.')
+        parser.add_argument(
+            '--sleep', type=float, default=TASK_POLL_INTERVAL,
+            help='Пауза между опросами пустой очереди, в секундах.')
+        parser.add_argument(
+            '--lease-timeout', type=int, default=TASK_LEASE_TIMEOUT,
+            help='Через сколько секунд задача чужого воркера считается '
+                 'зависшей.')
+        parser.add_argument(
+            '--failed-retention', type=int, default=TASK_FAILED_RETENTION,
+            help='Через сколько секунд удалять задачи с ошибкой.')
+        parser.add_argument(
+            '--worker-id', default=f'{socket.gethostname()}:{os.getpid()}',
+            help='Имя воркера в записях задач.')
+
+    def handle(self, *args, **options):
+        stopping = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stopping.set())
+        self.stdout.write(
+            f'Воркер {options["worker_id"]}, задачи: '
+            f'{", ".join(sorted(registry)) or "нет"}.')
+
+        processed = failed = 0
+        maintenance_at = 0
+        while not stopping.is_set():
+            close_old_connections()
+            if time.monotonic() >= maintenance_at:
+                release_stale_tasks(options['lease_timeout'])
+                purge_finished_tasks(TASK_RETENTION,
+                                     options['failed_retention'])
+                maintenance_at = time.monotonic() + TASK_MAINTENANCE_INTERVAL
+            task = claim_task(options['worker_id'])
+            if task is None:
+                if options['once']:
+                    break
+                stopping.wait(options['sleep'])
+                continue
+            if not execute_task(task):
+                failed += 1
+            processed += 1
+            if processed == options['max_tasks']:
+                break
+        close_old_connections()
+        self.stdout.write(self.style.SUCCESS(
+            f'Воркер остановлен, выполнено задач: {processed}, '
+            f'с ошибкой: {failed}.'))
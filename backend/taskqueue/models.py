@@ -0,0 +1,104 @@
+from django.db import models
+from django.utils import timezone
+
+from .constants import (TASK_DEDUP_KEY_MAX_LENGTH, TASK_DEFAULT_MAX_ATTEMPTS,
+                        TASK_NAME_MAX_LENGTH, TASK_WORKER_MAX_LENGTH)
+
+
+class Task(models.Model):
+    """Модель фоновой задачи в очереди."""
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'В очереди'
+        RUNNING = 'running', 'Выполняется'
+        DONE = 'done', 'Выполнена'
+        FAILED = 'failed', 'Ошибка'
+
+    name = models.CharField(
+        max_length=TASK_NAME_MAX_LENGTH,
+        verbose_name='Задача'
+    )
+    kwargs = models.JSONField(
+        default=dict,
+        verbose_name='Аргументы'
+    )
+    priority = models.SmallIntegerField(
+        default=0,
+        verbose_name='Приоритет'
+    )
+    status = models.CharField(
+        max_length=max(len(value) for value in Status.values),
+        choices=Status.choices,
+        default=Status.QUEUED,
+        verbose_name='Статус'
+    )
+    dedup_key = models.CharField(
+        max_length=TASK_DEDUP_KEY_MAX_LENGTH,
+        null=True,
+        blank=True,
+        verbose_name='Ключ дедупликации'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток'
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=TASK_DEFAULT_MAX_ATTEMPTS,
+        verbose_name='Максимум попыток'
+    )
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Не раньше'
+    )
+    locked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Взята в работу'
+    )
+    locked_by = models.CharField(
+        max_length=TASK_WORKER_MAX_LENGTH,
+        blank=True,
+        verbose_name='Воркер'
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Создана'
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Завершена'
+    )
+
+    class Meta:
+        """Мета-параметры модели."""
+
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ['-id', ]
+        indexes = [
+            models.Index(
+                fields=['-priority', 'run_after', 'id'],
+                condition=models.Q(status='queued'),
+                name='taskqueue_task_queued_idx'
+            ),
+            models.Index(
+                fields=['name'],
+                condition=models.Q(status='running'),
+                name='taskqueue_task_running_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=models.Q(status='queued'),
+                name='taskqueue_task_active_dedup_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.get_status_display()})'
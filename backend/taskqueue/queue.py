@@ -0,0 +1,218 @@
+import logging
+import traceback
+import zlib
+from datetime import timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .constants import (TASK_DEFAULT_MAX_ATTEMPTS, TASK_LEASE_TIMEOUT,
+                        TASK_RETRY_BASE_DELAY)
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+class TaskDefinition:
+    """Зарегистрированная фоновая задача."""
+
+    def __init__(self, func, name, priority, max_attempts, concurrency,
+                 retry_delay):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency
+        self.retry_delay = retry_delay
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+    def enqueue(self, *, priority=None, dedup_key=None, delay=0, **kwargs):
+        """Ставит задачу в очередь с аргументами kwargs."""
+
+        return enqueue(self.name, kwargs, priority=priority,
+                       dedup_key=dedup_key, delay=delay)
+
+    def retry_at(self, attempts, now):
+        """Время следующей попытки с экспоненциальной задержкой."""
+
+        return now + timedelta(
+            seconds=self.retry_delay * 2 ** max(attempts - 1, 0))
+
+
+def task(name=None, *, priority=0, max_attempts=TASK_DEFAULT_MAX_ATTEMPTS,
+         concurrency=None, retry_delay=TASK_RETRY_BASE_DELAY):
+    """
+    Регистрирует функцию как фоновую задачу.
+
+    Аргументы функции передаются только по имени и должны сериализоваться
+    в JSON. concurrency ограничивает число одновременно выполняемых
+    экземпляров задачи на всех воркерах.
+    """
+
+    def decorator(func):
+        definition = TaskDefinition(
+            func, name or f'{func.__module__}.{func.__name__}', priority,
+            max_attempts, concurrency, retry_delay)
+        registry[definition.name] = definition
+        return definition
+    return decorator
+
+
+def enqueue(name, kwargs=None, *, priority=None, dedup_key=None, delay=0):
+    """
+    Ставит задачу в очередь.
+
+    Строка очереди пишется в текущей транзакции, поэтому задача станет
+    видна воркерам только после её фиксации и пропадёт при откате. Если
+    в очереди уже ждёт задача с тем же dedup_key, новая не создаётся и
+    возвращается ожидающая.
+    """
+
+    definition = registry[name]
+    try:
+        with transaction.atomic():
+            return Task.objects.create(
+                name=name,
+                kwargs=kwargs or {},
+                priority=(definition.priority if priority is None
+                          else priority),
+                dedup_key=dedup_key,
+                max_attempts=definition.max_attempts,
+                run_after=timezone.now() + timedelta(seconds=delay),
+            )
+    except IntegrityError:
+        if dedup_key is None:
+            raise
+    return Task.objects.filter(
+        dedup_key=dedup_key, status=Task.Status.QUEUED).first()
+
+
+def _has_capacity(definition):
+    """
+    Есть ли свободное место под ещё один экземпляр задачи.
+
+    Проверка идёт под транзакционной advisory-блокировкой по имени
+    задачи, поэтому два воркера не превысят лимит одновременно.
+    """
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)',
+                           [zlib.crc32(definition.name.encode())])
+    running = Task.objects.filter(
+        name=definition.name, status=Task.Status.RUNNING).count()
+    return running < definition.concurrency
+
+
+def claim_task(worker):
+    """
+    Забирает самую приоритетную готовую задачу.
+
+    Строки, заблокированные другими воркерами, пропускаются
+    (SELECT ... FOR UPDATE SKIP LOCKED), как и задачи, упёршиеся
+    в лимит одновременного выполнения.
+    """
+
+    saturated = set()
+    while True:
+        with transaction.atomic():
+            now = timezone.now()
+            task = (
+                Task.objects.select_for_update(skip_locked=True)
+                .filter(status=Task.Status.QUEUED, run_after__lte=now,
+                        name__in=registry)
+                .exclude(name__in=saturated)
+                .order_by('-priority', 'run_after', 'id')
+                .first()
+            )
+            if task is None:
+                return None
+            definition = registry[task.name]
+            if definition.concurrency and not _has_capacity(definition):
+                saturated.add(task.name)
+                continue
+            task.status = Task.Status.RUNNING
+            task.attempts += 1
+            task.locked_at = now
+            task.locked_by = worker
+            task.save(update_fields=['status', 'attempts', 'locked_at',
+                                     'locked_by'])
+            return task
+
+
+def execute_task(task):
+    """Выполняет взятую задачу и записывает результат."""
+
+    definition = registry[task.name]
+    try:
+        definition(**task.kwargs)
+    except Exception:
+        logger.exception('Ошибка фоновой задачи %s #%s.', task.name, task.pk)
+        _finish_failed(task, definition, traceback.format_exc())
+        return False
+    Task.objects.filter(pk=task.pk, locked_by=task.locked_by).update(
+        status=Task.Status.DONE, finished_at=timezone.now(), last_error='')
+    return True
+
+
+def _finish_failed(task, definition, error):
+    now = timezone.now()
+    running = Task.objects.filter(pk=task.pk, locked_by=task.locked_by)
+    if task.attempts < task.max_attempts:
+        try:
+            with transaction.atomic():
+                running.update(
+                    status=Task.Status.QUEUED, last_error=error,
+                    run_after=definition.retry_at(task.attempts, now),
+                    locked_at=None, locked_by='')
+            return
+        except IntegrityError:
+            error += '\nПовтор не поставлен: в очереди уже есть задача ' \
+                     'с тем же ключом дедупликации.'
+    running.update(status=Task.Status.FAILED, last_error=error,
+                   finished_at=now)
+
+
+def release_stale_tasks(lease_timeout=TASK_LEASE_TIMEOUT):
+    """
+    Возвращает в очередь задачи, зависшие у упавших воркеров.
+
+    Попытка засчитывается: задачи, исчерпавшие попытки, помечаются
+    ошибкой.
+    """
+
+    now = timezone.now()
+    stale = Task.objects.filter(
+        status=Task.Status.RUNNING,
+        locked_at__lt=now - timedelta(seconds=lease_timeout))
+    released = 0
+    for task in stale.iterator():
+        definition = registry.get(task.name)
+        if definition is None:
+            continue
+        _finish_failed(task, definition,
+                       f'Воркер {task.locked_by} не завершил задачу.')
+        released += 1
+    return released
+
+
+def purge_finished_tasks(older_than, failed_older_than):
+    """
+    Удаляет выполненные задачи старше older_than секунд и задачи
+    с ошибкой старше failed_older_than секунд. Задачи с ошибкой хранятся
+    дольше, чтобы их успели разобрать и повторить из админки.
+    """
+
+    now = timezone.now()
+    deleted, _ = Task.objects.filter(
+        Q(status=Task.Status.DONE,
+          finished_at__lt=now - timedelta(seconds=older_than))
+        | Q(status=Task.Status.FAILED,
+            finished_at__lt=now - timedelta(seconds=failed_older_than)),
+    ).delete()
+    return deleted
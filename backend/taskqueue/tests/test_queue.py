@@ -0,0 +1,247 @@
+import threading
+import zlib
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from taskqueue.models import Task
+from taskqueue.queue import (claim_task, enqueue, execute_task,
+                             purge_finished_tasks, task)
+
+calls = []
+
+
+@task('tests.record', max_attempts=3, retry_delay=10)
+def record_task(value):
+    calls.append(value)
+
+
+@task('tests.fail', max_attempts=3, retry_delay=10)
+def fail_task():
+    raise ValueError('Ошибка')
+
+
+@task('tests.limited', concurrency=1)
+def limited_task():
+    pass
+
+
+def make_ready(task):
+    Task.objects.filter(pk=task.pk).update(run_after=timezone.now())
+
+
+class EnqueueTests(TestCase):
+    def test_task_is_queued_with_definition_defaults(self):
+        queued = record_task.enqueue(value=1)
+
+        self.assertEqual(queued.status, Task.Status.QUEUED)
+        self.assertEqual(queued.kwargs, {'value': 1})
+        self.assertEqual(queued.max_attempts, 3)
+
+    def test_task_is_dropped_with_rolled_back_transaction(self):
+        try:
+            with transaction.atomic():
+                record_task.enqueue(value=1)
+                raise ValueError
+        except ValueError:
+            pass
+
+        self.assertFalse(Task.objects.exists())
+
+    def test_queued_task_with_same_dedup_key_is_reused(self):
+        first = record_task.enqueue(value=1, dedup_key='key')
+        second = record_task.enqueue(value=2, dedup_key='key')
+
+        self.assertEqual(second.pk, first.pk)
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_dedup_key_is_free_once_task_is_running(self):
+        first = record_task.enqueue(value=1, dedup_key='key')
+        claimed = claim_task('worker')
+
+        second = record_task.enqueue(value=2, dedup_key='key')
+
+        self.assertEqual(claimed.pk, first.pk)
+        self.assertNotEqual(second.pk, first.pk)
+        self.assertEqual(second.status, Task.Status.QUEUED)
+
+
+class ExecuteTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_claimed_task_runs_and_is_done(self):
+        enqueue('tests.record', {'value': 1})
+
+        claimed = claim_task('worker')
+        self.assertEqual(claimed.status, Task.Status.RUNNING)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertTrue(execute_task(claimed))
+
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, Task.Status.DONE)
+        self.assertEqual(calls, [1])
+        self.assertIsNone(claim_task('worker'))
+
+    def test_tasks_are_claimed_by_priority(self):
+        low = record_task.enqueue(value=1, priority=-1)
+        high = record_task.enqueue(value=2, priority=5)
+
+        self.assertEqual(claim_task('worker').pk, high.pk)
+        self.assertEqual(claim_task('worker').pk, low.pk)
+
+    def test_delayed_task_is_not_claimed_early(self):
+        record_task.enqueue(value=1, delay=60)
+
+        self.assertIsNone(claim_task('worker'))
+
+    def test_failed_task_is_retried_with_backoff(self):
+        fail_task.enqueue()
+        delays = []
+        for _ in range(2):
+            claimed = claim_task('worker')
+            started = timezone.now()
+            self.assertFalse(execute_task(claimed))
+            claimed.refresh_from_db()
+            self.assertEqual(claimed.status, Task.Status.QUEUED)
+            self.assertIn('ValueError', claimed.last_error)
+            self.assertIsNone(claim_task('worker'))
+            delays.append(claimed.run_after - started)
+            make_ready(claimed)
+
+        self.assertAlmostEqual(delays[0].total_seconds(), 10, delta=1)
+        self.assertAlmostEqual(delays[1].total_seconds(), 20, delta=1)
+
+    def test_task_fails_after_last_attempt(self):
+        fail_task.enqueue()
+        for _ in range(3):
+            claimed = claim_task('worker')
+            execute_task(claimed)
+            make_ready(claimed)
+
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, Task.Status.FAILED)
+        self.assertEqual(claimed.attempts, 3)
+        self.assertIsNotNone(claimed.finished_at)
+        self.assertIsNone(claim_task('worker'))
+
+    def test_concurrency_limit_skips_to_other_tasks(self):
+        limited_task.enqueue()
+        limited_task.enqueue()
+        other = record_task.enqueue(value=1, priority=-1)
+
+        claim_task('worker')
+
+        self.assertEqual(claim_task('worker').pk, other.pk)
+        self.assertIsNone(claim_task('worker'))
+
+
+class PurgeTests(TestCase):
+    def finished_task(self, status, age):
+        queued = record_task.enqueue(value=age)
+        Task.objects.filter(pk=queued.pk).update(
+            status=status,
+            finished_at=timezone.now() - timedelta(seconds=age))
+        return queued
+
+    def test_failed_tasks_are_kept_longer(self):
+        old_done = self.finished_task(Task.Status.DONE, 20)
+        recent_failed = self.finished_task(Task.Status.FAILED, 20)
+        old_failed = self.finished_task(Task.Status.FAILED, 200)
+        queued = record_task.enqueue(value=0)
+
+        self.assertEqual(purge_finished_tasks(10, 100), 2)
+
+        self.assertEqual(
+            set(Task.objects.values_list('pk', flat=True)),
+            {recent_failed.pk, queued.pk})
+        self.assertFalse(Task.objects.filter(
+            pk__in=[old_done.pk, old_failed.pk]).exists())
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'Блокировки строк и advisory-блокировки есть только в PostgreSQL.')
+class ConcurrentClaimTests(TransactionTestCase):
+    def run_in_thread(self, target):
+        def run():
+            try:
+                target()
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def test_row_locked_by_other_worker_is_skipped(self):
+        first = record_task.enqueue(value=1, priority=1)
+        second = record_task.enqueue(value=2)
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            with transaction.atomic():
+                Task.objects.select_for_update().get(pk=first.pk)
+                locked.set()
+                release.wait(10)
+
+        thread = self.run_in_thread(hold_lock)
+        self.assertTrue(locked.wait(10))
+        try:
+            claimed = claim_task('worker')
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(claimed.pk, second.pk)
+
+    def test_capacity_check_waits_for_advisory_lock(self):
+        first = limited_task.enqueue()
+        limited_task.enqueue()
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_capacity():
+            # Другой воркер уже взял строку и advisory-блокировку и ещё
+            # не записал, что задача выполняется.
+            with transaction.atomic():
+                Task.objects.select_for_update().get(pk=first.pk)
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_advisory_xact_lock(%s)',
+                                   [zlib.crc32(b'tests.limited')])
+                locked.set()
+                release.wait(10)
+                Task.objects.filter(pk=first.pk).update(
+                    status=Task.Status.RUNNING)
+
+        thread = self.run_in_thread(hold_capacity)
+        self.assertTrue(locked.wait(10))
+        claimed = []
+        claimer = self.run_in_thread(
+            lambda: claimed.append(claim_task('worker')))
+        claimer.join(0.5)
+        self.assertTrue(claimer.is_alive())
+        release.set()
+        thread.join()
+        claimer.join(10)
+
+        self.assertEqual(claimed, [None])
+        self.assertEqual(Task.objects.filter(
+            status=Task.Status.RUNNING).count(), 1)
+
+    def test_parallel_workers_respect_concurrency_limit(self):
+        for _ in range(4):
+            limited_task.enqueue()
+        barrier = threading.Barrier(4)
+
+        def claim():
+            barrier.wait(10)
+            claim_task('worker')
+
+        threads = [self.run_in_thread(claim) for _ in range(4)]
+        for thread in threads:
+            thread.join(10)
+
+        self.assertEqual(Task.objects.filter(
+            status=Task.Status.RUNNING).count(), 1)
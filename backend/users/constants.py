@@ -1 +1,7 @@
 USER_USERNAME_MAX_LENGTH = 150
+FOLLOWED_AUTHORS_LIMIT = 5000
+FOLLOW_GRAPH_REFRESH_INTERVAL = 5
+FOLLOW_GRAPH_OVERLAY_LIMIT = 10000
+SUGGESTIONS_LIMIT = 100
+SUGGESTIONS_FAVORITE_WEIGHT = 1
+SUGGESTIONS_CACHE_TIMEOUT = 5 * 60
@@ -0,0 +1,52 @@
+from .constants import FOLLOWED_AUTHORS_LIMIT
+from .models import Follow
+
+FOLLOWED_AUTHOR_IDS_ATTR = '_followed_author_ids'
+NOT_LOADED = object()
+
+
+def get_followed_author_ids(request):
+    """
+    Множество id авторов, на которых подписан текущий пользователь.
+
+    Загружается одним запросом и запоминается на объекте запроса, так что
+    все is_subscribed одного ответа считаются по нему. Для пользователей
+    с подписками больше FOLLOWED_AUTHORS_LIMIT возвращает None — тогда
+    подписка проверяется подзапросом.
+    """
+
+    if request is None or request.user.is_anonymous:
+        return frozenset()
+    author_ids = getattr(request, FOLLOWED_AUTHOR_IDS_ATTR, NOT_LOADED)
+    if author_ids is NOT_LOADED:
+        author_ids = list(Follow.objects.filter(
+            user=request.user,
+        ).values_list('author_id', flat=True)[:FOLLOWED_AUTHORS_LIMIT + 1])
+        author_ids = (frozenset(author_ids)
+                      if len(author_ids) <= FOLLOWED_AUTHORS_LIMIT else None)
+        setattr(request, FOLLOWED_AUTHOR_IDS_ATTR, author_ids)
+    return author_ids
+
+
+def is_subscribed_to(author, request):
+    """
+    Подписан ли текущий пользователь на автора.
+
+    Использует аннотацию is_subscribed, если queryset её содержит,
+    иначе множество подписок запроса.
+    """
+
+    annotated = getattr(author, 'is_subscribed', None)
+    if annotated is not None:
+        return annotated
+    return is_following(author.pk, request)
+
+
+def is_following(author_id, request):
+    """Подписан ли текущий пользователь на автора с id author_id."""
+
+    author_ids = get_followed_author_ids(request)
+    if author_ids is not None:
+        return author_id in author_ids
+    return Follow.objects.filter(
+        user=request.user, author_id=author_id).exists()
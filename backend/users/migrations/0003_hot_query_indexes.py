@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-19 06:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_avatar_alter_user_first_name_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['user', '-id'], name='users_follow_user_id_idx'),
+        ),
+    ]
@@ -55,6 +55,10 @@ class Follow(models.Model):
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
         ordering = ['-id', ]
+        indexes = [
+            models.Index(fields=['user', '-id'],
+                         name='users_follow_user_id_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['user', 'author'],
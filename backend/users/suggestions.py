@@ -0,0 +1,246 @@
+import logging
+import threading
+import time
+from array import array
+
+import numpy as np
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+
+from recipes.changes import get_high_water_mark, get_horizon
+from recipes.models import ChangeLogEntry, Favourite
+
+from .constants import (FOLLOW_GRAPH_OVERLAY_LIMIT,
+                        FOLLOW_GRAPH_REFRESH_INTERVAL,
+                        SUGGESTIONS_CACHE_TIMEOUT, SUGGESTIONS_FAVORITE_WEIGHT,
+                        SUGGESTIONS_LIMIT)
+from .models import Follow
+
+logger = logging.getLogger(__name__)
+
+SUGGESTIONS_CACHE_KEY = 'users:suggestions:{}'
+EMPTY = np.zeros(0, dtype=np.int32)
+
+
+def build_adjacency(users, authors):
+    """
+    Сжатые строки смежности по парам (подписчик, автор).
+
+    indptr индексируется самим id пользователя: авторы пользователя
+    user_id — отсортированный срез indices[indptr[user_id]:
+    indptr[user_id + 1]].
+    """
+
+    order = np.lexsort((authors, users))
+    users, authors = users[order], authors[order]
+    size = int(users.max()) + 2 if len(users) else 1
+    indptr = np.zeros(size, dtype=np.int64)
+    np.cumsum(np.bincount(users, minlength=size - 1), out=indptr[1:])
+    return indptr, authors.astype(np.int32)
+
+
+class FollowGraph:
+    """
+    Граф подписок в памяти процесса.
+
+    Базовая часть — массивы indptr и indices в формате CSR; изменённые
+    после построения строки лежат в словаре поверх неё и сливаются
+    с базой, когда их становится больше FOLLOW_GRAPH_OVERLAY_LIMIT.
+    Изменения берутся из журнала ChangeLogEntry не чаще раза в
+    FOLLOW_GRAPH_REFRESH_INTERVAL секунд. Граф строится в фоновом потоке
+    при первом обращении и заново, если журнал до курсора уже удалён;
+    пока он строится, запросы обходятся без него. Все данные читаются
+    из default: курсор, таблица подписок и журнал должны относиться
+    к одному состоянию базы.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = EMPTY
+        self._overlay = {}
+        self._cursor = None
+        self._checked_at = None
+        self._builder = None
+
+    def following(self, user_id):
+        """Отсортированный массив id авторов, на которых подписан user_id."""
+
+        overlay = self._overlay.get(user_id)
+        if overlay is not None:
+            return overlay
+        if user_id + 1 < len(self._indptr):
+            return self._indices[
+                self._indptr[user_id]:self._indptr[user_id + 1]]
+        return EMPTY
+
+    def ensure_fresh(self):
+        """
+        Догоняет граф по журналу. Возвращает False, пока граф строится.
+        """
+
+        now = time.monotonic()
+        with self._lock:
+            if self._cursor is None:
+                self._start_rebuild()
+                return False
+            if (self._checked_at is not None
+                    and now - self._checked_at
+                    < FOLLOW_GRAPH_REFRESH_INTERVAL):
+                return True
+            if self._cursor < get_horizon():
+                self._cursor = None
+                self._start_rebuild()
+                return False
+            self._apply_changes()
+            self._checked_at = now
+            return True
+
+    def _start_rebuild(self):
+        if self._builder is None or not self._builder.is_alive():
+            self._builder = threading.Thread(
+                target=self._rebuild_in_background,
+                name='follow-graph-builder', daemon=True)
+            self._builder.start()
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception('Не удалось построить граф подписок.')
+        finally:
+            connection.close()
+
+    def rebuild(self):
+        """
+        Строит граф по всей таблице подписок.
+
+        Курсор берётся до чтения таблицы: записи журнала после него
+        применяются поверх, и повторное применение уже учтённой
+        подписки ничего не меняет.
+        """
+
+        cursor = get_high_water_mark()
+        users, authors = array('q'), array('q')
+        for user_id, author_id in Follow.objects.using('default').values_list(
+                'user_id', 'author_id').iterator(chunk_size=10000):
+            users.append(user_id)
+            authors.append(author_id)
+        indptr, indices = build_adjacency(
+            np.frombuffer(users, dtype=np.int64),
+            np.frombuffer(authors, dtype=np.int64))
+        with self._lock:
+            self._indptr, self._indices = indptr, indices
+            self._overlay = {}
+            self._cursor = cursor
+            self._apply_changes()
+            self._checked_at = time.monotonic()
+
+    def _apply_changes(self):
+        high_water = get_high_water_mark()
+        if high_water <= self._cursor:
+            return
+        changes = ChangeLogEntry.objects.using('default').filter(
+            kind=ChangeLogEntry.Kind.FOLLOW, position__gt=self._cursor,
+            position__lte=high_water).order_by('position')
+        for user_id, author_id, action in changes.values_list(
+                'user_id', 'object_id', 'action'):
+            self._set(user_id, author_id,
+                      action == ChangeLogEntry.Action.UPSERT)
+        self._cursor = high_water
+        if len(self._overlay) > FOLLOW_GRAPH_OVERLAY_LIMIT:
+            self._compact()
+
+    def _set(self, user_id, author_id, present):
+        current = self.following(user_id)
+        position = int(np.searchsorted(current, author_id))
+        exists = (position < len(current)
+                  and current[position] == author_id)
+        if present and not exists:
+            self._overlay[user_id] = np.insert(current, position, author_id)
+        elif not present and exists:
+            self._overlay[user_id] = np.delete(current, position)
+
+    def _compact(self):
+        """Сливает изменённые строки с базовыми массивами."""
+
+        base_users = np.repeat(
+            np.arange(len(self._indptr) - 1, dtype=np.int64),
+            np.diff(self._indptr))
+        keep = ~np.isin(base_users,
+                        np.fromiter(self._overlay, dtype=np.int64))
+        overlay_users = [np.full(len(authors), user_id, dtype=np.int64)
+                         for user_id, authors in self._overlay.items()]
+        self._indptr, self._indices = build_adjacency(
+            np.concatenate([base_users[keep], *overlay_users]),
+            np.concatenate([self._indices[keep], *self._overlay.values()]))
+        self._overlay = {}
+
+    def friends_of_friends(self, user_id):
+        """
+        Авторы, на которых подписаны авторы пользователя, с числом
+        таких общих подписок.
+        """
+
+        if not self.ensure_fresh():
+            return query_friends_of_friends(user_id)
+        with self._lock:
+            followed = self.following(user_id)
+            second = [self.following(int(author_id))
+                      for author_id in followed]
+        if not second:
+            return followed, {}
+        author_ids, overlaps = np.unique(np.concatenate(second),
+                                         return_counts=True)
+        return followed, dict(zip(author_ids.tolist(), overlaps.tolist()))
+
+
+def query_friends_of_friends(user_id):
+    """То же, что FollowGraph.friends_of_friends, запросами к базе."""
+
+    followed = np.array(sorted(Follow.objects.filter(
+        user_id=user_id).values_list('author_id', flat=True)),
+        dtype=np.int32)
+    return followed, dict(Follow.objects.filter(
+        user_id__in=followed.tolist()).values_list('author_id').annotate(
+            overlap=Count('id')).values_list('author_id', 'overlap'))
+
+
+follow_graph = FollowGraph()
+
+
+def suggest_author_ids(user_id):
+    """
+    Авторы, которых стоит предложить пользователю, по убыванию оценки.
+
+    Оценка — число авторов пользователя, подписанных на кандидата, плюс
+    SUGGESTIONS_FAVORITE_WEIGHT за каждый рецепт кандидата в избранном
+    пользователя. Авторы, на которых он уже подписан, и он сам
+    исключаются.
+    """
+
+    followed, scores = follow_graph.friends_of_friends(user_id)
+    for author_id, favorites in Favourite.objects.filter(
+            user_id=user_id).values_list('recipe__author_id').annotate(
+                favorites=Count('id')).values_list(
+                    'recipe__author_id', 'favorites'):
+        scores[author_id] = (scores.get(author_id, 0)
+                             + SUGGESTIONS_FAVORITE_WEIGHT * favorites)
+    excluded = set(followed.tolist())
+    excluded.add(user_id)
+    ranked = sorted(
+        (author_id for author_id in scores if author_id not in excluded),
+        key=lambda author_id: (-scores[author_id], author_id))
+    return ranked[:SUGGESTIONS_LIMIT]
+
+
+def get_suggested_author_ids(user_id):
+    """Рекомендации с кэшированием на SUGGESTIONS_CACHE_TIMEOUT секунд."""
+
+    key = SUGGESTIONS_CACHE_KEY.format(user_id)
+    author_ids = cache.get(key)
+    if author_ids is None:
+        author_ids = suggest_author_ids(user_id)
+        cache.set(key, author_ids, SUGGESTIONS_CACHE_TIMEOUT)
+    return author_ids
@@ -0,0 +1,100 @@
+from unittest import mock
+
+import numpy as np
+from django.test import TestCase
+
+from recipes.models import Favourite
+from recipes.tests.utils import create_recipe, create_user
+from users.models import Follow
+from users.suggestions import FollowGraph, build_adjacency, suggest_author_ids
+
+
+class BuildAdjacencyTests(TestCase):
+    def test_rows_are_indexed_by_user_id(self):
+        indptr, indices = build_adjacency(np.array([2, 1, 2]),
+                                          np.array([5, 3, 4]))
+
+        self.assertEqual(indptr.tolist(), [0, 0, 1, 3])
+        self.assertEqual(indices.tolist(), [3, 4, 5])
+
+    def test_empty_graph(self):
+        indptr, indices = build_adjacency(np.zeros(0, dtype=np.int64),
+                                          np.zeros(0, dtype=np.int64))
+
+        self.assertEqual(indptr.tolist(), [0])
+        self.assertEqual(len(indices), 0)
+
+
+class FollowGraphTests(TestCase):
+    def setUp(self):
+        self.graph = FollowGraph()
+        self.graph._indptr, self.graph._indices = build_adjacency(
+            np.array([1, 1, 2]), np.array([3, 5, 3]))
+
+    def following(self, user_id):
+        return self.graph.following(user_id).tolist()
+
+    def test_set_keeps_rows_sorted(self):
+        self.graph._set(1, 4, True)
+        self.graph._set(2, 3, False)
+        self.graph._set(7, 1, True)
+
+        self.assertEqual(self.following(1), [3, 4, 5])
+        self.assertEqual(self.following(2), [])
+        self.assertEqual(self.following(7), [1])
+
+    def test_repeated_set_changes_nothing(self):
+        self.graph._set(1, 3, True)
+        self.graph._set(2, 5, False)
+
+        self.assertEqual(self.graph._overlay, {})
+
+    def test_compact_merges_overlay(self):
+        self.graph._set(1, 4, True)
+        self.graph._set(2, 3, False)
+        self.graph._set(7, 1, True)
+        self.graph._compact()
+
+        self.assertEqual(self.graph._overlay, {})
+        self.assertEqual(self.following(1), [3, 4, 5])
+        self.assertEqual(self.following(2), [])
+        self.assertEqual(self.following(7), [1])
+
+
+class SuggestAuthorIdsTests(TestCase):
+    def setUp(self):
+        self.reader = create_user('reader')
+        self.first, self.second, self.popular, self.liked, self.other = [
+            create_user(username)
+            for username in ('first', 'second', 'popular', 'liked', 'other')]
+        for user, author in ((self.reader, self.first),
+                             (self.reader, self.second),
+                             (self.first, self.popular),
+                             (self.second, self.popular),
+                             (self.first, self.reader),
+                             (self.first, self.second),
+                             (self.second, self.other)):
+            Follow.objects.create(user=user, author=author)
+        for _ in range(3):
+            Favourite.objects.create(user=self.reader,
+                                     recipe=create_recipe(self.liked))
+
+    def suggest(self, graph):
+        with mock.patch('users.suggestions.follow_graph', graph):
+            return suggest_author_ids(self.reader.id)
+
+    def test_authors_are_ranked_by_score(self):
+        graph = FollowGraph()
+        graph.rebuild()
+
+        self.assertEqual(self.suggest(graph),
+                         [self.liked.id, self.popular.id, self.other.id])
+
+    def test_query_is_used_while_graph_is_built(self):
+        graph = FollowGraph()
+        with mock.patch.object(graph, '_start_rebuild') as start_rebuild:
+            suggested = self.suggest(graph)
+
+        start_rebuild.assert_called_once_with()
+        self.assertEqual(suggested,
+                         [self.liked.id, self.popular.id, self.other.id])
@@ -1,24 +1,69 @@
+import math
+
+from django.db.models import Exists, OuterRef
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.parsers import JSONParser
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
+from api.admission import AdmissionControlMixin
+from api.fast_serializers import FastUserSerializer
 from api.pagination import StandardPagination
+from api.parsers import ORJSONParser
 from api.serializers import (AvatarUpdateSerializer, CreateFollowSerializer,
                              FollowSerializer, StandartUserSerializer)
+from api.streaming import StreamingResponseMixin
+from api.tasks import delete_replaced_file
+from recipes.constants import PAGE_SIZE
 
+from .follows import get_followed_author_ids
 from .models import Follow, User
+from .suggestions import get_suggested_author_ids
 
 
-class StandartUserViewSet(UserViewSet):
+class StandartUserViewSet(AdmissionControlMixin, StreamingResponseMixin,
+                          UserViewSet):
     queryset = User.objects.all()
+    use_read_replica = True
     serializer_class = StandartUserSerializer
     pagination_class = StandardPagination
     permission_classes = [AllowAny]
 
+    def get_admission_cost(self, request):
+        """
+        Стоимость страницы подписок растёт с её размером и числом
+        рецептов каждого автора.
+        """
+
+        cost = math.ceil(self.paginator.get_page_size(request) / PAGE_SIZE)
+        try:
+            recipes_limit = int(request.query_params.get('recipes_limit'))
+        except (TypeError, ValueError):
+            return cost
+        return cost * max(1, math.ceil(recipes_limit / PAGE_SIZE))
+
+    def get_queryset(self):
+        """
+        Подписка считается по множеству подписок запроса, а подзапросом —
+        только для пользователей с очень большим числом подписок.
+        """
+
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        if get_followed_author_ids(self.request) is not None:
+            return queryset
+        return queryset.annotate(is_subscribed=Exists(Follow.objects.filter(
+            user=self.request.user, author=OuterRef('pk'))))
+
+    def get_serializer_class(self):
+        if self.action in ('list', 'retrieve'):
+            return FastUserSerializer
+        return super().get_serializer_class()
+
     @action(detail=False, methods=['get'],
             permission_classes=[IsAuthenticated],)
     def me(self, request):
@@ -29,7 +74,7 @@ class StandartUserViewSet(UserViewSet):
 
     @action(detail=False, methods=['put'],
             permission_classes=[IsAuthenticated],
-            parser_classes=[JSONParser],
+            parser_classes=[ORJSONParser, MultiPartParser],
             url_path='me/avatar')
     def avatar_put(self, request):
         """Метод для загрузки или обновления аватара пользователя."""
@@ -43,7 +88,9 @@ class StandartUserViewSet(UserViewSet):
         serializer = AvatarUpdateSerializer(user, data=request.data,
                                             partial=True)
         serializer.is_valid(raise_exception=True)
+        old_avatar = user.avatar.name
         serializer.save()
+        delete_replaced_file(old_avatar, user.avatar.name)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @avatar_put.mapping.delete
@@ -52,7 +99,10 @@ class StandartUserViewSet(UserViewSet):
 
         user = request.user
         if user.avatar:
-            user.avatar.delete()
+            old_avatar = user.avatar.name
+            user.avatar = None
+            user.save(update_fields=['avatar'])
+            delete_replaced_file(old_avatar, None)
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response({'detail': 'Аватар не найден.'},
                         status=status.HTTP_400_BAD_REQUEST)
@@ -95,7 +145,31 @@ class StandartUserViewSet(UserViewSet):
         user = request.user
         subscribed_authors = Follow.objects.filter(user=user)
         paginated_authors = self.paginate_queryset(subscribed_authors)
+        if self.can_stream(request):
+            return self.get_streaming_response(paginated_authors,
+                                               FollowSerializer)
         serializer = FollowSerializer(paginated_authors,
                                       many=True,
                                       context={'request': request})
         return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[IsAuthenticated],
+            url_path='suggestions', url_name='suggestions')
+    def suggestions(self, request):
+        """
+        Рекомендованные авторы: на них подписаны авторы пользователя
+        или их рецепты есть у него в избранном.
+        """
+
+        author_ids = get_suggested_author_ids(request.user.pk)
+        followed = get_followed_author_ids(request)
+        if followed:
+            author_ids = [author_id for author_id in author_ids
+                          if author_id not in followed]
+        page = self.paginate_queryset(author_ids)
+        authors = User.objects.in_bulk(page)
+        serializer = FastUserSerializer(
+            [authors[author_id] for author_id in page if author_id in authors],
+            many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)